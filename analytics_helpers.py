@@ -0,0 +1,175 @@
+from helpers.lazy_helpers import firestore_client, lazy_import
+from helpers.metrics_helpers import instrument_client
+from helpers.cache_helpers import analytics_cache
+from helpers.executor_helpers import run_parallel
+from helpers.workouts_helpers import decode_workout
+from helpers.stats_helpers import get_summary_ref
+
+# Heavy dependencies load on first use rather than at cold start
+firestore = lazy_import("firebase_admin.firestore")
+np = lazy_import("numpy")
+
+# Count and time every Firestore call made through this module
+db = instrument_client(firestore_client)
+
+
+# Half-point RPE buckets from 1.0 to 10.0, as np.arange(start, stop, step)
+RPE_BIN_RANGE = (1.0, 10.75, 0.5)
+
+# users/<uid>/stats/<id> bumped by exercise writes, which change analytics but not the summary
+ANALYTICS_VERSION_DOC = "analyticsVersion"
+
+
+def get_analytics_version_ref(user_id):
+    return db.collection("users").document(user_id).collection("stats").document(ANALYTICS_VERSION_DOC)
+
+
+def queue_analytics_version_bump(batch, user_id):
+    """
+    Queues a bump of the analytics version on an existing batch, for writes
+    (exercise PUT and DELETE) that feed the analytics without touching workouts.
+    """
+    batch.set(get_analytics_version_ref(user_id), {
+        "version": firestore.Increment(1),
+        "updatedAt": firestore.SERVER_TIMESTAMP,
+    }, merge=True)
+
+
+def load_training_columns(user_id, start_date=None, end_date=None):
+    """
+    Flattens a user's sets in a date range into parallel NumPy arrays.
+    This is the only per-set Python loop; all aggregation is vectorized.
+    """
+    workout_query = db.collection("users").document(user_id).collection("workouts")
+    if start_date:
+        workout_query = workout_query.where("date", ">=", start_date)
+    if end_date:
+        workout_query = workout_query.where("date", "<=", end_date)
+    workout_query = workout_query.select(["date", "exercises"])
+
+    dates, exercise_ids, reps, weights, rpes = [], [], [], [], []
+    for doc in workout_query.stream():
+        workout = decode_workout(doc.to_dict() or {})
+        try:
+            workout_day = np.datetime64(workout.get("date"), "D")
+        except (TypeError, ValueError):
+            continue
+        for exercise in workout.get("exercises") or []:
+            if not isinstance(exercise, dict):
+                continue
+            exercise_id = exercise.get("exerciseId") or ""
+            for set_item in exercise.get("sets") or []:
+                if not isinstance(set_item, dict):
+                    continue
+                dates.append(workout_day)
+                exercise_ids.append(exercise_id)
+                reps.append(set_item.get("reps"))
+                weights.append(set_item.get("weight"))
+                rpes.append(set_item.get("rpe"))
+
+    return {
+        "date": np.array(dates, dtype="datetime64[D]"),
+        "exerciseId": np.array(exercise_ids, dtype=object),
+        "reps": np.array(reps, dtype=float),
+        "weight": np.array(weights, dtype=float),
+        "rpe": np.array(rpes, dtype=float),
+    }
+
+
+def load_muscle_groups(user_id):
+    exercise_query = db.collection("users").document(user_id).collection("exercises").select(["muscleGroups"])
+    return {
+        doc.id: (doc.to_dict() or {}).get("muscleGroups") or []
+        for doc in exercise_query.stream()
+    }
+
+
+def compute_training_analytics(columns, muscle_groups):
+    """
+    Computes weekly tonnage, per-exercise estimated 1RM curves (Epley),
+    the RPE distribution and per-muscle-group volume from flattened set columns.
+    """
+    dates = columns["date"]
+    reps = columns["reps"]
+    weights = columns["weight"]
+    rpes = columns["rpe"]
+    volume = np.nan_to_num(reps * weights)
+
+    # Weekly tonnage, weeks starting on Monday (1970-01-01 was a Thursday)
+    day_numbers = dates.astype("int64")
+    week_starts = day_numbers - (day_numbers + 3) % 7
+    unique_weeks, week_index = np.unique(week_starts, return_inverse=True)
+    weekly_volume = np.bincount(week_index, weights=volume, minlength=len(unique_weeks))
+
+    # Per-exercise e1RM: best Epley estimate per exercise per day
+    exercise_codes_map, exercise_codes = np.unique(columns["exerciseId"].astype(str), return_inverse=True)
+    valid = (reps > 0) & (weights > 0) & (exercise_codes_map[exercise_codes] != "")
+    e1rm_curves = {}
+    if valid.any():
+        e1rm = weights[valid] * (1 + reps[valid] / 30.0)
+        codes = exercise_codes[valid]
+        days = day_numbers[valid]
+        order = np.lexsort((days, codes))
+        codes, days, e1rm = codes[order], days[order], e1rm[order]
+        group_starts = np.flatnonzero(np.r_[True, (np.diff(codes) != 0) | (np.diff(days) != 0)])
+        best = np.maximum.reduceat(e1rm, group_starts)
+        for code, day, value in zip(codes[group_starts], days[group_starts], best):
+            e1rm_curves.setdefault(str(exercise_codes_map[code]), []).append({
+                "date": str(np.datetime64(int(day), "D")),
+                "e1rm": round(float(value), 2),
+            })
+
+    # RPE distribution in half-point buckets
+    rpe_bin_edges = np.arange(*RPE_BIN_RANGE)
+    rpe_counts, _ = np.histogram(rpes[~np.isnan(rpes)], bins=rpe_bin_edges)
+
+    # Per-muscle-group volume: sum per exercise, then spread over its groups
+    exercise_volume = np.bincount(exercise_codes, weights=volume, minlength=len(exercise_codes_map))
+    muscle_group_volume = {}
+    for exercise_id, total in zip(exercise_codes_map, exercise_volume):
+        for group in muscle_groups.get(str(exercise_id), []):
+            muscle_group_volume[group] = muscle_group_volume.get(group, 0.0) + float(total)
+
+    return {
+        "totalSets": int(len(dates)),
+        "totalVolume": float(volume.sum()),
+        "weeklyVolume": [
+            {"weekStart": str(np.datetime64(int(week), "D")), "volume": float(total)}
+            for week, total in zip(unique_weeks, weekly_volume)
+        ],
+        "e1rm": e1rm_curves,
+        "rpeDistribution": [
+            {"rpe": float(edge), "count": int(count)}
+            for edge, count in zip(rpe_bin_edges[:-1], rpe_counts)
+        ],
+        "muscleGroupVolume": muscle_group_volume,
+    }
+
+
+def get_training_analytics(user_id, start_date=None, end_date=None):
+    """
+    Cached per (user, range, data version). Every workout write touches the
+    stats summary and every exercise write the analytics version doc, so a
+    write on any worker changes the key; the extra read is one get_all of two
+    small documents instead of the whole range.
+    """
+    def load():
+        columns, muscle_groups = run_parallel(
+            lambda: load_training_columns(user_id, start_date, end_date),
+            lambda: load_muscle_groups(user_id),
+            timeout=None,
+        )
+        return compute_training_analytics(columns, muscle_groups)
+
+    version_refs = [get_summary_ref(user_id), get_analytics_version_ref(user_id)]
+    update_times = {
+        snapshot.id: snapshot.update_time
+        for snapshot in db.get_all(version_refs, field_paths=["updatedAt"]) if snapshot.exists
+    }
+    version = tuple(update_times.get(ref.id) for ref in version_refs)
+    return analytics_cache.get((user_id, start_date, end_date, version), load)
+
+
+def invalidate_training_analytics(user_id):
+    # Frees this worker's entries early; other workers miss on the new summary version
+    analytics_cache.invalidate_matching(lambda key: key[0] == user_id)
@@ -48,8 +48,13 @@ class FitnessRepository(
         workoutsApi.createWorkout(userId, request).requireId("createWorkout")
     }
 
-    suspend fun updateWorkout(workoutId: String, request: CreateWorkoutRequest): Result<String> = runCatching {
-        workoutsApi.updateWorkout(userId, workoutId, request)
+    suspend fun updateWorkout(
+        workoutId: String,
+        request: CreateWorkoutRequest,
+        autosave: Boolean = false
+    ): Result<String> = runCatching {
+        // Autosaves are debounced server-side into one write per burst of edits
+        workoutsApi.updateWorkout(userId, workoutId, request, autosave = if (autosave) true else null)
         // Update returns a message, but we can return the ID (which is the same)
         workoutId
     }
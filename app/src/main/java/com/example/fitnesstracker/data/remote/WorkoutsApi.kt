@@ -42,7 +42,8 @@ interface WorkoutsApi {
     suspend fun updateWorkout(
         @Path("userId") userId: String,
         @Path("workoutId") workoutId: String,
-        @Body body: CreateWorkoutRequest
+        @Body body: CreateWorkoutRequest,
+        @Query("autosave") autosave: Boolean? = null
     ): IdResponse
 
     @POST("createWorkout")
@@ -116,6 +116,7 @@ import androidx.compose.runtime.mutableStateOf
 import androidx.compose.runtime.remember
 import androidx.compose.runtime.saveable.rememberSaveable
 import androidx.compose.runtime.setValue
+import androidx.compose.runtime.snapshotFlow
 import androidx.compose.runtime.snapshots.SnapshotStateList
 import androidx.compose.ui.Alignment
 import androidx.compose.ui.Modifier
@@ -155,6 +156,8 @@ import java.time.Instant
 import java.time.LocalDate
 import java.time.ZoneId
 import kotlinx.coroutines.delay
+import kotlinx.coroutines.flow.collectLatest
+import kotlinx.coroutines.flow.drop
 import kotlinx.serialization.json.JsonArray
 import kotlinx.serialization.json.JsonElement
 import kotlinx.serialization.json.JsonObject
@@ -401,6 +404,7 @@ fun FitnessApp(viewModel: MainViewModel = viewModel()) {
                 state = state,
                 onBack = { destination = FitnessDestination.Home },
                 onSaveEdits = viewModel::updateWorkoutLog,
+                onAutosaveEdits = viewModel::autosaveWorkoutLog,
                 onRefresh = { viewModel.selectWorkout(screen.id) },
                 modifier = Modifier.padding(padding)
             )
@@ -3482,6 +3486,56 @@ private class SetEditState(
     fun hasAnyInput(): Boolean = reps.isNotBlank() || weight.isNotBlank() || rir.isNotBlank()
 }
 
+private const val WORKOUT_AUTOSAVE_DELAY_MS = 1500L
+
+private data class CollectedSetEdits(
+    val updates: List<WorkoutSetUpdateEntry>,
+    val newSets: List<WorkoutSetEntry>,
+    val hasError: Boolean
+)
+
+private fun collectSetEdits(
+    setEditsByItem: Map<String, List<SetEditState>>,
+    markErrors: Boolean
+): CollectedSetEdits {
+    val updates = mutableListOf<WorkoutSetUpdateEntry>()
+    val newSets = mutableListOf<WorkoutSetEntry>()
+    var hasError = false
+    setEditsByItem.forEach { (itemId, entries) ->
+        entries.forEach { entry ->
+            if (!entry.hasAnyInput()) {
+                if (markErrors) entry.repsError = false
+                return@forEach
+            }
+            val reps = entry.reps.trim().toIntOrNull()
+            if (markErrors) entry.repsError = reps == null
+            if (reps == null) {
+                hasError = true
+            } else if (entry.setId == null) {
+                newSets.add(
+                    WorkoutSetEntry(
+                        itemId = itemId,
+                        reps = reps,
+                        weight = entry.weight.toDoubleOrNull(),
+                        rir = entry.rir.toDoubleOrNull()
+                    )
+                )
+            } else {
+                updates.add(
+                    WorkoutSetUpdateEntry(
+                        itemId = itemId,
+                        setId = entry.setId,
+                        reps = reps,
+                        weight = entry.weight.toDoubleOrNull(),
+                        rir = entry.rir.toDoubleOrNull()
+                    )
+                )
+            }
+        }
+    }
+    return CollectedSetEdits(updates, newSets, hasError)
+}
+
 private val WorkoutForestBg = Color(0xFF0A140F)
 private val WorkoutForestGlow = Color(0xFF153223)
 private val WorkoutForestCard = Color(0xB20F1C16)
@@ -4364,6 +4418,7 @@ private fun WorkoutDetailScreen(
     state: FitnessUiState,
     onBack: () -> Unit,
     onSaveEdits: (workoutId: String, updates: List<WorkoutSetUpdateEntry>, newSets: List<WorkoutSetEntry>) -> Unit,
+    onAutosaveEdits: (workoutId: String, updates: List<WorkoutSetUpdateEntry>, newSets: List<WorkoutSetEntry>) -> Unit,
     onRefresh: () -> Unit,
     modifier: Modifier = Modifier
 ) {
@@ -4426,6 +4481,19 @@ private fun WorkoutDetailScreen(
         }
     }
 
+    // Autosave valid edits once typing pauses; the server coalesces them into one write
+    LaunchedEffect(workoutId, isEditing) {
+        if (!isEditing) return@LaunchedEffect
+        snapshotFlow { collectSetEdits(setEditsByItem, markErrors = false) }
+            .drop(1)
+            .collectLatest { edits ->
+                delay(WORKOUT_AUTOSAVE_DELAY_MS)
+                if (!edits.hasError) {
+                    onAutosaveEdits(workoutId, edits.updates, edits.newSets)
+                }
+            }
+    }
+
     val textFieldColors = OutlinedTextFieldDefaults.colors(
         focusedTextColor = WorkoutTextHigh,
         unfocusedTextColor = WorkoutTextHigh,
@@ -5028,44 +5096,7 @@ private fun WorkoutDetailScreen(
                         .background(if (buttonEnabled) WorkoutVibrantGreen else WorkoutVibrantGreen.copy(alpha = 0.4f))
                         .border(1.dp, WorkoutVibrantGreen.copy(alpha = 0.25f), RoundedCornerShape(28.dp))
                         .clickable(enabled = buttonEnabled) {
-                            val updates = mutableListOf<WorkoutSetUpdateEntry>()
-                            val newSets = mutableListOf<WorkoutSetEntry>()
-                            var hasError = false
-                            setEditsByItem.forEach { (itemId, entries) ->
-                                entries.forEach { entry ->
-                                    if (!entry.hasAnyInput()) {
-                                        entry.repsError = false
-                                        return@forEach
-                                    }
-                                    val reps = entry.reps.trim().toIntOrNull()
-                                    if (reps == null) {
-                                        entry.repsError = true
-                                        hasError = true
-                                    } else {
-                                        entry.repsError = false
-                                        if (entry.setId == null) {
-                                            newSets.add(
-                                                WorkoutSetEntry(
-                                                    itemId = itemId,
-                                                    reps = reps,
-                                                    weight = entry.weight.toDoubleOrNull(),
-                                                    rir = entry.rir.toDoubleOrNull()
-                                                )
-                                            )
-                                        } else {
-                                            updates.add(
-                                                WorkoutSetUpdateEntry(
-                                                    itemId = itemId,
-                                                    setId = entry.setId,
-                                                    reps = reps,
-                                                    weight = entry.weight.toDoubleOrNull(),
-                                                    rir = entry.rir.toDoubleOrNull()
-                                                )
-                                            )
-                                        }
-                                    }
-                                }
-                            }
+                            val (updates, newSets, hasError) = collectSetEdits(setEditsByItem, markErrors = true)
                             if (hasError) {
                                 localError = "Reps are required for each set."
                                 return@clickable
@@ -480,6 +480,52 @@ class MainViewModel(
             return
         }
 
+        val request = buildWorkoutUpdateRequest(active, updates, newSets)
+
+        viewModelScope.launch {
+            _uiState.update { it.copy(isActionRunning = true, errorMessage = null) }
+
+            val result = repository.updateWorkout(workoutId, request)
+            result.fold(
+                onSuccess = {
+                     refreshAfterAction(
+                        selectWorkoutId = workoutId,
+                        infoMessage = "Workout updated"
+                     )
+                },
+                onFailure = { error ->
+                    _uiState.update {
+                        it.copy(
+                            isActionRunning = false,
+                            errorMessage = error.userFacing("Could not update workout")
+                        )
+                    }
+                }
+            )
+        }
+    }
+
+    // Sends in-progress edits with autosave=1 so the backend coalesces them into one write
+    fun autosaveWorkoutLog(
+        workoutId: String,
+        updates: List<WorkoutSetUpdateEntry>,
+        newSets: List<WorkoutSetEntry>
+    ) {
+        if (updates.isEmpty() && newSets.isEmpty()) return
+        val active = _uiState.value.selectedWorkout?.takeIf { it.id == workoutId } ?: return
+        val request = buildWorkoutUpdateRequest(active, updates, newSets)
+
+        viewModelScope.launch {
+            // Best effort: the explicit save reports errors and refreshes the workout
+            repository.updateWorkout(workoutId, request, autosave = true)
+        }
+    }
+
+    private fun buildWorkoutUpdateRequest(
+        active: Workout,
+        updates: List<WorkoutSetUpdateEntry>,
+        newSets: List<WorkoutSetEntry>
+    ): CreateWorkoutRequest {
         val itemsMap = active.items.associateBy { it.id }.toMutableMap()
 
         updates.forEach { update ->
@@ -516,51 +562,29 @@ class MainViewModel(
 
         val finalWorkout = active.copy(items = itemsMap.values.toList())
 
-        viewModelScope.launch {
-            _uiState.update { it.copy(isActionRunning = true, errorMessage = null) }
-
-            val request = CreateWorkoutRequest(
-                date = finalWorkout.date,
-                notes = finalWorkout.notes,
-                timezone = finalWorkout.timezone,
-                exercises = finalWorkout.items.map { item ->
-                    WorkoutExerciseRequest(
-                        exerciseId = item.exerciseId,
-                        name = item.name,
-                        notes = item.notes,
-                        sets = item.sets.map { set ->
-                             WorkoutSetRequest(
-                                id = if (set.id.length > 30) null else set.id,
-                                reps = set.reps,
-                                weight = set.weight,
-                                rir = set.rir,
-                                rpe = set.rpe,
-                                isPR = set.isPR,
-                                notes = set.notes
-                            )
-                        }
-                    )
-                }
-            )
-
-            val result = repository.updateWorkout(workoutId, request)
-            result.fold(
-                onSuccess = {
-                     refreshAfterAction(
-                        selectWorkoutId = workoutId,
-                        infoMessage = "Workout updated"
-                     )
-                },
-                onFailure = { error ->
-                    _uiState.update {
-                        it.copy(
-                            isActionRunning = false,
-                            errorMessage = error.userFacing("Could not update workout")
+        return CreateWorkoutRequest(
+            date = finalWorkout.date,
+            notes = finalWorkout.notes,
+            timezone = finalWorkout.timezone,
+            exercises = finalWorkout.items.map { item ->
+                WorkoutExerciseRequest(
+                    exerciseId = item.exerciseId,
+                    name = item.name,
+                    notes = item.notes,
+                    sets = item.sets.map { set ->
+                         WorkoutSetRequest(
+                            id = if (set.id.length > 30) null else set.id,
+                            reps = set.reps,
+                            weight = set.weight,
+                            rir = set.rir,
+                            rpe = set.rpe,
+                            isPR = set.isPR,
+                            notes = set.notes
                         )
                     }
-                }
-            )
-        }
+                )
+            }
+        )
     }
 
     private suspend fun refreshAfterAction(
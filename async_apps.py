@@ -0,0 +1,640 @@
+from .error_codes import ERROR_CODES
+import asyncio
+import logging
+from helpers.lazy_helpers import lazy_import
+from helpers.workouts_helpers import (
+    parse_bool,
+    parse_watermark,
+    decode_workout,
+    merge_sync_changes,
+    get_template_catalog,
+    SYNC_COLLECTIONS,
+)
+from helpers.users_helpers import normalize_phone, legacy_phone_query, PHONE_INDEX_COLLECTION
+from helpers.stats_helpers import STREAK_DIRTY_FIELD, get_summary, summary_from_snapshot
+from helpers.analytics_helpers import get_training_analytics
+from helpers.search_helpers import DEFAULT_SEARCH_LIMIT, search_exercises, search_templates
+from helpers.cache_helpers import phone_negative_cache
+from helpers.response_helpers import (
+    parse_page_size,
+    wants_ndjson,
+    page_query,
+    split_page,
+    parse_fields,
+    parse_ids,
+    order_by_ids,
+    project,
+    snapshot_to_dict,
+    snapshot_etag,
+    collection_etag,
+)
+
+try:
+    from quart import Quart, Response, current_app, request, jsonify
+except ImportError:  # the async serving mode is optional; Quart is only needed to use it
+    Quart = None
+
+# Heavy dependencies load on first use rather than at cold start
+firestore = lazy_import("firebase_admin.firestore")
+firestore_async = lazy_import("firebase_admin.firestore_async")
+
+
+def _require_quart():
+    if Quart is None:
+        raise ImportError("The async apps need Quart and firebase_admin.firestore_async: pip install quart")
+
+
+def default_async_client():
+    """
+    Returns an AsyncClient for the default firebase_admin app. Importing config.db
+    runs initialize_app first; firestore_async.client() fails without it.
+    """
+    import config.db  # noqa: F401
+    return firestore_async.client()
+
+
+def _install_async_client(app, client_factory=None):
+    """
+    Creates the Firestore AsyncClient once the event loop is running, since its
+    gRPC channel is bound to the loop it is first used on. client_factory
+    replaces default_async_client (e.g. to serve from a local fake).
+    """
+    @app.before_serving
+    async def open_firestore_client():
+        app.config["FIRESTORE_ASYNC_CLIENT"] = (client_factory or default_async_client)()
+
+    return app
+
+
+def _db():
+    return current_app.config["FIRESTORE_ASYNC_CLIENT"]
+
+
+async def _get_all(db, refs, fields=None):
+    """
+    Reads several documents with one get_all call; returns id -> snapshot for those that exist.
+    """
+    return {snapshot.id: snapshot async for snapshot in db.get_all(refs, field_paths=fields) if snapshot.exists}
+
+
+async def _paginate(query, page_size, page_token=None):
+    """
+    Async paginate_query: returns (items, next_page_token).
+    """
+    return split_page([doc async for doc in page_query(query, page_size, page_token).stream()], page_size)
+
+
+def _ndjson_response(docs):
+    """
+    Streams each snapshot of an async iterator as one JSON line, like ndjson_response.
+    """
+    dumps = current_app.json.dumps
+
+    async def generate():
+        async for doc in docs:
+            yield dumps(snapshot_to_dict(doc)) + "\n"
+
+    return Response(generate(), mimetype="application/x-ndjson")
+
+
+def _not_modified(etag):
+    response = Response("", status=304)
+    response.set_etag(etag)
+    return response
+
+
+def _with_etag(response, etag):
+    response.set_etag(etag)
+    return response
+
+
+def create_async_users_app(client_factory=None):
+    """
+    Async (Quart) counterpart of create_users_app for its read routes: getUser,
+    getUsers (ids, fields, pagination, ndjson) and checkUserByPhone. Query
+    parameters and error shapes match the Flask app; writes stay on Flask.
+    """
+    _require_quart()
+    usersApp = Quart(__name__)
+    _install_async_client(usersApp, client_factory)
+
+    @usersApp.route('/getUser/<id>', methods=['GET'])
+    async def getUser(id):
+        try:
+            doc = await _db().collection('users').document(id).get()
+            if not doc.exists:
+                return jsonify({
+                    "error": ERROR_CODES["USER_NOT_FOUND"]["message"],
+                    "code": ERROR_CODES["USER_NOT_FOUND"]["code"],
+                    "details": f"User {id} not found"
+                }), 404
+            etag = snapshot_etag(doc)
+            if request.if_none_match.contains(etag):
+                return _not_modified(etag)
+            user = doc.to_dict()
+            user["id"] = id
+            return _with_etag(jsonify(user), etag), 200
+        except Exception as e:
+            logging.error(f"Could not retrieve user {id}: {e}")
+            return jsonify({
+                "error": ERROR_CODES["INTERNAL_SERVER_ERROR"]["message"],
+                "code": ERROR_CODES["INTERNAL_SERVER_ERROR"]["code"],
+                "details": f"Could not retrieve user {id}"
+            }), 500
+
+    @usersApp.route('/getUsers', methods=['GET'])
+    async def getUsers():
+        try:
+            try:
+                page_size = parse_page_size(request.args.get("pageSize"))
+            except (TypeError, ValueError):
+                return jsonify({
+                    "error": ERROR_CODES["INVALID_REQUEST"]["message"],
+                    "code": ERROR_CODES["INVALID_REQUEST"]["code"],
+                    "details": "pageSize must be a positive integer"
+                }), 400
+
+            try:
+                fields = parse_fields(request.args.get("fields"))
+                ids = parse_ids(request.args.get("ids")) if request.args.get("ids") is not None else None
+            except ValueError as e:
+                return jsonify({
+                    "error": ERROR_CODES["INVALID_REQUEST"]["message"],
+                    "code": ERROR_CODES["INVALID_REQUEST"]["code"],
+                    "details": str(e)
+                }), 400
+
+            db = _db()
+            if ids is not None:
+                docs_by_id = await _get_all(db, [db.collection('users').document(user_id) for user_id in ids], fields)
+                etag = collection_etag([docs_by_id[user_id] for user_id in ids if user_id in docs_by_id], ids, fields)
+                if request.if_none_match.contains(etag):
+                    return _not_modified(etag)
+                users = order_by_ids(ids, docs_by_id, lambda user_id: {
+                    "id": user_id,
+                    "error": ERROR_CODES["USER_NOT_FOUND"]["message"],
+                    "code": ERROR_CODES["USER_NOT_FOUND"]["code"],
+                    "details": f"User {user_id} not found"
+                })
+                return _with_etag(jsonify({"items": users}), etag), 200
+
+            users_query = db.collection('users')
+            if fields is not None:
+                users_query = users_query.select(fields)
+            if page_size:
+                users, next_page_token = await _paginate(users_query, page_size, request.args.get("pageToken"))
+                return jsonify({
+                    "items": users,
+                    "nextPageToken": next_page_token
+                }), 200
+
+            if wants_ndjson(request):
+                return _ndjson_response(users_query.stream())
+
+            user_docs = [doc async for doc in users_query.stream()]
+            etag = collection_etag(user_docs, fields)
+            if request.if_none_match.contains(etag):
+                return _not_modified(etag)
+            return _with_etag(jsonify([snapshot_to_dict(doc) for doc in user_docs]), etag), 200
+        except Exception as e:
+            logging.error(f"Could not retrieve users: {e}")
+            return jsonify({
+                "error": ERROR_CODES["INTERNAL_SERVER_ERROR"]["message"],
+                "code": ERROR_CODES["INTERNAL_SERVER_ERROR"]["code"],
+                "details": "Could not retrieve users"
+            }), 500
+
+    @usersApp.route('/checkUserByPhone', methods=['POST'])
+    async def checkUserByPhone():
+        try:
+            data = await request.get_json(silent=True) or {}
+            phone = (data.get("phoneNumber") or data.get("phone") or "").strip()
+            if not phone:
+                return jsonify({
+                    "error": ERROR_CODES["INVALID_REQUEST"]["message"],
+                    "code": ERROR_CODES["INVALID_REQUEST"]["code"],
+                    "details": "phoneNumber is required."
+                }), 400
+
+            normalized_phone = normalize_phone(phone)
+            if normalized_phone is None:
+                return jsonify({
+                    "error": ERROR_CODES["INVALID_REQUEST"]["message"],
+                    "code": ERROR_CODES["INVALID_REQUEST"]["code"],
+                    "details": "phoneNumber is not a valid phone number."
+                }), 400
+
+            if phone_negative_cache.peek(normalized_phone):
+                return jsonify({"exists": False}), 200
+            db = _db()
+            index_doc = await db.collection(PHONE_INDEX_COLLECTION).document(normalized_phone).get()
+            exists = index_doc.exists
+            if not exists:
+                # Same users fallback as phone_exists for numbers not yet in the index
+                query = legacy_phone_query(db.collection('users'), phone, normalized_phone)
+                exists = bool(await query.get())
+            if not exists:
+                phone_negative_cache.put(normalized_phone, True)
+            return jsonify({
+                "exists": exists
+            }), 200
+        except Exception as e:
+            logging.error(f"Could not check phone number: {e}")
+            return jsonify({
+                "error": ERROR_CODES["INTERNAL_SERVER_ERROR"]["message"],
+                "code": ERROR_CODES["INTERNAL_SERVER_ERROR"]["code"],
+                "details": "Could not check phone number"
+            }), 500
+
+    return usersApp
+
+
+async def get_changes_since_async(db, user_id, since=None):
+    """
+    Async get_changes_since: the per-collection queries and the tombstone query
+    run concurrently with asyncio.gather.
+    """
+    user_ref = db.collection("users").document(user_id)
+
+    async def load_changed(collection_name, timestamp_field):
+        query = user_ref.collection(collection_name)
+        if since is not None:
+            query = query.where(timestamp_field, ">", since)
+        return [decode_workout(snapshot_to_dict(doc)) async for doc in query.stream()]
+
+    loads = [load_changed(name, "updatedAt") for name in SYNC_COLLECTIONS]
+    # A full sync has nothing to delete on the client, so tombstones are skipped
+    if since is not None:
+        loads.append(load_changed("tombstones", "deletedAt"))
+    return merge_sync_changes(since, await asyncio.gather(*loads))
+
+
+def create_async_workouts_app(client_factory=None):
+    """
+    Async (Quart) counterpart of create_workouts_app for its GET routes, with the
+    same query parameters and error shapes. Writes, export and the rebuild jobs
+    stay on the Flask app, which maintains PRs, the history index and stats.
+    """
+    _require_quart()
+    workoutsApp = Quart(__name__)
+    _install_async_client(workoutsApp, client_factory)
+
+    @workoutsApp.route('/users/<user_id>/exercises', methods=['GET'])
+    async def exercises(user_id):
+        try:
+            try:
+                fields = parse_fields(request.args.get("fields"))
+            except ValueError:
+                return jsonify({
+                    "error": ERROR_CODES["INVALID_REQUEST"]["message"],
+                    "code": ERROR_CODES["INVALID_REQUEST"]["code"],
+                    "details": "fields must be a comma-separated list of field paths"
+                }), 400
+
+            include_archived = parse_bool(request.args.get("includeArchived"), False)
+            exercise_query = _db().collection("users").document(user_id).collection("exercises")
+            if not include_archived:
+                exercise_query = exercise_query.where("archived", "==", False)
+            if fields is not None:
+                exercise_query = exercise_query.select(fields)
+
+            exercise_docs = [doc async for doc in exercise_query.stream()]
+            etag = collection_etag(exercise_docs, include_archived, fields)
+            if request.if_none_match.contains(etag):
+                return _not_modified(etag)
+            return _with_etag(jsonify([snapshot_to_dict(doc) for doc in exercise_docs]), etag), 200
+        except Exception as e:
+            logging.error(f"Could not handle exercises for user {user_id}: {e}")
+            return jsonify({
+                "error": ERROR_CODES["INTERNAL_SERVER_ERROR"]["message"],
+                "code": ERROR_CODES["INTERNAL_SERVER_ERROR"]["code"],
+                "details": f"Could not handle exercises for user {user_id}"
+            }), 500
+
+    @workoutsApp.route('/users/<user_id>/exercises/<exercise_id>', methods=['GET'])
+    async def exercise_detail(user_id, exercise_id):
+        try:
+            exercise_doc = await _db().collection("users").document(user_id).collection("exercises").document(exercise_id).get()
+            if not exercise_doc.exists:
+                return jsonify({
+                    "error": ERROR_CODES["EXERCISE_NOT_FOUND"]["message"],
+                    "code": ERROR_CODES["EXERCISE_NOT_FOUND"]["code"],
+                    "details": f"Exercise {exercise_id} not found for user {user_id}"
+                }), 404
+            etag = snapshot_etag(exercise_doc)
+            if request.if_none_match.contains(etag):
+                return _not_modified(etag)
+            return _with_etag(jsonify(snapshot_to_dict(exercise_doc)), etag), 200
+        except Exception as e:
+            logging.error(f"Could not process exercise {exercise_id} for user {user_id}: {e}")
+            return jsonify({
+                "error": ERROR_CODES["INTERNAL_SERVER_ERROR"]["message"],
+                "code": ERROR_CODES["INTERNAL_SERVER_ERROR"]["code"],
+                "details": f"Could not process exercise {exercise_id} for user {user_id}"
+            }), 500
+
+    # Search and analytics run on the same in-process indexes and caches as the Flask app
+    @workoutsApp.route('/users/<user_id>/exercises/search', methods=['GET'])
+    async def search_user_exercises(user_id):
+        try:
+            query = (request.args.get("q") or "").strip()
+            if not query:
+                return jsonify({
+                    "error": ERROR_CODES["INVALID_REQUEST"]["message"],
+                    "code": ERROR_CODES["INVALID_REQUEST"]["code"],
+                    "details": "q is required"
+                }), 400
+            try:
+                limit = parse_page_size(request.args.get("limit")) or DEFAULT_SEARCH_LIMIT
+            except (TypeError, ValueError):
+                return jsonify({
+                    "error": ERROR_CODES["INVALID_REQUEST"]["message"],
+                    "code": ERROR_CODES["INVALID_REQUEST"]["code"],
+                    "details": "limit must be a positive integer"
+                }), 400
+
+            include_archived = parse_bool(request.args.get("includeArchived"), False)
+            results = await asyncio.to_thread(search_exercises, user_id, query, limit, include_archived)
+            return jsonify({"items": results}), 200
+        except Exception as e:
+            logging.error(f"Could not search exercises for user {user_id}: {e}")
+            return jsonify({
+                "error": ERROR_CODES["INTERNAL_SERVER_ERROR"]["message"],
+                "code": ERROR_CODES["INTERNAL_SERVER_ERROR"]["code"],
+                "details": f"Could not search exercises for user {user_id}"
+            }), 500
+
+    @workoutsApp.route('/users/<user_id>/exercises/<exercise_id>/history', methods=['GET'])
+    async def exercise_history(user_id, exercise_id):
+        try:
+            history_doc = await _db().collection("users").document(user_id).collection("exerciseHistory").document(exercise_id).get()
+            if not history_doc.exists:
+                return jsonify({
+                    "exerciseId": exercise_id,
+                    "sessions": []
+                }), 200
+
+            etag = snapshot_etag(history_doc)
+            if request.if_none_match.contains(etag):
+                return _not_modified(etag)
+            history = history_doc.to_dict()
+            return _with_etag(jsonify({
+                "exerciseId": exercise_id,
+                "sessions": history.get("sessions", [])
+            }), etag), 200
+        except Exception as e:
+            logging.error(f"Could not retrieve history for exercise {exercise_id} of user {user_id}: {e}")
+            return jsonify({
+                "error": ERROR_CODES["INTERNAL_SERVER_ERROR"]["message"],
+                "code": ERROR_CODES["INTERNAL_SERVER_ERROR"]["code"],
+                "details": f"Could not retrieve history for exercise {exercise_id}"
+            }), 500
+
+    @workoutsApp.route('/users/<user_id>/workouts', methods=['GET'])
+    async def workouts(user_id):
+        try:
+            try:
+                fields = parse_fields(request.args.get("fields"))
+            except ValueError:
+                return jsonify({
+                    "error": ERROR_CODES["INVALID_REQUEST"]["message"],
+                    "code": ERROR_CODES["INVALID_REQUEST"]["code"],
+                    "details": "fields must be a comma-separated list of field paths"
+                }), 400
+
+            start_date = request.args.get("startDate")
+            end_date = request.args.get("endDate")
+            limit = request.args.get("limit")
+
+            workout_query = _db().collection("users").document(user_id).collection("workouts")
+            if start_date:
+                workout_query = workout_query.where("date", ">=", start_date)
+            if end_date:
+                workout_query = workout_query.where("date", "<=", end_date)
+            workout_query = workout_query.order_by("date", direction=firestore.Query.DESCENDING)
+            if limit:
+                try:
+                    workout_query = workout_query.limit(int(limit))
+                except (TypeError, ValueError):
+                    pass
+            if fields is not None:
+                workout_query = workout_query.select(fields)
+
+            workout_docs = [doc async for doc in workout_query.stream()]
+            etag = collection_etag(workout_docs, fields)
+            if request.if_none_match.contains(etag):
+                return _not_modified(etag)
+            return _with_etag(jsonify([decode_workout(snapshot_to_dict(doc)) for doc in workout_docs]), etag), 200
+        except Exception as e:
+            logging.error(f"Could not process workouts for user {user_id}: {e}")
+            return jsonify({
+                "error": ERROR_CODES["INTERNAL_SERVER_ERROR"]["message"],
+                "code": ERROR_CODES["INTERNAL_SERVER_ERROR"]["code"],
+                "details": f"Could not process workouts for user {user_id}"
+            }), 500
+
+    @workoutsApp.route('/users/<user_id>/stats/summary', methods=['GET'])
+    async def stats_summary(user_id):
+        try:
+            summary_doc = await _db().collection("users").document(user_id).collection("stats").document("summary").get()
+            if summary_doc.exists and (summary_doc.to_dict() or {}).get(STREAK_DIRTY_FIELD):
+                # Rare (after a delete or date change); the sync path recomputes and stores the streak
+                return jsonify(await asyncio.to_thread(get_summary, user_id)), 200
+            return jsonify(summary_from_snapshot(summary_doc)), 200
+        except Exception as e:
+            logging.error(f"Could not retrieve stats summary for user {user_id}: {e}")
+            return jsonify({
+                "error": ERROR_CODES["INTERNAL_SERVER_ERROR"]["message"],
+                "code": ERROR_CODES["INTERNAL_SERVER_ERROR"]["code"],
+                "details": f"Could not retrieve stats summary for user {user_id}"
+            }), 500
+
+    @workoutsApp.route('/users/<user_id>/analytics', methods=['GET'])
+    async def analytics(user_id):
+        try:
+            start_date = request.args.get("startDate")
+            end_date = request.args.get("endDate")
+            return jsonify(await asyncio.to_thread(get_training_analytics, user_id, start_date, end_date)), 200
+        except Exception as e:
+            logging.error(f"Could not compute analytics for user {user_id}: {e}")
+            return jsonify({
+                "error": ERROR_CODES["INTERNAL_SERVER_ERROR"]["message"],
+                "code": ERROR_CODES["INTERNAL_SERVER_ERROR"]["code"],
+                "details": f"Could not compute analytics for user {user_id}"
+            }), 500
+
+    @workoutsApp.route('/users/<user_id>/workouts/<workout_id>', methods=['GET'])
+    async def workout_detail(user_id, workout_id):
+        try:
+            workout_doc = await _db().collection("users").document(user_id).collection("workouts").document(workout_id).get()
+            if not workout_doc.exists:
+                return jsonify({
+                    "error": ERROR_CODES["WORKOUT_NOT_FOUND"]["message"],
+                    "code": ERROR_CODES["WORKOUT_NOT_FOUND"]["code"],
+                    "details": f"Workout {workout_id} not found for user {user_id}"
+                }), 404
+            etag = snapshot_etag(workout_doc)
+            if request.if_none_match.contains(etag):
+                return _not_modified(etag)
+            return _with_etag(jsonify(decode_workout(snapshot_to_dict(workout_doc))), etag), 200
+        except Exception as e:
+            logging.error(f"Could not process workout {workout_id} for user {user_id}: {e}")
+            return jsonify({
+                "error": ERROR_CODES["INTERNAL_SERVER_ERROR"]["message"],
+                "code": ERROR_CODES["INTERNAL_SERVER_ERROR"]["code"],
+                "details": f"Could not process workout {workout_id} for user {user_id}"
+            }), 500
+
+    @workoutsApp.route('/users/<user_id>/sync', methods=['GET'])
+    async def sync(user_id):
+        try:
+            try:
+                since = parse_watermark(request.args.get("since"))
+            except ValueError:
+                return jsonify({
+                    "error": ERROR_CODES["INVALID_REQUEST"]["message"],
+                    "code": ERROR_CODES["INVALID_REQUEST"]["code"],
+                    "details": "since must be an ISO-8601 timestamp"
+                }), 400
+
+            return jsonify(await get_changes_since_async(_db(), user_id, since)), 200
+        except Exception as e:
+            logging.error(f"Could not sync data for user {user_id}: {e}")
+            return jsonify({
+                "error": ERROR_CODES["INTERNAL_SERVER_ERROR"]["message"],
+                "code": ERROR_CODES["INTERNAL_SERVER_ERROR"]["code"],
+                "details": f"Could not sync data for user {user_id}"
+            }), 500
+
+    @workoutsApp.route('/getWorkout/<id>', methods=['GET'])
+    async def getWorkout(id):
+        try:
+            doc = await _db().collection("workouts").document(id).get()
+            if not doc.exists:
+                return jsonify({
+                    "error": ERROR_CODES["WORKOUT_NOT_FOUND"]["message"],
+                    "code": ERROR_CODES["WORKOUT_NOT_FOUND"]["code"],
+                    "details": f"Workout {id} not found"
+                }), 404
+            etag = snapshot_etag(doc)
+            if request.if_none_match.contains(etag):
+                return _not_modified(etag)
+            return _with_etag(jsonify(snapshot_to_dict(doc)), etag), 200
+        except Exception as e:
+            logging.error(f"Could not retrieve workout {id}: {e}")
+            return jsonify({
+                "error": ERROR_CODES["INTERNAL_SERVER_ERROR"]["message"],
+                "code": ERROR_CODES["INTERNAL_SERVER_ERROR"]["code"],
+                "details": f"Could not retrieve workout {id}"
+            }), 500
+
+    @workoutsApp.route('/getAllWorkouts', methods=['GET'])
+    async def getAllWorkouts():
+        try:
+            try:
+                page_size = parse_page_size(request.args.get("pageSize"))
+            except (TypeError, ValueError):
+                return jsonify({
+                    "error": ERROR_CODES["INVALID_REQUEST"]["message"],
+                    "code": ERROR_CODES["INVALID_REQUEST"]["code"],
+                    "details": "pageSize must be a positive integer"
+                }), 400
+
+            try:
+                fields = parse_fields(request.args.get("fields"))
+            except ValueError:
+                return jsonify({
+                    "error": ERROR_CODES["INVALID_REQUEST"]["message"],
+                    "code": ERROR_CODES["INVALID_REQUEST"]["code"],
+                    "details": "fields must be a comma-separated list of field paths"
+                }), 400
+
+            workouts_query = _db().collection('workouts')
+            if fields is not None:
+                workouts_query = workouts_query.select(fields)
+            if page_size:
+                workouts, next_page_token = await _paginate(workouts_query, page_size, request.args.get("pageToken"))
+                return jsonify({
+                    "items": workouts,
+                    "nextPageToken": next_page_token
+                }), 200
+
+            if wants_ndjson(request):
+                return _ndjson_response(workouts_query.stream())
+
+            # Shares the Flask app's cached catalog rather than keeping a second copy
+            docs = await asyncio.to_thread(get_template_catalog)
+            etag = collection_etag(docs, fields)
+            if request.if_none_match.contains(etag):
+                return _not_modified(etag)
+            return _with_etag(jsonify([project(snapshot_to_dict(doc), fields) for doc in docs]), etag), 200
+        except Exception as e:
+            logging.error(f"Could not retrieve workouts: {e}")
+            return jsonify({
+                "error": ERROR_CODES["INTERNAL_SERVER_ERROR"]["message"],
+                "code": ERROR_CODES["INTERNAL_SERVER_ERROR"]["code"],
+                "details": "Could not retrieve workouts"
+            }), 500
+
+    @workoutsApp.route('/getWorkouts', methods=['GET'])
+    async def getWorkouts():
+        try:
+            try:
+                ids = parse_ids(request.args.get("ids"))
+                fields = parse_fields(request.args.get("fields"))
+            except ValueError as e:
+                return jsonify({
+                    "error": ERROR_CODES["INVALID_REQUEST"]["message"],
+                    "code": ERROR_CODES["INVALID_REQUEST"]["code"],
+                    "details": str(e)
+                }), 400
+
+            db = _db()
+            docs_by_id = await _get_all(db, [db.collection("workouts").document(workout_id) for workout_id in ids])
+            etag = collection_etag([docs_by_id[workout_id] for workout_id in ids if workout_id in docs_by_id], ids, fields)
+            if request.if_none_match.contains(etag):
+                return _not_modified(etag)
+            workouts = order_by_ids(ids, docs_by_id, lambda workout_id: {
+                "id": workout_id,
+                "error": ERROR_CODES["WORKOUT_NOT_FOUND"]["message"],
+                "code": ERROR_CODES["WORKOUT_NOT_FOUND"]["code"],
+                "details": f"Workout {workout_id} not found"
+            }, fields)
+            return _with_etag(jsonify({"items": workouts}), etag), 200
+        except Exception as e:
+            logging.error(f"Could not retrieve workouts: {e}")
+            return jsonify({
+                "error": ERROR_CODES["INTERNAL_SERVER_ERROR"]["message"],
+                "code": ERROR_CODES["INTERNAL_SERVER_ERROR"]["code"],
+                "details": "Could not retrieve workouts"
+            }), 500
+
+    @workoutsApp.route('/searchWorkouts', methods=['GET'])
+    async def searchWorkouts():
+        try:
+            query = (request.args.get("q") or "").strip()
+            if not query:
+                return jsonify({
+                    "error": ERROR_CODES["INVALID_REQUEST"]["message"],
+                    "code": ERROR_CODES["INVALID_REQUEST"]["code"],
+                    "details": "q is required"
+                }), 400
+            try:
+                limit = parse_page_size(request.args.get("limit")) or DEFAULT_SEARCH_LIMIT
+            except (TypeError, ValueError):
+                return jsonify({
+                    "error": ERROR_CODES["INVALID_REQUEST"]["message"],
+                    "code": ERROR_CODES["INVALID_REQUEST"]["code"],
+                    "details": "limit must be a positive integer"
+                }), 400
+
+            return jsonify({"items": await asyncio.to_thread(search_templates, query, limit)}), 200
+        except Exception as e:
+            logging.error(f"Could not search workouts: {e}")
+            return jsonify({
+                "error": ERROR_CODES["INTERNAL_SERVER_ERROR"]["message"],
+                "code": ERROR_CODES["INTERNAL_SERVER_ERROR"]["code"],
+                "details": "Could not search workouts"
+            }), 500
+
+    return workoutsApp
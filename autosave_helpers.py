@@ -0,0 +1,238 @@
+from helpers.lazy_helpers import firestore_client, lazy_import
+from helpers.metrics_helpers import instrument_client
+from helpers.workouts_helpers import (
+    get_workout_ref,
+    process_workout_exercises,
+    update_exercise_history,
+    store_exercises,
+    decode_workout,
+)
+from helpers.stats_helpers import compute_workout_volume, queue_summary_increment
+from helpers.analytics_helpers import invalidate_training_analytics
+from helpers.executor_helpers import run_in_background
+import atexit
+import logging
+import os
+import threading
+import time
+
+# Heavy dependencies load on first use rather than at cold start
+firestore = lazy_import("firebase_admin.firestore")
+api_exceptions = lazy_import("google.api_core.exceptions")
+
+# Count and time every Firestore call made through this module
+db = instrument_client(firestore_client)
+
+
+# Quiet period after the last autosave PUT before the coalesced write is made.
+# Set to 0 where background threads get no CPU between requests (e.g. Cloud
+# Functions): autosaves are then written immediately instead of debounced.
+AUTOSAVE_DEBOUNCE_SECONDS = float(os.environ.get("AUTOSAVE_DEBOUNCE_SECONDS", "2.0"))
+
+# Upper bound on how long a stream of autosave PUTs can defer the write
+AUTOSAVE_MAX_DELAY_SECONDS = 10.0
+
+# Reads and commits of a workout update before giving up on concurrent writers
+WORKOUT_UPDATE_ATTEMPTS = 5
+
+# Flushes of the same workout are serialized through one of these locks
+AUTOSAVE_LOCK_STRIPES = 64
+
+# Pending autosave edits keyed by (user_id, workout_id)
+_pending_autosaves = {}
+_pending_lock = threading.Lock()
+_flush_locks = [threading.Lock() for _ in range(AUTOSAVE_LOCK_STRIPES)]
+
+
+def apply_workout_update(user_id, workout_id, data):
+    """
+    Writes a workout PUT payload over the stored workout. Metadata-only updates
+    are a single precondition write; changes to exercises or date also maintain
+    PRs, the history index and the stats summary, committed in one batch with
+    the workout write. That batch only applies if the workout is unchanged since
+    it was read, and is rebuilt from a fresh read otherwise (FailedPrecondition
+    is raised after WORKOUT_UPDATE_ATTEMPTS). Returns False when the workout
+    does not exist.
+    """
+    # Only changes to exercises or date need the stored workout (for the
+    # history index and volume delta); anything else is a single precondition write
+    if "exercises" not in data and "date" not in data:
+        workout_ref = db.collection("users").document(user_id).collection("workouts").document(workout_id)
+        try:
+            workout_ref.update(dict(data, updatedAt=firestore.SERVER_TIMESTAMP))
+        except api_exceptions.NotFound:
+            return False
+        return True
+
+    for attempt in range(WORKOUT_UPDATE_ATTEMPTS):
+        workout_ref, workout_doc = get_workout_ref(user_id, workout_id)
+        if workout_ref is None:
+            return False
+        try:
+            _commit_workout_update(user_id, workout_ref, workout_doc, dict(data))
+            break
+        except api_exceptions.FailedPrecondition:
+            # Another write landed between the read and the commit; redo it against the new state
+            if attempt == WORKOUT_UPDATE_ATTEMPTS - 1:
+                raise
+    invalidate_training_analytics(user_id)
+    return True
+
+
+def _commit_workout_update(user_id, workout_ref, workout_doc, data):
+    workout_id = workout_ref.id
+    data["updatedAt"] = firestore.SERVER_TIMESTAMP
+    previous_workout = decode_workout(workout_doc.to_dict() or {})
+    workout_date = data.get("date") or previous_workout.get("date")
+    volume_delta = 0.0
+
+    # The workout write goes in first; nothing in the batch applies if its precondition fails
+    batch = db.batch()
+    if "exercises" in data:
+        processed_exercises = process_workout_exercises(
+            user_id,
+            workout_id,
+            data["exercises"],
+            workout_date=workout_date,
+            previous_exercises=previous_workout.get("exercises") or [],
+            previous_date=previous_workout.get("date"),
+            batch=batch,
+        )
+        data["exercises"] = store_exercises(processed_exercises)
+        volume_delta = (
+            compute_workout_volume(processed_exercises)
+            - compute_workout_volume(previous_workout.get("exercises"))
+        )
+    elif workout_date != previous_workout.get("date"):
+        # Sessions in the history index carry the workout date
+        update_exercise_history(user_id, workout_id, workout_date, previous_workout.get("exercises"), batch=batch)
+
+    batch.update(workout_ref, data, option=db.write_option(last_update_time=workout_doc.update_time))
+    queue_summary_increment(
+        batch, user_id, volume_delta=volume_delta, streak_dirty=workout_date != previous_workout.get("date")
+    )
+    batch.commit()
+
+
+def _flush_lock(key):
+    return _flush_locks[hash(key) % AUTOSAVE_LOCK_STRIPES]
+
+
+def _take_pending(key):
+    with _pending_lock:
+        entry = _pending_autosaves.pop(key, None)
+    if entry is not None and entry["timer"] is not None:
+        entry["timer"].cancel()
+    return entry
+
+
+def _restore_pending(key, entry, error):
+    """
+    Puts the edits of a failed write back under any newer pending edits, with
+    the error kept for the next autosave response. Restored edits are retried
+    by the next PUT, read or exit flush of the workout.
+    """
+    with _pending_lock:
+        newer = _pending_autosaves.get(key)
+        if newer is not None:
+            data = dict(entry["data"])
+            data.update(newer["data"])
+            newer["data"] = data
+            newer["error"] = error
+            return
+        entry["timer"] = None
+        entry["error"] = error
+        _pending_autosaves[key] = entry
+
+
+def _flush_due(key):
+    with _flush_lock(key):
+        entry = _take_pending(key)
+        if entry is None:
+            return
+        user_id, workout_id = key
+        try:
+            if not apply_workout_update(user_id, workout_id, entry["data"]):
+                logging.error(f"Dropped autosave for missing workout {workout_id} of user {user_id}")
+        except Exception as e:
+            logging.error(f"Autosave of workout {workout_id} for user {user_id} failed, keeping its edits: {e}")
+            _restore_pending(key, entry, str(e))
+
+
+def queue_workout_autosave(user_id, workout_id, data):
+    """
+    Merges an autosave PUT into the pending edit for this workout and (re)starts
+    the debounce timer. Later fields replace earlier ones, so a burst of PUTs
+    becomes one write, applied over whatever is stored when it flushes.
+    Returns (PUTs coalesced so far, error of a failed earlier flush or None),
+    or None when the workout does not exist.
+    """
+    if AUTOSAVE_DEBOUNCE_SECONDS <= 0:
+        return (1, None) if apply_workout_update(user_id, workout_id, data) else None
+
+    key = (user_id, workout_id)
+    with _pending_lock:
+        queued = key in _pending_autosaves
+    if not queued:
+        # The first PUT of a burst checks the workout exists, so a bad id gets a 404 now
+        snapshot = db.collection("users").document(user_id).collection("workouts").document(workout_id).get(
+            field_paths=["updatedAt"]
+        )
+        if not snapshot.exists:
+            return None
+
+    now = time.monotonic()
+    with _pending_lock:
+        entry = _pending_autosaves.get(key)
+        if entry is None:
+            entry = _pending_autosaves[key] = {"data": {}, "firstQueuedAt": now, "count": 0, "timer": None}
+        elif entry["timer"] is not None:
+            entry["timer"].cancel()
+        entry["data"].update(data)
+        entry["count"] += 1
+        delay = min(AUTOSAVE_DEBOUNCE_SECONDS, max(0.0, entry["firstQueuedAt"] + AUTOSAVE_MAX_DELAY_SECONDS - now))
+        # The timer only schedules; the write itself runs on the shared background pool
+        entry["timer"] = threading.Timer(delay, run_in_background, args=(_flush_due, key))
+        entry["timer"].daemon = True
+        entry["timer"].start()
+        return entry["count"], entry.pop("error", None)
+
+
+def save_workout_now(user_id, workout_id, data=None):
+    """
+    Writes any pending autosave for the workout together with data (which wins
+    on conflicting fields) in one update. If the write fails, the pending edits
+    are kept and the error is raised. Returns None when there was nothing to
+    write, otherwise the apply_workout_update result.
+    """
+    key = (user_id, workout_id)
+    with _flush_lock(key):
+        entry = _take_pending(key)
+        if entry is None and not data:
+            return None
+        merged = dict(entry["data"]) if entry is not None else {}
+        merged.update(data or {})
+        try:
+            return apply_workout_update(user_id, workout_id, merged)
+        except Exception as e:
+            if entry is not None:
+                _restore_pending(key, entry, str(e))
+            raise
+
+
+def flush_pending_autosaves():
+    """
+    Writes every pending autosave now. Registered with atexit so a worker that
+    is scaled down or recycled does not lose edits still inside the debounce window.
+    """
+    with _pending_lock:
+        keys = list(_pending_autosaves)
+    for key in keys:
+        _flush_due(key)
+
+
+atexit.register(flush_pending_autosaves)
+
+
+def discard_workout_autosave(user_id, workout_id):
+    _take_pending((user_id, workout_id))
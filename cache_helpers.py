@@ -0,0 +1,134 @@
+from collections import OrderedDict
+from concurrent.futures import Future
+import threading
+import time
+
+
+class TTLCache:
+    """
+    Thread-safe LRU cache with a per-entry TTL, hit/miss counters and
+    single-flight loading: concurrent misses for one key share one load call.
+    """
+
+    def __init__(self, maxsize=256, ttl=300):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._inflight = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+
+    def get(self, key, loader, cache_none=False):
+        """
+        Returns the cached value for key, calling loader() on a miss. A None
+        result is only cached when cache_none is set.
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[1] > time.monotonic():
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[0]
+            if entry is not None:
+                del self._entries[key]
+
+            self.misses += 1
+            future = self._inflight.get(key)
+            if future is not None:
+                self.coalesced += 1
+                leader = False
+            else:
+                future = Future()
+                self._inflight[key] = future
+                leader = True
+
+        if not leader:
+            return future.result()
+
+        try:
+            value = loader()
+        except Exception as e:
+            with self._lock:
+                self._inflight.pop(key, None)
+            future.set_exception(e)
+            raise
+
+        with self._lock:
+            # Skip storing if the key was invalidated while loading
+            if self._inflight.pop(key, None) is future and (value is not None or cache_none):
+                self._entries[key] = (value, time.monotonic() + self.ttl)
+                self._entries.move_to_end(key)
+                while len(self._entries) > self.maxsize:
+                    self._entries.popitem(last=False)
+        future.set_result(value)
+        return value
+
+    def peek(self, key):
+        """
+        Returns the cached value for key, or None on a miss, without loading.
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[1] > time.monotonic():
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[0]
+            self.misses += 1
+            return None
+
+    def put(self, key, value):
+        with self._lock:
+            self._entries[key] = (value, time.monotonic() + self.ttl)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, key):
+        with self._lock:
+            self._entries.pop(key, None)
+            self._inflight.pop(key, None)
+
+    def invalidate_matching(self, predicate):
+        """
+        Drops every entry whose key satisfies predicate, e.g. all keys of one user.
+        """
+        with self._lock:
+            for key in [key for key in self._entries if predicate(key)]:
+                del self._entries[key]
+            for key in [key for key in self._inflight if predicate(key)]:
+                del self._inflight[key]
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._inflight.clear()
+
+    def stats(self):
+        with self._lock:
+            return {
+                "size": len(self._entries),
+                "hits": self.hits,
+                "misses": self.misses,
+                "coalesced": self.coalesced,
+            }
+
+
+# Cache key for the full template catalog used by getAllWorkouts
+TEMPLATE_CATALOG_KEY = "__all__"
+
+# Shared cache of template DocumentSnapshots from the global workouts collection.
+# Snapshots are cached (not dicts) because to_dict() returns a fresh copy per call.
+template_cache = TTLCache(maxsize=512, ttl=600)
+
+# Per-user training analytics keyed by (user_id, start_date, end_date, summary update time)
+analytics_cache = TTLCache(maxsize=1024, ttl=3600)
+
+# In-memory search indexes keyed by ("exercises", user_id) or ("templates",).
+# Routes update cached indexes in place; an evicted or expired index is rebuilt on next search.
+search_index_cache = TTLCache(maxsize=256, ttl=3600)
+
+# Normalized phone numbers known to have no phoneIndex doc. Kept short so a number
+# registered on another instance is seen quickly; local writes invalidate directly.
+phone_negative_cache = TTLCache(maxsize=100000, ttl=60)
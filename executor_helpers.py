@@ -0,0 +1,140 @@
+from concurrent.futures import ThreadPoolExecutor
+import concurrent.futures
+import contextvars
+import logging
+import threading
+import time
+
+
+# Worker threads for request-path Firestore fan-out (calls are I/O bound)
+REQUEST_POOL_WORKERS = 16
+
+# Worker threads for background jobs (cascading deletes, autosave flushes)
+BACKGROUND_POOL_WORKERS = 4
+
+# Tasks allowed to wait for a request worker before callers run them inline
+REQUEST_POOL_QUEUE_LIMIT = 64
+
+# Default per-call timeout for run_parallel, in seconds
+DEFAULT_CALL_TIMEOUT = 10.0
+
+
+class BoundedExecutor:
+    """
+    ThreadPoolExecutor with a cap on queued work and counters for saturation.
+    When the queue is full, submit() runs the call in the caller's thread instead
+    of queueing it, so a burst degrades to serial calls rather than piling up.
+    Calls run in a copy of the caller's context, so per-request Firestore
+    accounting still sees them.
+    """
+
+    def __init__(self, name, max_workers, queue_limit=None):
+        self.name = name
+        self.max_workers = max_workers
+        self.queue_limit = queue_limit
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix=name)
+        self._lock = threading.Lock()
+        self.pending = 0
+        self.active = 0
+        self.submitted = 0
+        self.completed = 0
+        self.inline_runs = 0
+        self.timeouts = 0
+        self.wait_seconds = 0.0
+
+    def _run(self, enqueued_at, context, fn, args, kwargs):
+        with self._lock:
+            self.active += 1
+            self.wait_seconds += time.perf_counter() - enqueued_at
+        try:
+            return context.run(fn, *args, **kwargs)
+        finally:
+            with self._lock:
+                self.active -= 1
+                self.pending -= 1
+                self.completed += 1
+
+    def submit(self, fn, *args, **kwargs):
+        with self._lock:
+            saturated = self.queue_limit is not None and self.pending >= self.max_workers + self.queue_limit
+            if saturated:
+                self.inline_runs += 1
+            else:
+                self.pending += 1
+                self.submitted += 1
+        if saturated:
+            future = concurrent.futures.Future()
+            try:
+                future.set_result(fn(*args, **kwargs))
+            except Exception as e:
+                future.set_exception(e)
+            return future
+        return self._pool.submit(self._run, time.perf_counter(), contextvars.copy_context(), fn, args, kwargs)
+
+    def cancel(self, future):
+        """
+        Cancels a queued call that has not started; returns whether it was cancelled.
+        """
+        if not future.cancel():
+            return False
+        with self._lock:
+            self.pending -= 1
+        return True
+
+    def record_timeout(self):
+        with self._lock:
+            self.timeouts += 1
+
+    def stats(self):
+        with self._lock:
+            return {
+                "workers": self.max_workers,
+                "active": self.active,
+                "queued": self.pending - self.active,
+                "submitted": self.submitted,
+                "completed": self.completed,
+                "inlineRuns": self.inline_runs,
+                "timeouts": self.timeouts,
+                "waitSeconds": self.wait_seconds,
+            }
+
+
+request_executor = BoundedExecutor("firestore-fanout", REQUEST_POOL_WORKERS, REQUEST_POOL_QUEUE_LIMIT)
+background_executor = BoundedExecutor("background-jobs", BACKGROUND_POOL_WORKERS)
+
+
+def run_parallel(*calls, timeout=DEFAULT_CALL_TIMEOUT):
+    """
+    Runs independent zero-argument callables concurrently and returns their
+    results in order, so latency tracks the slowest call rather than the sum.
+    The first exception is re-raised; concurrent.futures.TimeoutError is raised
+    if the calls have not all finished within timeout seconds.
+    """
+    if len(calls) < 2:
+        return [call() for call in calls]
+    futures = [request_executor.submit(call) for call in calls]
+    done, not_done = concurrent.futures.wait(futures, timeout=timeout, return_when=concurrent.futures.FIRST_EXCEPTION)
+    for future in futures:
+        if future in done and future.exception() is not None:
+            for pending in not_done:
+                request_executor.cancel(pending)
+            raise future.exception()
+    if not_done:
+        for pending in not_done:
+            request_executor.cancel(pending)
+        request_executor.record_timeout()
+        raise concurrent.futures.TimeoutError(f"{len(not_done)} of {len(calls)} parallel calls timed out")
+    return [future.result() for future in futures]
+
+
+def run_in_background(fn, *args):
+    """
+    Queues fn on the background pool; failures are logged rather than lost.
+    """
+    def run():
+        try:
+            fn(*args)
+        except Exception as e:
+            logging.error(f"Background task {getattr(fn, '__name__', fn)} failed: {e}")
+
+    return background_executor.submit(run)
@@ -0,0 +1,287 @@
+from helpers.lazy_helpers import firestore_client, lazy_import
+from helpers.metrics_helpers import instrument_client
+from helpers.workouts_helpers import (
+    BATCH_WRITE_LIMIT,
+    normalize_workout_exercises,
+    keep_best_pr_candidates,
+    best_pr_candidates,
+    update_prs_for_sets,
+    build_history_sessions,
+    merge_history_sessions,
+    merge_exercise_history,
+    store_exercises,
+    decode_workout,
+)
+from helpers.stats_helpers import parse_date, compute_workout_volume, merge_workouts_into_summary
+from helpers.executor_helpers import run_parallel
+import csv
+import io
+import json
+import zlib
+
+# Heavy dependencies load on first use rather than at cold start
+firestore = lazy_import("firebase_admin.firestore")
+
+# Count and time every Firestore call made through this module
+db = instrument_client(firestore_client)
+
+
+# CSV columns for one set per row; rows sharing workoutKey (or date) form one workout
+CSV_WORKOUT_COLUMNS = ("workoutKey", "date", "timezone", "notes", "workout_id")
+CSV_SET_COLUMNS = ("exerciseId", "name", "setId", "reps", "weight", "rir", "rpe", "isPR", "setNotes")
+
+# CSV export writes the import layout plus the derived volume, so exports round-trip
+CSV_EXPORT_COLUMNS = CSV_WORKOUT_COLUMNS + CSV_SET_COLUMNS + ("volume",)
+
+
+def parse_number(value, cast=float):
+    if value is None or str(value).strip() == "":
+        return None
+    return cast(value)
+
+
+def iter_ndjson_workouts(text_stream):
+    """
+    Yields (line_number, workout, error) for every non-empty NDJSON line.
+    """
+    for line_number, line in enumerate(text_stream, start=1):
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            workout = json.loads(line)
+        except ValueError as e:
+            yield line_number, None, f"Invalid JSON: {e}"
+            continue
+        if not isinstance(workout, dict):
+            yield line_number, None, "Each line must be a JSON object"
+            continue
+        yield line_number, workout, None
+
+
+def iter_csv_workouts(text_stream):
+    """
+    Yields (line_number, workout, error) by grouping consecutive set rows that
+    share a workoutKey (falling back to date) into one workout.
+    """
+    current_key = None
+    current = None
+    current_line = None
+    exercises_by_key = {}
+    for row_number, row in enumerate(csv.DictReader(text_stream), start=2):
+        key = (row.get("workoutKey") or row.get("date") or "").strip()
+        if key != current_key:
+            if current is not None:
+                yield current_line, current, None
+            current_key = key
+            current_line = row_number
+            current = {column: (row.get(column) or "").strip() or None for column in CSV_WORKOUT_COLUMNS}
+            current.pop("workoutKey")
+            current["exercises"] = []
+            exercises_by_key = {}
+
+        try:
+            set_item = {
+                "id": (row.get("setId") or "").strip() or None,
+                "reps": parse_number(row.get("reps"), int),
+                "weight": parse_number(row.get("weight")),
+                "rir": parse_number(row.get("rir")),
+                "rpe": parse_number(row.get("rpe")),
+                "isPR": (row.get("isPR") or "").strip().lower() in ["true", "1", "yes", "y", "t"],
+                "notes": (row.get("setNotes") or "").strip(),
+            }
+        except (TypeError, ValueError) as e:
+            yield row_number, None, f"Invalid number: {e}"
+            continue
+
+        exercise_id = (row.get("exerciseId") or "").strip() or None
+        name = (row.get("name") or "").strip() or None
+        exercise_key = exercise_id or name
+        if exercise_key not in exercises_by_key:
+            exercise = {"sets": []}
+            if exercise_id:
+                exercise["exerciseId"] = exercise_id
+            if name:
+                exercise["name"] = name
+            exercises_by_key[exercise_key] = exercise
+            current["exercises"].append(exercise)
+        exercises_by_key[exercise_key]["sets"].append(set_item)
+
+    if current is not None:
+        yield current_line, current, None
+
+
+def import_workouts(user_id, records):
+    """
+    Validates and writes imported workouts in batches of BATCH_WRITE_LIMIT.
+    Only the running best set per exercise, the newest history sessions and
+    the summary totals are kept while rows arrive; PRs, the history index and
+    the stats summary are then updated once from those, without rereading the
+    user's other workouts. Returns (imported_count, errors).
+    """
+    workouts_collection = db.collection("users").document(user_id).collection("workouts")
+    best_by_exercise = {}
+    history_by_exercise = {}
+    timezones_by_date = {}
+    total_volume = 0.0
+    errors = []
+    imported = 0
+    batch = db.batch()
+    pending = 0
+
+    for line_number, workout, error in records:
+        if error:
+            errors.append({"line": line_number, "error": error})
+            continue
+        date_value = workout.get("date")
+        if parse_date(date_value) is None:
+            errors.append({"line": line_number, "error": "date must be YYYY-MM-DD"})
+            continue
+        exercises_data = workout.get("exercises") or []
+        if not isinstance(exercises_data, list):
+            errors.append({"line": line_number, "error": "exercises must be a list"})
+            continue
+
+        workout_ref = workouts_collection.document()
+        processed_exercises, candidates = normalize_workout_exercises(workout_ref.id, exercises_data)
+        keep_best_pr_candidates(best_by_exercise, candidates)
+        for exercise_id, session in build_history_sessions(workout_ref.id, date_value, processed_exercises).items():
+            history_by_exercise[exercise_id] = merge_history_sessions(
+                history_by_exercise.get(exercise_id), workout_ref.id, session
+            )
+        timezones_by_date[date_value] = workout.get("timezone") or timezones_by_date.get(date_value)
+        total_volume += compute_workout_volume(processed_exercises)
+        workout_data = {
+            "date": date_value,
+            "notes": workout.get("notes") or "",
+            "timezone": workout.get("timezone"),
+            "createdAt": firestore.SERVER_TIMESTAMP,
+            "updatedAt": firestore.SERVER_TIMESTAMP,
+            "exercises": store_exercises(processed_exercises),
+        }
+        if workout.get("workout_id"):
+            workout_data["workout_id"] = workout["workout_id"]
+        batch.set(workout_ref, workout_data)
+        imported += 1
+        pending += 1
+        if pending == BATCH_WRITE_LIMIT:
+            batch.commit()
+            batch = db.batch()
+            pending = 0
+
+    if pending:
+        batch.commit()
+
+    if imported:
+        # PRs, the history index and the summary are separate documents, so they update concurrently
+        run_parallel(
+            lambda: update_prs_for_sets(user_id, best_pr_candidates(best_by_exercise)),
+            lambda: merge_exercise_history(user_id, history_by_exercise),
+            lambda: merge_workouts_into_summary(user_id, imported, total_volume, timezones_by_date),
+            timeout=None,
+        )
+    return imported, errors
+
+
+def import_workouts_from_stream(user_id, binary_stream, import_format):
+    text_stream = io.TextIOWrapper(binary_stream, encoding="utf-8", newline="")
+    if import_format == "csv":
+        records = iter_csv_workouts(text_stream)
+    else:
+        records = iter_ndjson_workouts(text_stream)
+    return import_workouts(user_id, records)
+
+
+def iter_workout_set_rows(workout_id, workout):
+    """
+    Flattens one workout into CSV_EXPORT_COLUMNS rows, one per set.
+    """
+    for exercise in workout.get("exercises") or []:
+        if not isinstance(exercise, dict):
+            continue
+        for set_item in exercise.get("sets") or []:
+            if not isinstance(set_item, dict):
+                continue
+            yield {
+                "workoutKey": workout_id,
+                "date": workout.get("date"),
+                "timezone": workout.get("timezone"),
+                "notes": workout.get("notes"),
+                "workout_id": workout.get("workout_id"),
+                "exerciseId": exercise.get("exerciseId"),
+                "name": exercise.get("name"),
+                "setId": set_item.get("id"),
+                "reps": set_item.get("reps"),
+                "weight": set_item.get("weight"),
+                "rir": set_item.get("rir"),
+                "rpe": set_item.get("rpe"),
+                "isPR": set_item.get("isPR"),
+                "setNotes": set_item.get("notes"),
+                "volume": set_item.get("volume"),
+            }
+
+
+def iter_export_records(user_id):
+    """
+    Yields (record_type, data) for the profile, exercises, workouts, their
+    flattened sets and PRs, reading each collection lazily with stream().
+    """
+    user_ref = db.collection("users").document(user_id)
+    profile = user_ref.get()
+    if profile.exists:
+        data = profile.to_dict() or {}
+        data["id"] = profile.id
+        yield "profile", data
+
+    for doc in user_ref.collection("exercises").stream():
+        data = doc.to_dict() or {}
+        data["id"] = doc.id
+        yield "exercise", data
+
+    for doc in user_ref.collection("workouts").order_by("date").stream():
+        workout = decode_workout(doc.to_dict() or {})
+        header = {key: value for key, value in workout.items() if key != "exercises"}
+        header["id"] = doc.id
+        yield "workout", header
+        for row in iter_workout_set_rows(doc.id, workout):
+            yield "set", row
+
+    for doc in user_ref.collection("prs").stream():
+        data = doc.to_dict() or {}
+        data["id"] = doc.id
+        yield "pr", data
+
+
+def iter_export_ndjson(user_id, dumps):
+    for record_type, data in iter_export_records(user_id):
+        yield dumps({"type": record_type, "data": data}) + "\n"
+
+
+def iter_export_csv(user_id):
+    """
+    CSV holds one row per set (profile, exercises and PRs have no place in a flat table).
+    """
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=CSV_EXPORT_COLUMNS, extrasaction="ignore")
+    writer.writeheader()
+    for record_type, data in iter_export_records(user_id):
+        if record_type != "set":
+            continue
+        writer.writerow(data)
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate(0)
+    if buffer.tell():
+        yield buffer.getvalue()
+
+
+def gzip_chunks(chunks):
+    """
+    Compresses a stream of text chunks on the fly into a gzip stream.
+    """
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 31)
+    for chunk in chunks:
+        compressed = compressor.compress(chunk.encode("utf-8"))
+        if compressed:
+            yield compressed
+    yield compressor.flush()
@@ -0,0 +1,102 @@
+from datetime import date, datetime
+from flask.json.provider import DefaultJSONProvider
+from helpers.lazy_helpers import lazy_import
+
+try:
+    import orjson
+except ImportError:  # orjson is optional; the stdlib encoder is used without it
+    orjson = None
+
+firestore_v1 = lazy_import("google.cloud.firestore_v1")
+
+HTTP_DATE_WEEKDAYS = ("Mon", "Tue", "Wed", "Thu", "Fri", "Sat", "Sun")
+HTTP_DATE_MONTHS = ("Jan", "Feb", "Mar", "Apr", "May", "Jun", "Jul", "Aug", "Sep", "Oct", "Nov", "Dec")
+
+
+def format_http_date(value):
+    """
+    Same output as werkzeug's http_date for a date or datetime (naive values
+    are taken as UTC), without the email.utils round trip through a timestamp.
+    """
+    if isinstance(value, datetime):
+        offset = value.utcoffset()
+        if offset:
+            value = value - offset
+        hour, minute, second = value.hour, value.minute, value.second
+    else:
+        hour = minute = second = 0
+    return (
+        f"{HTTP_DATE_WEEKDAYS[value.weekday()]}, {value.day:02d} {HTTP_DATE_MONTHS[value.month - 1]} "
+        f"{value.year:04d} {hour:02d}:{minute:02d}:{second:02d} GMT"
+    )
+
+
+class FastJSONProvider(DefaultJSONProvider):
+    """
+    JSON provider that encodes with orjson when it is installed and falls back
+    to Flask's stdlib encoder otherwise (or for payloads orjson rejects, such as
+    integers wider than 64 bits). Output matches the default provider: sorted
+    keys, and datetimes (including Firestore's DatetimeWithNanoseconds) as HTTP
+    dates. Firestore references and geo points are encoded in both paths.
+    """
+
+    @staticmethod
+    def default(o):
+        # Checked first: every Firestore timestamp in a response lands here
+        if isinstance(o, date):
+            return format_http_date(o)
+        if isinstance(o, firestore_v1.DocumentReference):
+            return o.path
+        if isinstance(o, firestore_v1.GeoPoint):
+            return {"latitude": o.latitude, "longitude": o.longitude}
+        return DefaultJSONProvider.default(o)
+
+    def _orjson_options(self):
+        # orjson can only emit RFC 3339, so datetimes pass through to default() to stay
+        # HTTP dates; tests/test_json_helpers.py measures what that costs per timestamp
+        options = orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_NON_STR_KEYS
+        if self.sort_keys:
+            options |= orjson.OPT_SORT_KEYS
+        return options
+
+    def _dumps_bytes(self, obj):
+        """
+        Returns orjson-encoded bytes, or None when the stdlib path must be used.
+        """
+        if orjson is None:
+            return None
+        try:
+            return orjson.dumps(obj, default=self.default, option=self._orjson_options())
+        except orjson.JSONEncodeError:
+            return None
+
+    def dumps(self, obj, **kwargs):
+        if not kwargs:
+            encoded = self._dumps_bytes(obj)
+            if encoded is not None:
+                return encoded.decode("utf-8")
+        return super().dumps(obj, **kwargs)
+
+    def loads(self, s, **kwargs):
+        if orjson is None or kwargs:
+            return super().loads(s, **kwargs)
+        return orjson.loads(s)
+
+    def response(self, *args, **kwargs):
+        # Pretty-printed debug output stays on the stdlib encoder
+        if self.compact is False or (self.compact is None and self._app.debug):
+            return super().response(*args, **kwargs)
+        obj = self._prepare_response_obj(args, kwargs)
+        encoded = self._dumps_bytes(obj)
+        if encoded is None:
+            return super().response(*args, **kwargs)
+        return self._app.response_class(encoded, mimetype=self.mimetype)
+
+
+def install_json_provider(app):
+    """
+    Replaces the app's JSON provider so jsonify and app.json.dumps use FastJSONProvider.
+    """
+    app.json_provider_class = FastJSONProvider
+    app.json = FastJSONProvider(app)
+    return app
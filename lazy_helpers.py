@@ -0,0 +1,71 @@
+import importlib
+import threading
+
+
+class LazyModule:
+    """
+    Stand-in for a module that is imported on first attribute access, so heavy
+    dependencies (firebase_admin, google.cloud, numpy, pytz) load when a request
+    first needs them instead of at cold start.
+    """
+
+    __slots__ = ("_name", "_module", "_lock")
+
+    def __init__(self, name):
+        object.__setattr__(self, "_name", name)
+        object.__setattr__(self, "_module", None)
+        object.__setattr__(self, "_lock", threading.Lock())
+
+    def _load(self):
+        module = self._module
+        if module is None:
+            with self._lock:
+                module = self._module
+                if module is None:
+                    module = importlib.import_module(self._name)
+                    object.__setattr__(self, "_module", module)
+        return module
+
+    def __getattr__(self, name):
+        return getattr(self._load(), name)
+
+    def __repr__(self):
+        state = "loaded" if self._module is not None else "not loaded"
+        return f"<lazy module {self._name!r} ({state})>"
+
+
+def lazy_import(name):
+    return LazyModule(name)
+
+
+class LazyFirestoreClient:
+    """
+    Stand-in for config.db.db. The config module (which initializes firebase_admin
+    and creates the client) is imported on first use; the client is then reused.
+    """
+
+    __slots__ = ("_client", "_lock")
+
+    def __init__(self):
+        object.__setattr__(self, "_client", None)
+        object.__setattr__(self, "_lock", threading.Lock())
+
+    def _resolve(self):
+        client = self._client
+        if client is None:
+            with self._lock:
+                client = self._client
+                if client is None:
+                    from config.db import db as client
+                    object.__setattr__(self, "_client", client)
+        return client
+
+    def __getattr__(self, name):
+        return getattr(self._resolve(), name)
+
+    def __setattr__(self, name, value):
+        setattr(self._resolve(), name, value)
+
+
+# Shared lazily created Firestore client; wrap it with instrument_client in each module
+firestore_client = LazyFirestoreClient()
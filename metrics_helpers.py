@@ -0,0 +1,312 @@
+from flask import Response, request
+from helpers.cache_helpers import template_cache, analytics_cache, search_index_cache, phone_negative_cache
+from helpers.executor_helpers import request_executor, background_executor
+import bisect
+import contextvars
+import threading
+import time
+
+
+# Latency histogram buckets in seconds
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# Methods that return another Firestore object which should stay instrumented
+CHAIN_METHODS = {
+    "collection", "document", "collections", "collection_group",
+    "where", "order_by", "limit", "limit_to_last", "offset", "select",
+    "start_at", "start_after", "end_at", "end_before",
+    "batch", "transaction", "bulk_writer",
+}
+READ_METHODS = {"get", "stream", "get_all"}
+WRITE_METHODS = {"set", "update", "delete", "create"}
+COMMIT_METHODS = {"commit", "_commit", "close", "flush"}
+
+# Objects that only queue writes locally; their writes are counted without latency
+QUEUED_WRITE_KINDS = {"batch", "transaction", "bulk_writer"}
+
+_request_stats = contextvars.ContextVar("firestore_request_stats", default=None)
+
+
+class MetricsRegistry:
+    """
+    Process-wide counters and latency histograms for Firestore operations,
+    plus per-route read/write/commit totals.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.operation_counts = {}
+        self.histograms = {}
+        self.route_totals = {}
+
+    def observe(self, operation, seconds):
+        with self._lock:
+            self.operation_counts[operation] = self.operation_counts.get(operation, 0) + 1
+            histogram = self.histograms.setdefault(operation, {
+                "buckets": [0] * len(LATENCY_BUCKETS),
+                "sum": 0.0,
+                "count": 0,
+            })
+            index = bisect.bisect_left(LATENCY_BUCKETS, seconds)
+            if index < len(LATENCY_BUCKETS):
+                histogram["buckets"][index] += 1
+            histogram["sum"] += seconds
+            histogram["count"] += 1
+
+    def record_request(self, route, stats):
+        with self._lock:
+            totals = self.route_totals.setdefault(route, {"requests": 0, "reads": 0, "writes": 0, "commits": 0})
+            totals["requests"] += 1
+            for key in ("reads", "writes", "commits"):
+                totals[key] += stats[key]
+
+    def render(self):
+        """
+        Renders all metrics in the Prometheus text exposition format.
+        """
+        lines = []
+        with self._lock:
+            lines.append("# HELP firestore_operations_total Firestore operations by type.")
+            lines.append("# TYPE firestore_operations_total counter")
+            for operation, count in sorted(self.operation_counts.items()):
+                lines.append(f'firestore_operations_total{{op="{operation}"}} {count}')
+
+            lines.append("# HELP firestore_operation_duration_seconds Firestore operation latency.")
+            lines.append("# TYPE firestore_operation_duration_seconds histogram")
+            for operation, histogram in sorted(self.histograms.items()):
+                cumulative = 0
+                for bound, bucket_count in zip(LATENCY_BUCKETS, histogram["buckets"]):
+                    cumulative += bucket_count
+                    lines.append(f'firestore_operation_duration_seconds_bucket{{op="{operation}",le="{bound}"}} {cumulative}')
+                lines.append(f'firestore_operation_duration_seconds_bucket{{op="{operation}",le="+Inf"}} {histogram["count"]}')
+                lines.append(f'firestore_operation_duration_seconds_sum{{op="{operation}"}} {histogram["sum"]:.6f}')
+                lines.append(f'firestore_operation_duration_seconds_count{{op="{operation}"}} {histogram["count"]}')
+
+            for key in ("requests", "reads", "writes", "commits"):
+                name = "http_requests_total" if key == "requests" else f"route_firestore_{key}_total"
+                lines.append(f"# TYPE {name} counter")
+                for route, totals in sorted(self.route_totals.items()):
+                    lines.append(f'{name}{{route="{route}"}} {totals[key]}')
+
+        caches = (
+            ("templates", template_cache),
+            ("analytics", analytics_cache),
+            ("search", search_index_cache),
+            ("phoneNegative", phone_negative_cache),
+        )
+        for cache_name, cache in caches:
+            stats = cache.stats()
+            for key in ("hits", "misses", "coalesced"):
+                lines.append(f'cache_{key}_total{{cache="{cache_name}"}} {stats[key]}')
+            lines.append(f'cache_size{{cache="{cache_name}"}} {stats["size"]}')
+
+        for executor in (request_executor, background_executor):
+            stats = executor.stats()
+            pool = executor.name
+            lines.append(f'executor_workers{{pool="{pool}"}} {stats["workers"]}')
+            lines.append(f'executor_active{{pool="{pool}"}} {stats["active"]}')
+            lines.append(f'executor_queued{{pool="{pool}"}} {stats["queued"]}')
+            lines.append(f'executor_submitted_total{{pool="{pool}"}} {stats["submitted"]}')
+            lines.append(f'executor_inline_runs_total{{pool="{pool}"}} {stats["inlineRuns"]}')
+            lines.append(f'executor_timeouts_total{{pool="{pool}"}} {stats["timeouts"]}')
+            lines.append(f'executor_queue_wait_seconds_total{{pool="{pool}"}} {stats["waitSeconds"]:.6f}')
+        return "\n".join(lines) + "\n"
+
+
+metrics = MetricsRegistry()
+
+
+def _count(key, amount=1):
+    stats = _request_stats.get()
+    if stats is not None:
+        stats[key] += amount
+
+
+def _add_duration(seconds):
+    stats = _request_stats.get()
+    if stats is not None:
+        stats["firestore_seconds"] += seconds
+
+
+def _unwrap(value):
+    if isinstance(value, InstrumentedProxy):
+        return value._target
+    if isinstance(value, (list, tuple)):
+        return type(value)(_unwrap(item) for item in value)
+    return value
+
+
+class InstrumentedProxy:
+    """
+    Thin wrapper around the Firestore client and the references, queries and
+    batches it hands out. Reads, writes and commits are counted per request and
+    timed per operation; everything else is passed through untouched.
+    """
+
+    __slots__ = ("_target", "_kind")
+
+    def __init__(self, target, kind="client"):
+        object.__setattr__(self, "_target", target)
+        object.__setattr__(self, "_kind", kind)
+
+    def __setattr__(self, name, value):
+        setattr(self._target, name, value)
+
+    def __eq__(self, other):
+        return self._target == _unwrap(other)
+
+    def __hash__(self):
+        return hash(self._target)
+
+    def __getattr__(self, name):
+        attr = getattr(self._target, name)
+        if not callable(attr):
+            return attr
+        if name in CHAIN_METHODS:
+            return self._wrap_chain(name, attr)
+        if name in READ_METHODS:
+            return self._wrap_read(name, attr)
+        if name in WRITE_METHODS:
+            return self._wrap_write(name, attr)
+        if name in COMMIT_METHODS:
+            return self._wrap_commit(attr)
+
+        def passthrough(*args, **kwargs):
+            return attr(*_unwrap(args), **{key: _unwrap(value) for key, value in kwargs.items()})
+        return passthrough
+
+    def _wrap_chain(self, name, method):
+        kind = name if name in QUEUED_WRITE_KINDS else "ref"
+
+        def call(*args, **kwargs):
+            result = method(*_unwrap(args), **{key: _unwrap(value) for key, value in kwargs.items()})
+            if name == "collections":
+                return (InstrumentedProxy(item, "ref") for item in result)
+            return InstrumentedProxy(result, kind)
+        return call
+
+    def _wrap_read(self, name, method):
+        def call(*args, **kwargs):
+            start = time.perf_counter()
+            result = method(*_unwrap(args), **{key: _unwrap(value) for key, value in kwargs.items()})
+            elapsed = time.perf_counter() - start
+            if hasattr(result, "exists") or not hasattr(result, "__iter__"):
+                metrics.observe(name, elapsed)
+                _add_duration(elapsed)
+                _count("reads")
+                return result
+            if isinstance(result, list):
+                metrics.observe(name, elapsed)
+                _add_duration(elapsed)
+                _count("reads", len(result))
+                return result
+            return self._timed_iterator(name, result, elapsed)
+        return call
+
+    def _timed_iterator(self, name, iterator, elapsed):
+        # Only time spent inside next() counts, not time the caller spends per document
+        try:
+            while True:
+                start = time.perf_counter()
+                try:
+                    item = next(iterator)
+                except StopIteration:
+                    break
+                finally:
+                    elapsed += time.perf_counter() - start
+                _count("reads")
+                yield item
+        finally:
+            metrics.observe(name, elapsed)
+            _add_duration(elapsed)
+
+    def _wrap_write(self, name, method):
+        queued = self._kind in QUEUED_WRITE_KINDS
+
+        def call(*args, **kwargs):
+            _count("writes")
+            if queued:
+                return method(*_unwrap(args), **{key: _unwrap(value) for key, value in kwargs.items()})
+            start = time.perf_counter()
+            try:
+                return method(*_unwrap(args), **{key: _unwrap(value) for key, value in kwargs.items()})
+            finally:
+                elapsed = time.perf_counter() - start
+                metrics.observe(name, elapsed)
+                _add_duration(elapsed)
+        return call
+
+    def _wrap_commit(self, method):
+        def call(*args, **kwargs):
+            _count("commits")
+            start = time.perf_counter()
+            try:
+                return method(*_unwrap(args), **{key: _unwrap(value) for key, value in kwargs.items()})
+            finally:
+                elapsed = time.perf_counter() - start
+                metrics.observe("commit", elapsed)
+                _add_duration(elapsed)
+        return call
+
+
+_instrumented_clients = {}
+
+
+def instrument_client(client):
+    """
+    Returns the shared instrumented wrapper for a Firestore client.
+    """
+    if isinstance(client, InstrumentedProxy):
+        return client
+    wrapper = _instrumented_clients.get(id(client))
+    if wrapper is None:
+        wrapper = _instrumented_clients.setdefault(id(client), InstrumentedProxy(client))
+    return wrapper
+
+
+def install_request_metrics(app):
+    """
+    Adds per-request Firestore accounting, a Server-Timing header and a
+    Prometheus /metrics route to a Flask app.
+    """
+    @app.before_request
+    def start_request_metrics():
+        request.environ["metrics.start"] = time.perf_counter()
+        request.environ["metrics.token"] = _request_stats.set({
+            "reads": 0,
+            "writes": 0,
+            "commits": 0,
+            "firestore_seconds": 0.0,
+        })
+
+    @app.after_request
+    def finish_request_metrics(response):
+        stats = _request_stats.get()
+        if stats is None:
+            return response
+        total_ms = (time.perf_counter() - request.environ["metrics.start"]) * 1000
+        response.headers.add(
+            "Server-Timing",
+            f'firestore;dur={stats["firestore_seconds"] * 1000:.1f};'
+            f'desc="reads={stats["reads"]} writes={stats["writes"]} commits={stats["commits"]}"',
+        )
+        response.headers.add("Server-Timing", f"app;dur={total_ms:.1f}")
+        metrics.record_request(request.url_rule.rule if request.url_rule else "unmatched", stats)
+        return response
+
+    @app.teardown_request
+    def reset_request_metrics(exc=None):
+        token = request.environ.pop("metrics.token", None)
+        if token is None:
+            return
+        try:
+            _request_stats.reset(token)
+        except ValueError:
+            # Streamed responses tear down in a copied context
+            _request_stats.set(None)
+
+    @app.route('/metrics', methods=['GET'])
+    def prometheus_metrics():
+        return Response(metrics.render(), mimetype="text/plain; version=0.0.4")
+
+    return app
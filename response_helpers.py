@@ -0,0 +1,198 @@
+from flask import Response, current_app, stream_with_context
+import hashlib
+import re
+
+MAX_PAGE_SIZE = 500
+
+FIELD_PATH_PATTERN = re.compile(r"^[A-Za-z_][A-Za-z0-9_]*(\.[A-Za-z_][A-Za-z0-9_]*)*$")
+
+
+def parse_page_size(value):
+    """
+    Returns the requested page size, None when pagination was not requested,
+    or raises ValueError for a non-positive or non-numeric value.
+    """
+    if value is None or value == "":
+        return None
+    page_size = int(value)
+    if page_size < 1:
+        raise ValueError("pageSize must be a positive integer")
+    return min(page_size, MAX_PAGE_SIZE)
+
+
+def parse_fields(value):
+    """
+    Parses a comma-separated fields= projection. Returns None when no projection
+    was requested, or the list of field paths ("id" is always returned, so it is
+    dropped). Raises ValueError on a malformed field path.
+    """
+    if value is None:
+        return None
+    fields = []
+    for field in value.split(","):
+        field = field.strip()
+        if not field or field == "id":
+            continue
+        if not FIELD_PATH_PATTERN.match(field):
+            raise ValueError(f"Invalid field path: {field}")
+        if field not in fields:
+            fields.append(field)
+    return fields
+
+
+def parse_ids(value):
+    """
+    Parses a comma-separated ids= list for multi-get routes, dropping blanks and
+    duplicates but keeping the request order. Raises ValueError when no id is
+    given, an id contains "/", or more than MAX_PAGE_SIZE ids are requested.
+    """
+    ids = list(dict.fromkeys(doc_id.strip() for doc_id in (value or "").split(",") if doc_id.strip()))
+    if not ids:
+        raise ValueError("ids must list at least one id")
+    if any("/" in doc_id for doc_id in ids):
+        raise ValueError("ids must not contain '/'")
+    if len(ids) > MAX_PAGE_SIZE:
+        raise ValueError(f"At most {MAX_PAGE_SIZE} ids can be requested at once")
+    return ids
+
+
+def order_by_ids(ids, docs_by_id, missing_item, fields=None):
+    """
+    Builds a multi-get response list in request order. Ids without a document
+    get missing_item(id) in their slot, so callers can report them inline.
+    """
+    items = []
+    for doc_id in ids:
+        doc = docs_by_id.get(doc_id)
+        if doc is None:
+            items.append(missing_item(doc_id))
+        else:
+            items.append(project(snapshot_to_dict(doc), fields))
+    return items
+
+
+def select_fields(query, fields):
+    """
+    Pushes a projection down to Firestore so unselected fields are never read.
+    """
+    if fields is None:
+        return query
+    return query.select(fields)
+
+
+def project(data, fields):
+    """
+    Server-side projection for data that did not come from a select() query
+    (e.g. cached snapshots). Supports dotted paths into nested maps.
+    """
+    if fields is None:
+        return data
+    projected = {}
+    for field in fields:
+        source = data
+        parts = field.split(".")
+        for part in parts:
+            if not isinstance(source, dict) or part not in source:
+                break
+            source = source[part]
+        else:
+            target = projected
+            for part in parts[:-1]:
+                target = target.setdefault(part, {})
+            target[parts[-1]] = source
+    if "id" in data:
+        projected["id"] = data["id"]
+    return projected
+
+
+def wants_ndjson(request):
+    if request.args.get("format", "").lower() == "ndjson":
+        return True
+    return request.accept_mimetypes.best == "application/x-ndjson"
+
+
+def snapshot_to_dict(doc):
+    data = doc.to_dict() or {}
+    data["id"] = doc.id
+    return data
+
+
+def page_query(query, page_size, page_token=None):
+    """
+    Orders by document id and resumes after page_token (the id of the last
+    document of the previous page), so no extra read is needed to resume.
+    One extra document is requested to know whether another page exists.
+    """
+    # firebase_admin.firestore does not re-export FieldPath; "__name__" is the document id path
+    id_field = "__name__"
+    query = query.order_by(id_field)
+    if page_token:
+        query = query.start_after({id_field: page_token})
+    return query.limit(page_size + 1)
+
+
+def split_page(docs, page_size):
+    """
+    Returns (items, next_page_token) for the documents read with page_query.
+    """
+    has_more = len(docs) > page_size
+    docs = docs[:page_size]
+    items = [snapshot_to_dict(doc) for doc in docs]
+    next_page_token = docs[-1].id if has_more and docs else None
+    return items, next_page_token
+
+
+def paginate_query(query, page_size, page_token=None):
+    """
+    Cursor pagination ordered by document id. Returns (items, next_page_token).
+    """
+    return split_page(list(page_query(query, page_size, page_token).stream()), page_size)
+
+
+def ndjson_response(docs):
+    """
+    Streams each snapshot as one JSON line as soon as it is read, so memory
+    stays flat regardless of collection size.
+    """
+    def generate():
+        for doc in docs:
+            yield current_app.json.dumps(snapshot_to_dict(doc)) + "\n"
+
+    return Response(stream_with_context(generate()), mimetype="application/x-ndjson")
+
+
+def snapshot_etag(doc):
+    """
+    Strong ETag for a single document, derived from its Firestore update_time.
+    """
+    token = f"{doc.id}:{getattr(doc, 'update_time', None)}"
+    return hashlib.sha1(token.encode("utf-8")).hexdigest()
+
+
+def collection_etag(docs, *extra):
+    """
+    Digest of (id, update_time) for every document in a list response. Any
+    create, update or delete in the result set changes the digest. Extra values
+    (e.g. query options that change the payload) are folded in as well.
+    """
+    digest = hashlib.sha1()
+    for value in extra:
+        digest.update(f"{value}|".encode("utf-8"))
+    for doc in docs:
+        digest.update(f"{doc.id}:{getattr(doc, 'update_time', None)};".encode("utf-8"))
+    return digest.hexdigest()
+
+
+def is_not_modified(request, etag):
+    return request.if_none_match.contains(etag)
+
+
+def not_modified_response(etag):
+    response = Response(status=304)
+    response.set_etag(etag)
+    return response
+
+
+def with_etag(response, etag):
+    response.set_etag(etag)
+    return response
@@ -0,0 +1,239 @@
+from helpers.lazy_helpers import firestore_client
+from helpers.metrics_helpers import instrument_client
+from helpers.cache_helpers import search_index_cache
+import bisect
+import re
+import threading
+
+# Count and time every Firestore call made through this module
+db = instrument_client(firestore_client)
+
+
+# Searchable fields per index; list fields are indexed element by element
+EXERCISE_SEARCH_FIELDS = ("name", "muscleGroups", "equipment")
+TEMPLATE_SEARCH_FIELDS = ("name", "muscle_group", "equipment", "type")
+
+# Exercise fields kept in the index for filtering but not searched
+EXERCISE_FILTER_FIELDS = ("archived",)
+
+DEFAULT_SEARCH_LIMIT = 20
+
+# Minimum trigram overlap (Jaccard) for a fuzzy token match
+TRIGRAM_THRESHOLD = 0.3
+
+# Scores per query token: whole-token match beats prefix beats trigram
+EXACT_MATCH_SCORE = 3.0
+PREFIX_MATCH_SCORE = 2.0
+TRIGRAM_MATCH_SCORE = 1.0
+
+TOKEN_PATTERN = re.compile(r"[a-z0-9]+")
+
+
+def tokenize(value):
+    """
+    Lower-cased alphanumeric tokens of a string or a list of strings.
+    """
+    if isinstance(value, (list, tuple)):
+        return [token for item in value for token in tokenize(item)]
+    if not isinstance(value, str):
+        return []
+    return TOKEN_PATTERN.findall(value.lower())
+
+
+def trigrams(token):
+    padded = f"  {token} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+class SearchIndex:
+    """
+    Inverted index over a few text fields of a collection. Tokens map to document
+    ids; a sorted token list answers prefix queries with bisect, and a trigram
+    index over tokens answers fuzzy (misspelled) queries.
+    """
+
+    def __init__(self, fields, extra_fields=()):
+        self.fields = fields
+        self.extra_fields = extra_fields
+        self._lock = threading.Lock()
+        self._entries = {}
+        self._postings = {}
+        self._sorted_tokens = []
+        self._trigram_postings = {}
+
+    def _add_token(self, token, doc_id):
+        postings = self._postings.get(token)
+        if postings is None:
+            postings = self._postings[token] = set()
+            bisect.insort(self._sorted_tokens, token)
+            for gram in trigrams(token):
+                self._trigram_postings.setdefault(gram, set()).add(token)
+        postings.add(doc_id)
+
+    def _remove_token(self, token, doc_id):
+        postings = self._postings.get(token)
+        if postings is None:
+            return
+        postings.discard(doc_id)
+        if postings:
+            return
+        del self._postings[token]
+        del self._sorted_tokens[bisect.bisect_left(self._sorted_tokens, token)]
+        for gram in trigrams(token):
+            tokens = self._trigram_postings.get(gram)
+            if tokens is not None:
+                tokens.discard(token)
+                if not tokens:
+                    del self._trigram_postings[gram]
+
+    def _entry_tokens(self, entry):
+        return {token for field in self.fields for token in tokenize(entry.get(field))}
+
+    def upsert(self, doc_id, data, merge=False):
+        """
+        Indexes a document. With merge=True, data may be a partial update and is
+        merged over the indexed copy (unknown documents are then skipped).
+        """
+        with self._lock:
+            previous = self._entries.get(doc_id)
+            if merge and previous is None:
+                return
+            entry = dict(previous) if merge else {}
+            for field in self.fields + self.extra_fields:
+                if field in data:
+                    entry[field] = data[field]
+            old_tokens = self._entry_tokens(previous) if previous else set()
+            new_tokens = self._entry_tokens(entry)
+            for token in old_tokens - new_tokens:
+                self._remove_token(token, doc_id)
+            for token in new_tokens - old_tokens:
+                self._add_token(token, doc_id)
+            self._entries[doc_id] = entry
+
+    def remove(self, doc_id):
+        with self._lock:
+            entry = self._entries.pop(doc_id, None)
+            if entry is None:
+                return
+            for token in self._entry_tokens(entry):
+                self._remove_token(token, doc_id)
+
+    def _match_token(self, query_token):
+        """
+        Returns doc_id -> best score for one query token.
+        """
+        scores = {}
+
+        def add(doc_ids, score):
+            for doc_id in doc_ids:
+                if scores.get(doc_id, 0) < score:
+                    scores[doc_id] = score
+
+        # Walk forward from the insertion point by index; slicing would copy the tail of the list
+        sorted_tokens = self._sorted_tokens
+        index = bisect.bisect_left(sorted_tokens, query_token)
+        while index < len(sorted_tokens) and sorted_tokens[index].startswith(query_token):
+            token = sorted_tokens[index]
+            add(self._postings[token], EXACT_MATCH_SCORE if token == query_token else PREFIX_MATCH_SCORE)
+            index += 1
+
+        if len(query_token) >= 3:
+            query_grams = trigrams(query_token)
+            overlaps = {}
+            for gram in query_grams:
+                for token in self._trigram_postings.get(gram, ()):
+                    overlaps[token] = overlaps.get(token, 0) + 1
+            for token, overlap in overlaps.items():
+                similarity = overlap / (len(query_grams) + len(trigrams(token)) - overlap)
+                if similarity >= TRIGRAM_THRESHOLD:
+                    add(self._postings[token], TRIGRAM_MATCH_SCORE * similarity)
+        return scores
+
+    def search(self, query, limit=DEFAULT_SEARCH_LIMIT, predicate=None):
+        """
+        Returns up to limit {"id", "score", ...indexed fields} dicts matching every
+        query token, best first. predicate(entry) can filter documents out.
+        """
+        query_tokens = list(dict.fromkeys(tokenize(query)))
+        if not query_tokens:
+            return []
+        with self._lock:
+            totals = None
+            for query_token in query_tokens:
+                scores = self._match_token(query_token)
+                if totals is None:
+                    totals = scores
+                else:
+                    totals = {doc_id: totals[doc_id] + score for doc_id, score in scores.items() if doc_id in totals}
+                if not totals:
+                    return []
+            results = []
+            for doc_id, score in totals.items():
+                entry = self._entries[doc_id]
+                if predicate is not None and not predicate(entry):
+                    continue
+                result = {field: entry.get(field) for field in self.fields}
+                result["id"] = doc_id
+                result["score"] = round(score, 3)
+                results.append(result)
+        results.sort(key=lambda result: (-result["score"], str(result.get("name") or "").lower(), result["id"]))
+        return results[:limit]
+
+
+def build_index(query, fields, extra_fields=()):
+    index = SearchIndex(fields, extra_fields)
+    for doc in query.select(list(fields + extra_fields)).stream():
+        index.upsert(doc.id, doc.to_dict() or {})
+    return index
+
+
+def get_exercise_index(user_id):
+    """
+    Returns the user's exercise index, building it from Firestore on first use.
+    """
+    return search_index_cache.get(
+        ("exercises", user_id),
+        lambda: build_index(
+            db.collection("users").document(user_id).collection("exercises"),
+            EXERCISE_SEARCH_FIELDS,
+            EXERCISE_FILTER_FIELDS,
+        ),
+    )
+
+
+def get_template_index():
+    return search_index_cache.get(
+        ("templates",),
+        lambda: build_index(db.collection("workouts"), TEMPLATE_SEARCH_FIELDS),
+    )
+
+
+def index_exercise(user_id, exercise_id, data, merge=False):
+    """
+    Applies an exercise write to the index if it is loaded; an index that is not
+    loaded picks the change up when it is built.
+    """
+    index = search_index_cache.peek(("exercises", user_id))
+    if index is not None:
+        index.upsert(exercise_id, data, merge=merge)
+
+
+def unindex_exercise(user_id, exercise_id):
+    index = search_index_cache.peek(("exercises", user_id))
+    if index is not None:
+        index.remove(exercise_id)
+
+
+def index_template(template_id, data):
+    index = search_index_cache.peek(("templates",))
+    if index is not None:
+        index.upsert(template_id, data)
+
+
+def search_exercises(user_id, query, limit=DEFAULT_SEARCH_LIMIT, include_archived=False):
+    predicate = None if include_archived else (lambda entry: not entry.get("archived"))
+    return get_exercise_index(user_id).search(query, limit, predicate)
+
+
+def search_templates(query, limit=DEFAULT_SEARCH_LIMIT):
+    return get_template_index().search(query, limit)
@@ -0,0 +1,274 @@
+from helpers.lazy_helpers import firestore_client, lazy_import
+from helpers.metrics_helpers import instrument_client
+from helpers.workouts_helpers import decode_workout
+from datetime import datetime, timedelta
+import logging
+
+# Heavy dependencies load on first use rather than at cold start
+firestore = lazy_import("firebase_admin.firestore")
+api_exceptions = lazy_import("google.api_core.exceptions")
+pytz = lazy_import("pytz")
+
+# Count and time every Firestore call made through this module
+db = instrument_client(firestore_client)
+
+
+DATE_FORMAT = "%Y-%m-%d"
+
+# Set when a write may have changed the streak in a way increments cannot
+# express; the next read recomputes lastWorkoutDate and the streaks
+STREAK_DIRTY_FIELD = "streakDirty"
+
+
+def get_summary_ref(user_id):
+    return db.collection("users").document(user_id).collection("stats").document("summary")
+
+
+def get_timezone(timezone_name):
+    try:
+        return pytz.timezone(timezone_name) if timezone_name else pytz.utc
+    except pytz.UnknownTimeZoneError:
+        return pytz.utc
+
+
+def local_date(timezone_name=None):
+    """
+    Today's date (YYYY-MM-DD) in the given IANA timezone, defaulting to UTC.
+    """
+    return datetime.now(get_timezone(timezone_name)).strftime(DATE_FORMAT)
+
+
+def parse_date(value):
+    try:
+        return datetime.strptime(value, DATE_FORMAT).date()
+    except (TypeError, ValueError):
+        return None
+
+
+def compute_workout_volume(exercises):
+    total = 0.0
+    for exercise in exercises or []:
+        if not isinstance(exercise, dict):
+            continue
+        for set_item in exercise.get("sets") or []:
+            if isinstance(set_item, dict) and set_item.get("volume"):
+                total += set_item["volume"]
+    return total
+
+
+def advance_streak(summary, workout_date):
+    """
+    Returns the summary fields after a workout on workout_date. Back-dated
+    workouts cannot be applied incrementally; they mark the streak dirty instead.
+    """
+    last_date = parse_date(summary.get("lastWorkoutDate"))
+    new_date = parse_date(workout_date)
+    streak = summary.get("currentStreak", 0) or 0
+    longest = summary.get("longestStreak", 0) or 0
+    if new_date is None:
+        return {}
+    if last_date is None:
+        streak = 1
+    elif new_date == last_date:
+        return {}
+    elif new_date < last_date:
+        return {STREAK_DIRTY_FIELD: True}
+    elif (new_date - last_date).days == 1:
+        streak += 1
+    else:
+        streak = 1
+    return {
+        "lastWorkoutDate": workout_date,
+        "currentStreak": streak,
+        "longestStreak": max(longest, streak),
+    }
+
+
+def _write_with_summary(transaction, summary_ref, writes, workout_date, volume, timezone_name):
+    snapshot = summary_ref.get(transaction=transaction)
+    summary = (snapshot.to_dict() or {}) if snapshot.exists else {}
+    for ref, data in writes:
+        transaction.set(ref, data)
+    summary_update = {
+        "totalWorkouts": firestore.Increment(1),
+        "totalVolume": firestore.Increment(volume),
+        "updatedAt": firestore.SERVER_TIMESTAMP,
+    }
+    streak_update = advance_streak(summary, workout_date)
+    summary_update.update(streak_update)
+    if "lastWorkoutDate" in streak_update:
+        summary_update["timezone"] = timezone_name
+    transaction.set(summary_ref, summary_update, merge=True)
+
+
+def create_workout_with_summary(user_id, writes, workout_date, volume=0.0, timezone_name=None):
+    """
+    Commits a new workout's writes ((ref, data) pairs) and the summary update
+    in one transaction, so concurrent workouts cannot corrupt the streak.
+    """
+    # Wrapped per call so firebase_admin is not imported at module load
+    firestore.transactional(_write_with_summary)(
+        db.transaction(), get_summary_ref(user_id), writes, workout_date, volume, timezone_name
+    )
+
+
+def _merge_into_summary(transaction, summary_ref, workout_count, volume, timezones_by_date):
+    snapshot = summary_ref.get(transaction=transaction)
+    summary = (snapshot.to_dict() or {}) if snapshot.exists else {}
+    summary_update = {
+        "totalWorkouts": firestore.Increment(workout_count),
+        "totalVolume": firestore.Increment(volume),
+        "updatedAt": firestore.SERVER_TIMESTAMP,
+    }
+    for workout_date in sorted(timezones_by_date):
+        streak_update = advance_streak(summary, workout_date)
+        summary.update(streak_update)
+        summary_update.update(streak_update)
+        if "lastWorkoutDate" in streak_update:
+            summary_update["timezone"] = timezones_by_date[workout_date]
+    transaction.set(summary_ref, summary_update, merge=True)
+
+
+def merge_workouts_into_summary(user_id, workout_count, volume, timezones_by_date):
+    """
+    Applies a set of new workouts (e.g. an import) to the summary in one
+    transaction: counts by Increment, the streak advanced date by date.
+    timezones_by_date maps each workout date (YYYY-MM-DD) to its timezone.
+    """
+    firestore.transactional(_merge_into_summary)(
+        db.transaction(), get_summary_ref(user_id), workout_count, volume, timezones_by_date
+    )
+
+
+def queue_summary_increment(batch, user_id, workouts_delta=0, volume_delta=0.0, streak_dirty=False):
+    """
+    Queues count/volume deltas on an existing batch (used by workout PUT and DELETE).
+    updatedAt is bumped even without deltas: the analytics cache is keyed on
+    the summary's update time, so this is what invalidates it on every worker.
+    Deletes and date changes pass streak_dirty, since removing a day can break
+    a streak anywhere in the history.
+    """
+    summary_update = {
+        "totalWorkouts": firestore.Increment(workouts_delta),
+        "totalVolume": firestore.Increment(volume_delta),
+        "updatedAt": firestore.SERVER_TIMESTAMP,
+    }
+    if streak_dirty:
+        summary_update[STREAK_DIRTY_FIELD] = True
+    batch.set(get_summary_ref(user_id), summary_update, merge=True)
+
+
+def get_summary(user_id):
+    """
+    Reads the summary document. The stored streak is only as of the last
+    workout, so it is reported as 0 once a full day has passed without one.
+    A dirty streak is recomputed from the workout dates first.
+    """
+    snapshot = get_summary_ref(user_id).get()
+    if snapshot.exists and (snapshot.to_dict() or {}).get(STREAK_DIRTY_FIELD):
+        return reconcile_streak(user_id, snapshot)
+    return summary_from_snapshot(snapshot)
+
+
+def reconcile_streak(user_id, snapshot):
+    """
+    Recomputes lastWorkoutDate and the streaks of a dirty summary from the
+    workout dates. The write only applies if the summary is unchanged since
+    snapshot was read; otherwise the flag stays set for the next read.
+    Returns the get_summary response.
+    """
+    workout_query = db.collection("users").document(user_id).collection("workouts").select(["date", "timezone"])
+    streak_fields = compute_streak_fields(doc.to_dict() or {} for doc in workout_query.stream())
+    summary = dict(snapshot.to_dict() or {}, **streak_fields)
+    summary.pop(STREAK_DIRTY_FIELD, None)
+    try:
+        get_summary_ref(user_id).update(
+            dict(streak_fields, **{STREAK_DIRTY_FIELD: firestore.DELETE_FIELD}),
+            option=db.write_option(last_update_time=snapshot.update_time),
+        )
+    except api_exceptions.FailedPrecondition:
+        logging.info(f"Stats summary for user {user_id} changed while reconciling its streak")
+    return summary_response(summary)
+
+
+def summary_from_snapshot(snapshot):
+    """
+    The get_summary response for a read summary snapshot (shared with the async app).
+    """
+    return summary_response((snapshot.to_dict() or {}) if snapshot.exists else {})
+
+
+def summary_response(summary):
+    result = {
+        "totalWorkouts": summary.get("totalWorkouts", 0),
+        "totalVolume": summary.get("totalVolume", 0.0),
+        "lastWorkoutDate": summary.get("lastWorkoutDate"),
+        "currentStreak": summary.get("currentStreak", 0),
+        "longestStreak": summary.get("longestStreak", 0),
+        "timezone": summary.get("timezone"),
+    }
+    last_date = parse_date(result["lastWorkoutDate"])
+    today = parse_date(local_date(result["timezone"]))
+    if last_date is None or (today - last_date).days > 1:
+        result["currentStreak"] = 0
+    return result
+
+
+def compute_streak_fields(workouts):
+    """
+    lastWorkoutDate, timezone and the streaks for workouts (dicts with date and timezone).
+    """
+    dates = set()
+    last_date = None
+    timezone_name = None
+    for workout in workouts:
+        workout_date = parse_date(workout.get("date"))
+        if workout_date is None:
+            continue
+        dates.add(workout_date)
+        if last_date is None or workout_date >= last_date:
+            last_date = workout_date
+            timezone_name = workout.get("timezone") or timezone_name
+
+    longest = 0
+    streak = 0
+    previous = None
+    for workout_date in sorted(dates):
+        streak = streak + 1 if previous and workout_date - previous == timedelta(days=1) else 1
+        longest = max(longest, streak)
+        previous = workout_date
+
+    return {
+        "lastWorkoutDate": last_date.strftime(DATE_FORMAT) if last_date else None,
+        "currentStreak": streak,
+        "longestStreak": longest,
+        "timezone": timezone_name,
+    }
+
+
+def rebuild_summary(user_id):
+    """
+    Reconciliation job: recomputes the summary document from every workout.
+    """
+    workout_query = db.collection("users").document(user_id).collection("workouts").select(
+        ["date", "exercises", "timezone"]
+    )
+    total_workouts = 0
+    total_volume = 0.0
+    workouts = []
+    for doc in workout_query.stream():
+        workout = decode_workout(doc.to_dict() or {})
+        total_workouts += 1
+        total_volume += compute_workout_volume(workout.get("exercises"))
+        workouts.append({"date": workout.get("date"), "timezone": workout.get("timezone")})
+
+    summary = {
+        "totalWorkouts": total_workouts,
+        "totalVolume": total_volume,
+        **compute_streak_fields(workouts),
+        "updatedAt": firestore.SERVER_TIMESTAMP,
+    }
+    get_summary_ref(user_id).set(summary)
+    logging.info(f"Rebuilt stats summary for user {user_id}: {total_workouts} workouts")
+    summary.pop("updatedAt")
+    return summary
@@ -0,0 +1,112 @@
+"""
+Hot-path benchmarks against the in-memory Firestore fake. Each benchmark
+records p50/p99 latency and the Firestore round trips of one request, and
+asserts a round-trip budget so a regression in the access pattern fails the
+suite even when the wall-clock numbers are noisy.
+"""
+import pytest
+
+from conftest import make_exercises
+
+pytestmark = pytest.mark.benchmark
+
+# Per-round-trip latency injected where the number of serial calls matters
+NETWORK_LATENCY = 0.001
+
+
+def seed_user(db, user_id="u1"):
+    db.seed("users", {user_id: {"firstName": "Ada", "phoneNumber": "+15551234567"}})
+
+
+@pytest.mark.parametrize("exercise_count,sets_per_exercise", [(6, 4), (20, 10), (40, 25)])
+def test_workout_post_round_trips_do_not_grow_with_sets(db, bench, workouts_client, exercise_count, sets_per_exercise):
+    seed_user(db)
+    db.latency = NETWORK_LATENCY
+    payload = {"date": "2024-05-01", "exercises": make_exercises(exercise_count, sets_per_exercise)}
+
+    def post():
+        response = workouts_client.post("/users/u1/workouts", json=payload)
+        assert response.status_code == 200
+
+    result = bench.run(
+        f"workout_post[{exercise_count}x{sets_per_exercise}]", post, runs=10,
+        sets=exercise_count * sets_per_exercise,
+    )
+    # PR + history get_all, summary transaction and the workout commit
+    assert result["round_trips"] <= 6
+
+
+@pytest.mark.parametrize("exercise_count", [10, 100, 400])
+def test_start_workout_reads_are_constant(db, bench, workouts_client, exercise_count):
+    from helpers.cache_helpers import template_cache
+
+    seed_user(db)
+    db.seed("users/u1/exercises", {f"ex{index}": {"name": f"Exercise {index}"} for index in range(exercise_count)})
+    db.seed("workouts", {"t1": {"name": "Template", "exercises": [
+        {"exerciseId": f"ex{index}", "order": index} for index in range(exercise_count)
+    ]}})
+    db.latency = NETWORK_LATENCY
+
+    def start():
+        response = workouts_client.post("/users/u1/workouts/start", json={"workout_id": "t1", "date": "2024-05-01"})
+        assert response.status_code == 200
+
+    result = bench.run(
+        f"start_workout[{exercise_count}]", start, runs=10,
+        setup=template_cache.clear, exercises=exercise_count,
+    )
+    # Template read, one get_all for the names, then the summary transaction
+    assert result["rpcs"].get("get", 0) <= 2
+    assert result["rpcs"].get("get_all", 0) <= 1
+    assert result["round_trips"] <= 6
+
+
+@pytest.mark.parametrize("workout_count", [100, 2000])
+def test_list_user_workouts(db, bench, workouts_client, workout_count):
+    seed_user(db)
+    db.seed("users/u1/workouts", {
+        f"w{index:05d}": {"date": f"2024-{index % 12 + 1:02d}-{index % 28 + 1:02d}", "notes": "", "exercises": []}
+        for index in range(workout_count)
+    })
+
+    def list_workouts():
+        response = workouts_client.get("/users/u1/workouts?limit=50")
+        assert response.status_code == 200
+        assert len(response.get_json()) == 50
+
+    result = bench.run(f"list_user_workouts[{workout_count}]", list_workouts, documents=workout_count)
+    assert result["round_trips"] == 1
+
+
+@pytest.mark.parametrize("template_count", [100, 5000])
+def test_list_template_catalog(db, bench, workouts_client, template_count):
+    from helpers.cache_helpers import template_cache
+
+    db.seed("workouts", {f"t{index:05d}": {"name": f"Template {index}", "exercises": []} for index in range(template_count)})
+
+    def list_catalog():
+        response = workouts_client.get("/getAllWorkouts")
+        assert response.status_code == 200
+        assert len(response.get_json()) == template_count
+
+    cold = bench.run(f"get_all_workouts_cold[{template_count}]", list_catalog, runs=5, setup=template_cache.clear)
+    warm = bench.run(f"get_all_workouts_warm[{template_count}]", list_catalog, runs=5)
+    assert cold["round_trips"] == 1
+    assert warm["round_trips"] == 0
+
+
+@pytest.mark.parametrize("candidate_count", [24, 1000])
+def test_pr_updates(db, bench, candidate_count):
+    from helpers.workouts_helpers import update_prs_for_sets
+
+    exercise_count = 10
+    db.seed("users/u1/prs", {f"ex{index}": {"exerciseId": f"ex{index}", "weight": 110.0, "reps": 5} for index in range(0, exercise_count, 2)})
+    candidates = [
+        (f"ex{index % exercise_count}", {"reps": 5, "weight": 100.0 + index % 50, "rir": 2}, "w1", str(index % exercise_count))
+        for index in range(candidate_count)
+    ]
+    db.latency = NETWORK_LATENCY
+
+    result = bench.run(f"update_prs_for_sets[{candidate_count}]", lambda: update_prs_for_sets("u1", candidates), candidates=candidate_count)
+    # One get_all for every affected PR doc and one commit for the winners
+    assert result["round_trips"] <= 2
@@ -0,0 +1,175 @@
+"""
+The backend modules are deployed inside a `helpers` package next to
+config/db.py and error_codes.py, which are not part of this repository.
+This conftest mounts the repository root as that package, points config.db
+at an in-memory FakeFirestore and supplies the error codes the routes use.
+"""
+from pathlib import Path
+import json
+import statistics
+import sys
+import time
+import types
+
+import pytest
+
+from fake_firestore import FakeFirestore
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+BENCH_OUTPUT = REPO_ROOT / "bench_output.txt"
+
+ERROR_CODES = {
+    name: {"code": name, "message": message}
+    for name, message in {
+        "EXERCISE_NOT_FOUND": "Exercise not found",
+        "FIRESTORE_DELETE_FAILED": "Firestore delete failed",
+        "INTERNAL_SERVER_ERROR": "Internal server error",
+        "INVALID_REQUEST": "Invalid request",
+        "NO_DATA_PROVIDED": "No data provided",
+        "USER_CREATION_FAILED": "User creation failed",
+        "USER_DELETE_FAILED": "User delete failed",
+        "USER_NOT_FOUND": "User not found",
+        "USER_UPDATE_FAILED": "User update failed",
+        "WORKOUT_NOT_FOUND": "Workout not found",
+    }.items()
+}
+
+fake_db = FakeFirestore()
+
+
+def install_backend_package(db):
+    helpers = types.ModuleType("helpers")
+    helpers.__path__ = [str(REPO_ROOT)]
+    sys.modules.setdefault("helpers", helpers)
+
+    error_codes = types.ModuleType("helpers.error_codes")
+    error_codes.ERROR_CODES = ERROR_CODES
+    sys.modules.setdefault("helpers.error_codes", error_codes)
+
+    config = types.ModuleType("config")
+    config.__path__ = []
+    config_db = types.ModuleType("config.db")
+    config_db.db = db
+    config.db = config_db
+    sys.modules.setdefault("config", config)
+    sys.modules.setdefault("config.db", config_db)
+
+
+install_backend_package(fake_db)
+
+
+@pytest.fixture(autouse=True)
+def db():
+    """
+    The shared FakeFirestore behind config.db, emptied before every test
+    together with the in-process caches that would otherwise leak state.
+    """
+    from helpers.cache_helpers import template_cache, analytics_cache, search_index_cache, phone_negative_cache
+
+    fake_db.reset()
+    for cache in (template_cache, analytics_cache, search_index_cache, phone_negative_cache):
+        cache.clear()
+    yield fake_db
+    fake_db.reset()
+
+
+@pytest.fixture
+def users_client():
+    from helpers.users import create_users_app
+
+    app = create_users_app()
+    app.testing = True
+    return app.test_client()
+
+
+@pytest.fixture
+def workouts_client():
+    from helpers.workouts import create_workouts_app
+
+    app = create_workouts_app()
+    app.testing = True
+    return app.test_client()
+
+
+def make_exercises(exercise_count, sets_per_exercise, weight=100.0):
+    """
+    Request payload for a workout with exercise_count exercises of sets_per_exercise sets.
+    """
+    return [
+        {
+            "exerciseId": f"ex{exercise_index}",
+            "name": f"Exercise {exercise_index}",
+            "sets": [
+                {"reps": 5 + set_index % 3, "weight": weight + set_index, "rir": 2}
+                for set_index in range(sets_per_exercise)
+            ],
+        }
+        for exercise_index in range(exercise_count)
+    ]
+
+
+def percentile(samples, fraction):
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, max(0, round(fraction * (len(ordered) - 1))))
+    return ordered[index]
+
+
+class BenchRecorder:
+    """
+    Times a callable over several runs and records p50/p99 latency plus the
+    Firestore round trips and document reads/writes of one run.
+    """
+
+    results = []
+
+    def __init__(self, db):
+        self.db = db
+
+    def run(self, name, fn, runs=20, setup=None, **extra):
+        samples = []
+        round_trips = []
+        for _ in range(runs):
+            if setup is not None:
+                setup()
+            self.db.reset_stats()
+            start = time.perf_counter()
+            fn()
+            samples.append(time.perf_counter() - start)
+            round_trips.append(self.db.round_trips)
+        result = {
+            "name": name,
+            "runs": runs,
+            "p50_ms": round(percentile(samples, 0.5) * 1000, 3),
+            "p99_ms": round(percentile(samples, 0.99) * 1000, 3),
+            "mean_ms": round(statistics.fmean(samples) * 1000, 3),
+            "round_trips": max(round_trips),
+            "rpcs": dict(self.db.stats["round_trips"]),
+            "documents_read": self.db.stats["documents_read"],
+            "documents_written": self.db.stats["documents_written"],
+        }
+        result.update(extra)
+        BenchRecorder.results.append(result)
+        return result
+
+    def record(self, name, **values):
+        result = {"name": name}
+        result.update(values)
+        BenchRecorder.results.append(result)
+        return result
+
+
+@pytest.fixture
+def bench(db):
+    return BenchRecorder(db)
+
+
+def pytest_terminal_summary(terminalreporter):
+    if not BenchRecorder.results:
+        return
+    terminalreporter.section("benchmarks")
+    for result in BenchRecorder.results:
+        values = " ".join(f"{key}={value}" for key, value in result.items() if key not in ("name", "rpcs"))
+        terminalreporter.write_line(f"{result['name']}: {values}")
+    with open(BENCH_OUTPUT, "w", encoding="utf-8") as output:
+        for result in BenchRecorder.results:
+            output.write(json.dumps(result, default=str) + "\n")
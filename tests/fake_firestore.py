@@ -0,0 +1,1106 @@
+"""
+In-memory stand-in for the google-cloud-firestore client surface used by the
+backend modules: collections, documents, queries (where / order_by / limit /
+select / cursors / stream), get_all, batches, transactions, bulk writers and
+write options. Every call that would be a network round trip is counted per
+RPC and can be slowed down with an injected latency, so tests can assert how
+many round trips a route costs and benchmarks can model a real network.
+"""
+from datetime import datetime, timedelta, timezone
+import asyncio
+import bisect
+import itertools
+import random
+import string
+import threading
+import time
+
+from google.api_core import exceptions
+from google.cloud.firestore_v1 import transforms
+
+
+DOCUMENT_ID = "__name__"
+
+# Firestore's commit limit; larger batches are rejected like the real service
+MAX_WRITES_PER_COMMIT = 500
+
+# Writes the real BulkWriter sends per BatchWrite RPC
+BULK_WRITER_BATCH_SIZE = 20
+
+AUTO_ID_ALPHABET = string.ascii_letters + string.digits
+
+
+def _copy(value):
+    # Faster than copy.deepcopy for the plain dict/list trees stored in documents
+    if isinstance(value, dict):
+        return {key: _copy(item) for key, item in value.items()}
+    if isinstance(value, list):
+        return [_copy(item) for item in value]
+    return value
+
+
+def _get_field(data, field_path):
+    value = data
+    for part in field_path.split("."):
+        if not isinstance(value, dict) or part not in value:
+            raise KeyError(field_path)
+        value = value[part]
+    return value
+
+
+def _set_field(data, field_path, value):
+    parts = field_path.split(".")
+    target = data
+    for part in parts[:-1]:
+        if not isinstance(target.get(part), dict):
+            target[part] = {}
+        target = target[part]
+    target[parts[-1]] = value
+
+
+def _delete_field(data, field_path):
+    parts = field_path.split(".")
+    target = data
+    for part in parts[:-1]:
+        target = target.get(part)
+        if not isinstance(target, dict):
+            return
+    target.pop(parts[-1], None)
+
+
+def _type_rank(value):
+    """
+    Firestore's cross-type ordering: null < bool < number < timestamp < string < array < map.
+    """
+    if value is None:
+        return 0
+    if isinstance(value, bool):
+        return 1
+    if isinstance(value, (int, float)):
+        return 2
+    if isinstance(value, datetime):
+        return 3
+    if isinstance(value, str):
+        return 4
+    if isinstance(value, (bytes, bytearray)):
+        return 5
+    if isinstance(value, list):
+        return 8
+    if isinstance(value, dict):
+        return 9
+    return 10
+
+
+def _sort_key(value):
+    rank = _type_rank(value)
+    if rank in (0, 10):
+        return (rank, 0)
+    if rank == 8:
+        return (rank, tuple(_sort_key(item) for item in value))
+    if rank == 9:
+        return (rank, tuple(sorted((key, _sort_key(item)) for key, item in value.items())))
+    return (rank, value)
+
+
+def _compare(left, right):
+    left_key, right_key = _sort_key(left), _sort_key(right)
+    return (left_key > right_key) - (left_key < right_key)
+
+
+def _matches(value, op, operand):
+    if op == "==":
+        return _type_rank(value) == _type_rank(operand) and value == operand
+    if op == "!=":
+        return value is not None and value != operand
+    if op == "in":
+        return any(_matches(value, "==", item) for item in operand)
+    if op == "not-in":
+        return value is not None and not any(_matches(value, "==", item) for item in operand)
+    if op == "array-contains":
+        return isinstance(value, list) and operand in value
+    if op == "array-contains-any":
+        return isinstance(value, list) and any(item in value for item in operand)
+    # Range filters only match values of the same type
+    if _type_rank(value) != _type_rank(operand):
+        return False
+    comparison = _compare(value, operand)
+    return {
+        "<": comparison < 0,
+        "<=": comparison <= 0,
+        ">": comparison > 0,
+        ">=": comparison >= 0,
+    }[op]
+
+
+class ExistsOption:
+    def __init__(self, exists):
+        self.exists = exists
+
+
+class LastUpdateOption:
+    def __init__(self, last_update_time):
+        self.last_update_time = last_update_time
+
+
+class WriteResult:
+    def __init__(self, update_time):
+        self.update_time = update_time
+
+
+class _Document:
+    __slots__ = ("data", "create_time", "update_time")
+
+    def __init__(self, data, create_time, update_time):
+        self.data = data
+        self.create_time = create_time
+        self.update_time = update_time
+
+
+class _Collection:
+    """
+    Documents of one collection plus a lazily rebuilt sorted id list. Deletes
+    leave stale ids in the list (skipped on iteration) so they stay O(1).
+    """
+
+    __slots__ = ("docs", "sorted_ids", "stale")
+
+    def __init__(self):
+        self.docs = {}
+        self.sorted_ids = None
+        self.stale = 0
+
+    def ids(self):
+        if self.sorted_ids is None or self.stale > len(self.docs):
+            self.sorted_ids = sorted(self.docs)
+            self.stale = 0
+        return self.sorted_ids
+
+
+class FakeDocumentSnapshot:
+    def __init__(self, reference, data, create_time=None, update_time=None, read_time=None):
+        self.reference = reference
+        self._data = data
+        self.create_time = create_time
+        self.update_time = update_time
+        self.read_time = read_time
+
+    @property
+    def id(self):
+        return self.reference.id
+
+    @property
+    def exists(self):
+        return self._data is not None
+
+    def to_dict(self):
+        return _copy(self._data) if self._data is not None else None
+
+    def get(self, field_path):
+        if self._data is None:
+            return None
+        return _copy(_get_field(self._data, field_path))
+
+    def __repr__(self):
+        return f"<FakeDocumentSnapshot {self.reference.path} exists={self.exists}>"
+
+
+class FakeQuery:
+    """
+    Immutable query over one collection; every builder method returns a new query.
+    """
+
+    def __init__(self, client, collection_path, filters=(), orders=(), limit=None, projection=None,
+                 start=None, end=None):
+        self._client = client
+        self._collection_path = collection_path
+        self._filters = filters
+        self._orders = orders
+        self._limit = limit
+        self._projection = projection
+        self._start = start
+        self._end = end
+
+    def _with(self, **changes):
+        values = {
+            "filters": self._filters,
+            "orders": self._orders,
+            "limit": self._limit,
+            "projection": self._projection,
+            "start": self._start,
+            "end": self._end,
+        }
+        values.update(changes)
+        return FakeQuery(self._client, self._collection_path, **values)
+
+    def where(self, field_path=None, op_string=None, value=None, filter=None):
+        if filter is not None:
+            field_path, op_string, value = filter.field_path, filter.op_string, filter.value
+        return self._with(filters=self._filters + ((field_path, op_string, value),))
+
+    def order_by(self, field_path, direction="ASCENDING"):
+        return self._with(orders=self._orders + ((str(field_path), direction),))
+
+    def limit(self, count):
+        return self._with(limit=count)
+
+    def select(self, field_paths):
+        return self._with(projection=list(field_paths))
+
+    def start_at(self, document_fields_or_snapshot):
+        return self._with(start=(document_fields_or_snapshot, True))
+
+    def start_after(self, document_fields_or_snapshot):
+        return self._with(start=(document_fields_or_snapshot, False))
+
+    def end_at(self, document_fields_or_snapshot):
+        return self._with(end=(document_fields_or_snapshot, True))
+
+    def end_before(self, document_fields_or_snapshot):
+        return self._with(end=(document_fields_or_snapshot, False))
+
+    def _normalized_orders(self):
+        # Results are always ordered by document id last, in the last explicit direction
+        orders = list(self._orders)
+        # Inequality filters imply an order on their field when none is given
+        if not orders:
+            for field_path, op, _ in self._filters:
+                if op in ("<", "<=", ">", ">=", "!=", "not-in"):
+                    orders.append((field_path, "ASCENDING"))
+                    break
+        if not orders or orders[-1][0] != DOCUMENT_ID:
+            direction = orders[-1][1] if orders else "ASCENDING"
+            orders.append((DOCUMENT_ID, direction))
+        return orders
+
+    def _cursor_values(self, cursor, orders):
+        values, inclusive = cursor
+        if isinstance(values, FakeDocumentSnapshot):
+            snapshot = values
+            result = []
+            for field_path, _ in orders:
+                result.append(snapshot.id if field_path == DOCUMENT_ID else _get_field(snapshot._data or {}, field_path))
+            return result, inclusive
+        if isinstance(values, dict):
+            result = []
+            for field_path, _ in orders:
+                if field_path in values:
+                    value = values[field_path]
+                    if field_path == DOCUMENT_ID and isinstance(value, FakeDocumentReference):
+                        value = value.id
+                    result.append(value)
+            return result, inclusive
+        return [value.id if isinstance(value, FakeDocumentReference) else value for value in values], inclusive
+
+    def _order_key(self, doc_id, data, orders):
+        key = []
+        for field_path, direction in orders:
+            value = doc_id if field_path == DOCUMENT_ID else _get_field(data, field_path)
+            key.append((_sort_key(value), direction))
+        return key
+
+    @staticmethod
+    def _compare_to_cursor(doc_values, cursor_values, orders):
+        for value, cursor_value, (_, direction) in zip(doc_values, cursor_values, orders):
+            comparison = _compare(value, cursor_value)
+            if direction == "DESCENDING":
+                comparison = -comparison
+            if comparison:
+                return comparison
+        return 0
+
+    def _filter_match(self, data):
+        for field_path, op, operand in self._filters:
+            try:
+                value = _get_field(data, field_path)
+            except KeyError:
+                return False
+            if not _matches(value, op, operand):
+                return False
+        return True
+
+    def _is_id_scan(self):
+        orders = self._normalized_orders()
+        return not self._filters and orders == [(DOCUMENT_ID, "ASCENDING")] and self._end is None
+
+    def _iter_matches(self):
+        """
+        Yields (doc_id, _Document) in query order, without projection or latency.
+        """
+        collection = self._client._collections.get(self._collection_path)
+        if collection is None:
+            return
+        orders = self._normalized_orders()
+
+        if self._is_id_scan():
+            # Fast path for plain scans and id-cursor paging: walk the sorted ids lazily
+            with self._client._lock:
+                ids = collection.ids()
+            position = 0
+            if self._start is not None:
+                cursor_values, inclusive = self._cursor_values(self._start, orders)
+                if cursor_values:
+                    search = bisect.bisect_left if inclusive else bisect.bisect_right
+                    position = search(ids, cursor_values[0])
+            returned = 0
+            for doc_id in itertools.islice(ids, position, None):
+                if self._limit is not None and returned >= self._limit:
+                    return
+                document = collection.docs.get(doc_id)
+                if document is None:
+                    continue
+                returned += 1
+                yield doc_id, document
+            return
+
+        with self._client._lock:
+            candidates = []
+            for doc_id, document in collection.docs.items():
+                if not self._filter_match(document.data):
+                    continue
+                try:
+                    values = [doc_id if field == DOCUMENT_ID else _get_field(document.data, field) for field, _ in orders]
+                except KeyError:
+                    # Documents without an order_by field are not returned
+                    continue
+                candidates.append((values, doc_id, document))
+
+        def sort_key(candidate):
+            return [
+                _ReverseKey(_sort_key(value)) if direction == "DESCENDING" else _sort_key(value)
+                for value, (_, direction) in zip(candidate[0], orders)
+            ]
+
+        candidates.sort(key=sort_key)
+        if self._start is not None:
+            cursor_values, inclusive = self._cursor_values(self._start, orders)
+            candidates = [
+                candidate for candidate in candidates
+                if (comparison := self._compare_to_cursor(candidate[0], cursor_values, orders)) > 0
+                or (inclusive and comparison == 0)
+            ]
+        if self._end is not None:
+            cursor_values, inclusive = self._cursor_values(self._end, orders)
+            candidates = [
+                candidate for candidate in candidates
+                if (comparison := self._compare_to_cursor(candidate[0], cursor_values, orders)) < 0
+                or (inclusive and comparison == 0)
+            ]
+        if self._limit is not None:
+            candidates = candidates[:self._limit]
+        for _, doc_id, document in candidates:
+            yield doc_id, document
+
+    def _snapshot(self, doc_id, document, read_time):
+        reference = FakeDocumentReference(self._client, f"{self._collection_path}/{doc_id}")
+        data = document.data
+        if self._projection is not None:
+            projected = {}
+            for field_path in self._projection:
+                try:
+                    _set_field(projected, field_path, _copy(_get_field(data, field_path)))
+                except KeyError:
+                    pass
+            data = projected
+        else:
+            data = _copy(data)
+        return FakeDocumentSnapshot(reference, data, document.create_time, document.update_time, read_time)
+
+    def stream(self, transaction=None, **kwargs):
+        self._client._round_trip("run_query")
+        read_time = self._client._now()
+        for doc_id, document in self._iter_matches():
+            self._client._count_read()
+            yield self._snapshot(doc_id, document, read_time)
+
+    def get(self, transaction=None, **kwargs):
+        return list(self.stream(transaction=transaction))
+
+
+class _ReverseKey:
+    __slots__ = ("key",)
+
+    def __init__(self, key):
+        self.key = key
+
+    def __lt__(self, other):
+        return other.key < self.key
+
+    def __eq__(self, other):
+        return self.key == other.key
+
+
+class FakeCollectionReference(FakeQuery):
+    def __init__(self, client, path):
+        super().__init__(client, path)
+        self._path = path
+
+    @property
+    def id(self):
+        return self._path.rsplit("/", 1)[-1]
+
+    @property
+    def path(self):
+        return self._path
+
+    @property
+    def parent(self):
+        if "/" not in self._path:
+            return None
+        return FakeDocumentReference(self._client, self._path.rsplit("/", 1)[0])
+
+    def document(self, document_id=None):
+        if document_id is None:
+            document_id = "".join(self._client._random.choice(AUTO_ID_ALPHABET) for _ in range(20))
+        return FakeDocumentReference(self._client, f"{self._path}/{document_id}")
+
+    def add(self, document_data, document_id=None):
+        reference = self.document(document_id)
+        write_result = reference.create(document_data)
+        return write_result.update_time, reference
+
+    def list_documents(self, page_size=None):
+        collection = self._client._collections.get(self._path)
+        if collection is None:
+            return
+        with self._client._lock:
+            ids = list(collection.ids())
+        for doc_id in ids:
+            if doc_id in collection.docs:
+                yield self.document(doc_id)
+
+    def __eq__(self, other):
+        return isinstance(other, FakeCollectionReference) and other._path == self._path
+
+    def __hash__(self):
+        return hash(("collection", self._path))
+
+    def __repr__(self):
+        return f"<FakeCollectionReference {self._path}>"
+
+
+class FakeDocumentReference:
+    def __init__(self, client, path):
+        self._client = client
+        self._path = path
+
+    @property
+    def id(self):
+        return self._path.rsplit("/", 1)[-1]
+
+    @property
+    def path(self):
+        return self._path
+
+    @property
+    def parent(self):
+        return FakeCollectionReference(self._client, self._path.rsplit("/", 1)[0])
+
+    def collection(self, collection_id):
+        return FakeCollectionReference(self._client, f"{self._path}/{collection_id}")
+
+    def collections(self, page_size=None):
+        self._client._round_trip("list_collection_ids")
+        prefix = self._path + "/"
+        with self._client._lock:
+            names = sorted({
+                path[len(prefix):] for path, collection in self._client._collections.items()
+                if path.startswith(prefix) and "/" not in path[len(prefix):] and collection.docs
+            })
+        return [self.collection(name) for name in names]
+
+    def get(self, field_paths=None, transaction=None, **kwargs):
+        if transaction is not None:
+            transaction._check_read()
+        self._client._round_trip("get")
+        snapshot = self._client._snapshot(self, field_paths)
+        if transaction is not None:
+            transaction._record_read(self._path, snapshot.update_time)
+        return snapshot
+
+    def set(self, document_data, merge=False):
+        return self._client._commit([("set", self, document_data, merge)])[0]
+
+    def update(self, field_updates, option=None):
+        return self._client._commit([("update", self, field_updates, option)])[0]
+
+    def create(self, document_data):
+        return self._client._commit([("create", self, document_data, None)])[0]
+
+    def delete(self, option=None):
+        return self._client._commit([("delete", self, None, option)])[0].update_time
+
+    def __eq__(self, other):
+        return isinstance(other, FakeDocumentReference) and other._path == self._path
+
+    def __hash__(self):
+        return hash(("document", self._path))
+
+    def __repr__(self):
+        return f"<FakeDocumentReference {self._path}>"
+
+
+class FakeWriteBatch:
+    def __init__(self, client):
+        self._client = client
+        self._writes = []
+
+    def set(self, reference, document_data, merge=False):
+        self._writes.append(("set", reference, _copy(document_data), merge))
+
+    def update(self, reference, field_updates, option=None):
+        self._writes.append(("update", reference, _copy(field_updates), option))
+
+    def create(self, reference, document_data):
+        self._writes.append(("create", reference, _copy(document_data), None))
+
+    def delete(self, reference, option=None):
+        self._writes.append(("delete", reference, None, option))
+
+    def __len__(self):
+        return len(self._writes)
+
+    def commit(self, **kwargs):
+        writes, self._writes = self._writes, []
+        return self._client._commit(writes)
+
+
+class FakeTransaction(FakeWriteBatch):
+    """
+    Optimistic transaction: the versions of documents read inside it are checked
+    at commit, and a concurrent change aborts the commit (firestore.transactional
+    then retries the function), as the real service does under contention.
+    """
+
+    def __init__(self, client, max_attempts=5, read_only=False):
+        super().__init__(client)
+        self._max_attempts = max_attempts
+        self._read_only = read_only
+        self._id = None
+        self._read_versions = {}
+
+    @property
+    def in_progress(self):
+        return self._id is not None
+
+    @property
+    def id(self):
+        return self._id
+
+    def _check_read(self):
+        if self._writes:
+            raise ValueError("Attempted read after write in a transaction.")
+
+    def _record_read(self, path, update_time):
+        self._read_versions.setdefault(path, update_time)
+
+    def _clean_up(self):
+        self._writes = []
+        self._read_versions = {}
+        self._id = None
+
+    def _begin(self, retry_id=None):
+        self._client._round_trip("begin_transaction")
+        self._id = next(self._client._transaction_ids)
+
+    def _rollback(self):
+        if self._id is not None:
+            self._client._round_trip("rollback")
+        self._clean_up()
+
+    def _commit(self):
+        writes, read_versions = self._writes, self._read_versions
+        try:
+            return self._client._commit(writes, read_versions=read_versions)
+        finally:
+            self._clean_up()
+
+    def commit(self, **kwargs):
+        return self._commit()
+
+
+class FakeBulkWriteFailure:
+    """
+    Argument of a BulkWriter on_write_error callback, like BulkWriteFailure.
+    """
+
+    def __init__(self, write, attempts, error):
+        self.operation = write
+        self.attempts = attempts
+        self.code = getattr(error, "grpc_status_code", None)
+        self.message = str(error)
+
+
+class FakeBulkWriter:
+    """
+    Applies writes individually (a BulkWriter is not atomic), sending one
+    BatchWrite round trip per BULK_WRITER_BATCH_SIZE queued writes. Failed
+    writes go to the on_write_error callback, which returns True to retry;
+    the default retries 15 times like the real writer.
+    """
+
+    def __init__(self, client, options=None):
+        self._client = client
+        self.options = options
+        self._queue = []
+        self._error_callback = FakeBulkWriter._default_on_error
+        self.failures = []
+
+    @staticmethod
+    def _default_on_error(failure, bulk_writer):
+        return failure.attempts < 15
+
+    def on_write_error(self, callback):
+        self._error_callback = callback or FakeBulkWriter._default_on_error
+
+    def _enqueue(self, write):
+        self._queue.append(write)
+        if len(self._queue) >= BULK_WRITER_BATCH_SIZE:
+            self.flush()
+
+    def set(self, reference, document_data, merge=False):
+        self._enqueue(("set", reference, _copy(document_data), merge))
+
+    def update(self, reference, field_updates, option=None):
+        self._enqueue(("update", reference, _copy(field_updates), option))
+
+    def create(self, reference, document_data):
+        self._enqueue(("create", reference, _copy(document_data), None))
+
+    def delete(self, reference, option=None):
+        self._enqueue(("delete", reference, None, option))
+
+    def flush(self):
+        pending = [(write, 1) for write in self._queue]
+        self._queue = []
+        while pending:
+            try:
+                self._client._round_trip("batch_write")
+                rpc_error = None
+            except exceptions.GoogleAPICallError as e:
+                # A failed RPC fails every write it carried
+                rpc_error = e
+            retry = []
+            for write, attempts in pending:
+                error = rpc_error
+                if error is None:
+                    try:
+                        self._client._apply_writes([write])
+                        continue
+                    except exceptions.GoogleAPICallError as e:
+                        error = e
+                if self._error_callback(FakeBulkWriteFailure(write, attempts, error), self):
+                    retry.append((write, attempts + 1))
+                else:
+                    self.failures.append((write, error))
+            pending = retry
+
+    def close(self):
+        self.flush()
+
+
+class FakeFirestore:
+    """
+    In-memory Firestore client. Tune latency (seconds per round trip, or a
+    callable taking the RPC name) to model a network; stats counts round trips
+    per RPC plus documents read and written.
+    """
+
+    def __init__(self, latency=0.0, seed=0):
+        self.latency = latency
+        self._lock = threading.RLock()
+        self._random = random.Random(seed)
+        self._transaction_ids = itertools.count(1)
+        self._collections = {}
+        self._clock = datetime(2024, 1, 1, tzinfo=timezone.utc)
+        self._faults = []
+        self.stats = {}
+        self.reset_stats()
+
+    # -- test controls -------------------------------------------------
+
+    def reset(self):
+        """
+        Drops all data, counters, injected faults and latency.
+        """
+        with self._lock:
+            self._collections = {}
+            self._faults = []
+        self.latency = 0.0
+        self.reset_stats()
+
+    def reset_stats(self):
+        with self._lock:
+            self.stats = {"round_trips": {}, "documents_read": 0, "documents_written": 0}
+
+    @property
+    def round_trips(self):
+        return sum(self.stats["round_trips"].values())
+
+    def rpc_count(self, rpc):
+        return self.stats["round_trips"].get(rpc, 0)
+
+    def inject_fault(self, rpc, after=0, times=1, exception=None):
+        """
+        Makes the next `times` calls of rpc fail once `after` calls have succeeded.
+        """
+        with self._lock:
+            self._faults.append({
+                "rpc": rpc,
+                "after": after,
+                "times": times,
+                "exception": exception or exceptions.ServiceUnavailable(f"Injected {rpc} failure"),
+            })
+
+    def seed(self, collection_path, documents):
+        """
+        Inserts {doc_id: data} into a collection directly, without round trips
+        or transforms. Used to build large fixtures quickly.
+        """
+        with self._lock:
+            collection = self._collections.setdefault(collection_path, _Collection())
+            now = self._tick()
+            for doc_id, data in documents.items():
+                collection.docs[doc_id] = _Document(data, now, now)
+            collection.sorted_ids = None
+
+    def document_data(self, path):
+        collection_path, doc_id = path.rsplit("/", 1)
+        collection = self._collections.get(collection_path)
+        document = collection.docs.get(doc_id) if collection else None
+        return _copy(document.data) if document else None
+
+    def collection_size(self, collection_path):
+        collection = self._collections.get(collection_path)
+        return len(collection.docs) if collection else 0
+
+    def total_documents(self, prefix=""):
+        with self._lock:
+            return sum(
+                len(collection.docs) for path, collection in self._collections.items()
+                if path == prefix or path.startswith(prefix)
+            )
+
+    # -- client surface ------------------------------------------------
+
+    def collection(self, collection_path):
+        return FakeCollectionReference(self, collection_path)
+
+    def document(self, document_path):
+        return FakeDocumentReference(self, document_path)
+
+    def collections(self):
+        with self._lock:
+            names = sorted({path for path, collection in self._collections.items() if "/" not in path and collection.docs})
+        return [self.collection(name) for name in names]
+
+    def batch(self):
+        return FakeWriteBatch(self)
+
+    def transaction(self, max_attempts=5, read_only=False):
+        return FakeTransaction(self, max_attempts=max_attempts, read_only=read_only)
+
+    def bulk_writer(self, options=None):
+        return FakeBulkWriter(self, options)
+
+    @staticmethod
+    def write_option(**kwargs):
+        if "exists" in kwargs:
+            return ExistsOption(kwargs["exists"])
+        if "last_update_time" in kwargs:
+            return LastUpdateOption(kwargs["last_update_time"])
+        raise TypeError(f"Unsupported write option: {kwargs}")
+
+    def get_all(self, references, field_paths=None, transaction=None, **kwargs):
+        """
+        One round trip for any number of documents. Like Firestore, results do not
+        come back in request order, and duplicate references are read once.
+        """
+        if transaction is not None:
+            transaction._check_read()
+        unique = list(dict.fromkeys(references))
+        self._round_trip("get_all")
+        snapshots = [self._snapshot(reference, field_paths) for reference in unique]
+        if transaction is not None:
+            for snapshot in snapshots:
+                transaction._record_read(snapshot.reference.path, snapshot.update_time)
+        return iter(reversed(snapshots))
+
+    # -- internals -----------------------------------------------------
+
+    def _tick(self):
+        # Strictly increasing commit timestamps, so update_time always changes on write
+        self._clock = max(self._clock + timedelta(microseconds=1), datetime.now(timezone.utc))
+        return self._clock
+
+    def _now(self):
+        return self._clock
+
+    def _round_trip(self, rpc):
+        delay, failure = self._start_round_trip(rpc)
+        if delay:
+            time.sleep(delay)
+        if failure is not None:
+            raise failure
+
+    def _start_round_trip(self, rpc):
+        """
+        Counts one round trip and returns (latency to wait, injected exception or None).
+        """
+        with self._lock:
+            counts = self.stats["round_trips"]
+            counts[rpc] = counts.get(rpc, 0) + 1
+            failure = None
+            for fault in self._faults:
+                if fault["rpc"] != rpc or fault["times"] <= 0:
+                    continue
+                if fault["after"] > 0:
+                    fault["after"] -= 1
+                    continue
+                fault["times"] -= 1
+                failure = fault["exception"]
+                break
+        latency = self.latency(rpc) if callable(self.latency) else self.latency
+        return latency, failure
+
+    def _count_read(self, amount=1):
+        with self._lock:
+            self.stats["documents_read"] += amount
+
+    def _snapshot(self, reference, field_paths=None):
+        collection_path, doc_id = reference.path.rsplit("/", 1)
+        with self._lock:
+            collection = self._collections.get(collection_path)
+            document = collection.docs.get(doc_id) if collection else None
+            self.stats["documents_read"] += 1
+            read_time = self._clock
+            if document is None:
+                return FakeDocumentSnapshot(reference, None, read_time=read_time)
+            data = document.data
+            if field_paths is not None:
+                projected = {}
+                for field_path in field_paths:
+                    try:
+                        _set_field(projected, field_path, _get_field(data, field_path))
+                    except KeyError:
+                        pass
+                data = projected
+            return FakeDocumentSnapshot(reference, _copy(data), document.create_time, document.update_time, read_time)
+
+    def _commit(self, writes, read_versions=None):
+        if len(writes) > MAX_WRITES_PER_COMMIT:
+            raise exceptions.InvalidArgument(f"maximum {MAX_WRITES_PER_COMMIT} writes allowed per request")
+        self._round_trip("commit")
+        with self._lock:
+            for path, update_time in (read_versions or {}).items():
+                collection_path, doc_id = path.rsplit("/", 1)
+                collection = self._collections.get(collection_path)
+                document = collection.docs.get(doc_id) if collection else None
+                if (document.update_time if document else None) != update_time:
+                    raise exceptions.Aborted(f"Transaction lock timeout: {path} changed")
+            return self._apply_writes(writes)
+
+    def _apply_writes(self, writes):
+        """
+        Checks every precondition, then applies all writes at one commit time.
+        """
+        with self._lock:
+            # Documents as they will be after each earlier write in the same commit
+            pending = {}
+
+            def current(reference):
+                if reference.path in pending:
+                    return pending[reference.path]
+                collection_path, doc_id = reference.path.rsplit("/", 1)
+                collection = self._collections.get(collection_path)
+                document = collection.docs.get(doc_id) if collection else None
+                return document
+
+            for kind, reference, data, option in writes:
+                document = current(reference)
+                if kind == "create" and document is not None:
+                    raise exceptions.AlreadyExists(f"Document already exists: {reference.path}")
+                if kind == "update" and document is None:
+                    raise exceptions.NotFound(f"No document to update: {reference.path}")
+                if isinstance(option, ExistsOption) and option.exists != (document is not None):
+                    if option.exists:
+                        raise exceptions.NotFound(f"No document to {kind}: {reference.path}")
+                    raise exceptions.AlreadyExists(f"Document already exists: {reference.path}")
+                if isinstance(option, LastUpdateOption):
+                    if document is None or document.update_time != option.last_update_time:
+                        raise exceptions.FailedPrecondition(
+                            f"The last update time of {reference.path} does not match the precondition"
+                        )
+                pending[reference.path] = None if kind == "delete" else (document or _Document({}, None, None))
+
+            commit_time = self._tick()
+            results = []
+            for kind, reference, data, option in writes:
+                collection_path, doc_id = reference.path.rsplit("/", 1)
+                collection = self._collections.setdefault(collection_path, _Collection())
+                document = collection.docs.get(doc_id)
+                if kind == "delete":
+                    if document is not None:
+                        del collection.docs[doc_id]
+                        collection.stale += 1
+                    self.stats["documents_written"] += 1
+                    results.append(WriteResult(commit_time))
+                    continue
+                if kind == "update":
+                    new_data = _copy(document.data)
+                    self._apply_fields(new_data, document.data, data, commit_time, dotted=True)
+                elif kind == "set" and merge_requested(option):
+                    new_data = _copy(document.data) if document else {}
+                    self._merge(new_data, document.data if document else {}, data, commit_time)
+                else:
+                    new_data = {}
+                    self._apply_fields(new_data, {}, data, commit_time, dotted=False)
+                if document is None:
+                    collection.docs[doc_id] = _Document(new_data, commit_time, commit_time)
+                    if collection.sorted_ids is not None:
+                        collection.sorted_ids = None
+                else:
+                    document.data = new_data
+                    document.update_time = commit_time
+                self.stats["documents_written"] += 1
+                results.append(WriteResult(commit_time))
+            return results
+
+    def _transform(self, value, previous, commit_time):
+        if value is transforms.SERVER_TIMESTAMP:
+            return commit_time
+        if isinstance(value, transforms.Increment):
+            base = previous if isinstance(previous, (int, float)) and not isinstance(previous, bool) else 0
+            return base + value.value
+        if isinstance(value, transforms.Maximum):
+            return value.value if not isinstance(previous, (int, float)) else max(previous, value.value)
+        if isinstance(value, transforms.Minimum):
+            return value.value if not isinstance(previous, (int, float)) else min(previous, value.value)
+        if isinstance(value, transforms.ArrayUnion):
+            base = list(previous) if isinstance(previous, list) else []
+            return base + [item for item in value.values if item not in base]
+        if isinstance(value, transforms.ArrayRemove):
+            base = list(previous) if isinstance(previous, list) else []
+            return [item for item in base if item not in value.values]
+        if isinstance(value, dict):
+            previous = previous if isinstance(previous, dict) else {}
+            result = {}
+            for key, item in value.items():
+                if item is transforms.DELETE_FIELD:
+                    continue
+                result[key] = self._transform(item, previous.get(key), commit_time)
+            return result
+        if isinstance(value, list):
+            return [self._transform(item, None, commit_time) for item in value]
+        return _copy(value)
+
+    def _apply_fields(self, target, previous, data, commit_time, dotted):
+        for key, value in data.items():
+            if dotted and "." in key:
+                try:
+                    old = _get_field(previous, key)
+                except KeyError:
+                    old = None
+                if value is transforms.DELETE_FIELD:
+                    _delete_field(target, key)
+                else:
+                    _set_field(target, key, self._transform(value, old, commit_time))
+                continue
+            if value is transforms.DELETE_FIELD:
+                target.pop(key, None)
+                continue
+            target[key] = self._transform(value, previous.get(key) if isinstance(previous, dict) else None, commit_time)
+
+    def _merge(self, target, previous, data, commit_time):
+        # set(merge=True) merges nested maps instead of replacing them
+        for key, value in data.items():
+            if value is transforms.DELETE_FIELD:
+                target.pop(key, None)
+            elif isinstance(value, dict) and isinstance(target.get(key), dict):
+                self._merge(target[key], previous.get(key) or {}, value, commit_time)
+            else:
+                target[key] = self._transform(value, previous.get(key), commit_time)
+
+
+def merge_requested(option):
+    return option is True or isinstance(option, list)
+
+
+class FakeAsyncDocumentReference:
+    def __init__(self, async_client, reference):
+        self._async_client = async_client
+        self._reference = reference
+
+    @property
+    def id(self):
+        return self._reference.id
+
+    @property
+    def path(self):
+        return self._reference.path
+
+    def collection(self, collection_id):
+        return FakeAsyncQuery(self._async_client, self._reference.collection(collection_id))
+
+    async def get(self, field_paths=None, **kwargs):
+        client = self._async_client.sync_client
+        await self._async_client._round_trip("get")
+        return client._snapshot(self._reference, field_paths)
+
+    def __eq__(self, other):
+        return isinstance(other, FakeAsyncDocumentReference) and other.path == self.path
+
+    def __hash__(self):
+        return hash(self.path)
+
+
+class FakeAsyncQuery:
+    def __init__(self, async_client, query):
+        self._async_client = async_client
+        self._query = query
+
+    def __getattr__(self, name):
+        builder = getattr(self._query, name)
+
+        def build(*args, **kwargs):
+            return FakeAsyncQuery(self._async_client, builder(*args, **kwargs))
+        return build
+
+    def document(self, document_id=None):
+        return FakeAsyncDocumentReference(self._async_client, self._query.document(document_id))
+
+    async def stream(self, **kwargs):
+        client = self._async_client.sync_client
+        await self._async_client._round_trip("run_query")
+        read_time = client._now()
+        for doc_id, document in self._query._iter_matches():
+            client._count_read()
+            yield self._query._snapshot(doc_id, document, read_time)
+
+    async def get(self, **kwargs):
+        return [snapshot async for snapshot in self.stream()]
+
+
+class FakeAsyncFirestore:
+    """
+    AsyncClient counterpart sharing a FakeFirestore's data and counters; the
+    injected latency is awaited with asyncio.sleep instead of blocking a thread.
+    """
+
+    def __init__(self, sync_client):
+        self.sync_client = sync_client
+
+    async def _round_trip(self, rpc):
+        delay, failure = self.sync_client._start_round_trip(rpc)
+        if delay:
+            await asyncio.sleep(delay)
+        if failure is not None:
+            raise failure
+
+    def collection(self, collection_path):
+        return FakeAsyncQuery(self, self.sync_client.collection(collection_path))
+
+    async def get_all(self, references, field_paths=None, **kwargs):
+        await self._round_trip("get_all")
+        unique = list(dict.fromkeys(reference._reference for reference in references))
+        for reference in reversed(unique):
+            yield self.sync_client._snapshot(reference, field_paths)
@@ -0,0 +1,114 @@
+from datetime import date, timedelta
+
+import pytest
+
+from conftest import make_exercises
+
+
+def seed_daily_training(db, days, exercise_count=6, sets_per_exercise=4, start=date(2020, 1, 1)):
+    from helpers.workouts_helpers import normalize_workout_exercises
+
+    exercises, _ = normalize_workout_exercises("seed", make_exercises(exercise_count, sets_per_exercise))
+    db.seed("users/u1/workouts", {
+        f"w{day:05d}": {"date": (start + timedelta(days=day)).isoformat(), "exercises": exercises}
+        for day in range(days)
+    })
+    db.seed("users/u1/exercises", {
+        f"ex{index}": {"name": f"Exercise {index}", "muscleGroups": ["legs"] if index % 2 else ["chest", "triceps"]}
+        for index in range(exercise_count)
+    })
+    db.seed("users/u1/stats", {"summary": {"totalWorkouts": days}})
+
+
+def test_analytics_cache_hit_costs_one_small_read(db):
+    from helpers.analytics_helpers import get_training_analytics
+
+    seed_daily_training(db, 14)
+    first = get_training_analytics("u1")
+    db.reset_stats()
+
+    assert get_training_analytics("u1") is first
+    assert db.stats["round_trips"] == {"get_all": 1}
+    assert first["totalSets"] == 14 * 6 * 4
+    assert first["muscleGroupVolume"]["chest"] == first["muscleGroupVolume"]["triceps"]
+
+
+def test_write_from_another_worker_invalidates_analytics(db):
+    from helpers.analytics_helpers import get_training_analytics
+    from helpers.stats_helpers import queue_summary_increment
+
+    seed_daily_training(db, 7)
+    before = get_training_analytics("u1")
+
+    # Another worker deletes a workout: no local invalidate_training_analytics call here
+    batch = db.batch()
+    batch.delete(db.collection("users/u1/workouts").document("w00000"))
+    queue_summary_increment(batch, "u1", workouts_delta=-1)
+    batch.commit()
+
+    after = get_training_analytics("u1")
+    assert after["totalSets"] == before["totalSets"] - 6 * 4
+
+
+def test_exercise_update_invalidates_muscle_group_volume(db, workouts_client):
+    seed_daily_training(db, 3)
+    before = workouts_client.get("/users/u1/analytics").get_json()
+    assert "back" not in before["muscleGroupVolume"]
+
+    response = workouts_client.put("/users/u1/exercises/ex0", json={"muscleGroups": ["back"]})
+    assert response.status_code == 200
+    assert db.rpc_count("commit") == 1
+
+    after = workouts_client.get("/users/u1/analytics").get_json()
+    assert after["muscleGroupVolume"]["back"] > 0
+
+
+def test_exercise_write_on_another_worker_invalidates_analytics(db, workouts_client):
+    from helpers.analytics_helpers import get_training_analytics, queue_analytics_version_bump
+
+    seed_daily_training(db, 3)
+    before = get_training_analytics("u1")
+
+    # Another worker edits muscle groups: no local invalidate_training_analytics call here
+    batch = db.batch()
+    batch.update(db.collection("users/u1/exercises").document("ex0"), {"muscleGroups": ["back"]})
+    queue_analytics_version_bump(batch, "u1")
+    batch.commit()
+
+    after = get_training_analytics("u1")
+    assert "back" not in before["muscleGroupVolume"] and after["muscleGroupVolume"]["back"] > 0
+
+
+def test_exercise_writes_do_not_create_a_stats_summary(db, workouts_client):
+    db.seed("users/u2/exercises", {"ex0": {"name": "Bench Press"}})
+
+    assert workouts_client.put("/users/u2/exercises/ex0", json={"muscleGroups": ["chest"]}).status_code == 200
+    assert workouts_client.delete("/users/u2/exercises/ex0").status_code == 200
+    assert db.document_data("users/u2/stats/summary") is None
+
+
+@pytest.mark.benchmark
+def test_five_years_of_daily_training(db, bench):
+    from helpers.analytics_helpers import get_training_analytics
+    from helpers.cache_helpers import analytics_cache
+
+    days = 5 * 365 + 1
+    seed_daily_training(db, days)
+
+    cold = bench.run(
+        "training_analytics_5y_cold", lambda: get_training_analytics("u1"), runs=5,
+        setup=analytics_cache.clear, workouts=days, sets=days * 24,
+    )
+    warm = bench.run("training_analytics_5y_warm", lambda: get_training_analytics("u1"), runs=20)
+    one_year = bench.run(
+        "training_analytics_1y_range_cold",
+        lambda: get_training_analytics("u1", "2023-01-01", "2023-12-31"), runs=5, setup=analytics_cache.clear,
+    )
+
+    result = get_training_analytics("u1")
+    assert result["totalSets"] == days * 24
+    assert len(result["weeklyVolume"]) >= 5 * 52
+    assert cold["rpcs"] == {"get_all": 1, "run_query": 2}
+    assert warm["rpcs"] == {"get_all": 1}
+    assert one_year["documents_read"] < cold["documents_read"] / 4
+    assert warm["p50_ms"] * 20 < cold["p50_ms"]
@@ -0,0 +1,209 @@
+import asyncio
+import json
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+# Concurrent clients per burst and the per-round-trip latency that makes them overlap
+CONCURRENT_REQUESTS = 32
+NETWORK_LATENCY = 0.005
+
+SINCE = datetime(2024, 1, 1, tzinfo=timezone.utc)
+
+
+def seed_sync_data(db, user_id="u1"):
+    changed = SINCE + timedelta(days=1)
+    db.seed(f"users/{user_id}/workouts", {
+        f"w{index}": {"date": "2024-05-01", "updatedAt": changed + timedelta(minutes=index)} for index in range(20)
+    })
+    db.seed(f"users/{user_id}/exercises", {f"ex{index}": {"name": f"Exercise {index}", "updatedAt": changed}
+                                           for index in range(10)})
+    db.seed(f"users/{user_id}/prs", {"ex0": {"weight": 100.0, "updatedAt": SINCE - timedelta(days=1)}})
+    db.seed(f"users/{user_id}/tombstones", {"t1": {
+        "collection": "workouts", "docId": "gone", "deletedAt": changed + timedelta(hours=2),
+    }})
+
+
+def async_workouts_app(db):
+    from fake_firestore import FakeAsyncFirestore
+    from helpers.async_apps import create_async_workouts_app
+
+    return create_async_workouts_app(client_factory=lambda: FakeAsyncFirestore(db))
+
+
+def async_users_app(db):
+    from fake_firestore import FakeAsyncFirestore
+    from helpers.async_apps import create_async_users_app
+
+    return create_async_users_app(client_factory=lambda: FakeAsyncFirestore(db))
+
+
+def parse_body(text):
+    # Flask's orjson provider and Quart's json module differ only in whitespace
+    return [json.loads(line) for line in text.splitlines()]
+
+
+async def quart_responses(app, paths):
+    async with app.test_app() as test_app:
+        client = test_app.test_client()
+        return [(response.status_code, response.headers.get("ETag"), parse_body(await response.get_data(as_text=True)))
+                for response in [await client.get(path) for path in paths]]
+
+
+def assert_same_responses(flask_client, app, paths):
+    flask = [(response.status_code, response.headers.get("ETag"), parse_body(response.get_data(as_text=True)))
+             for response in (flask_client.get(path) for path in paths)]
+    assert asyncio.run(quart_responses(app, paths)) == flask
+    return flask
+
+
+async def quart_get_all(app, path, count):
+    async with app.test_app() as test_app:
+        client = test_app.test_client()
+        responses = await asyncio.gather(*(client.get(path) for _ in range(count)))
+        return [await response.get_json() for response in responses]
+
+
+def test_sync_merge_is_shared_by_flask_and_async_routes(db, workouts_client):
+    seed_sync_data(db)
+    path = "/users/u1/sync?since=2024-01-01T00:00:00Z"
+
+    flask_changes = workouts_client.get(path).get_json()
+    [async_changes] = asyncio.run(quart_get_all(async_workouts_app(db), path, 1))
+
+    assert async_changes == flask_changes
+    assert flask_changes["deleted"] == [{"collection": "workouts", "id": "gone"}]
+    assert flask_changes["watermark"] == (SINCE + timedelta(days=1, hours=2)).isoformat()
+    assert [len(flask_changes[name]) for name in ("workouts", "exercises", "prs")] == [20, 10, 0]
+
+
+def test_async_workout_read_routes_match_flask(db, workouts_client):
+    from conftest import make_exercises
+
+    db.seed("workouts", {f"t{index}": {"name": f"Bench day {index}", "type": "strength"} for index in range(5)})
+    db.seed("users/u1/exercises", {"ex0": {"name": "Bench Press", "archived": False}})
+    for date in ("2024-05-01", "2024-05-02", "2024-05-04"):
+        assert workouts_client.post("/users/u1/workouts", json={
+            "date": date, "exercises": make_exercises(2, 3),
+        }).status_code == 200
+
+    paths = [
+        "/users/u1/workouts",
+        "/users/u1/workouts?startDate=2024-05-02&limit=1&fields=date",
+        "/users/u1/workouts?fields=a..b",
+        "/users/u1/exercises/ex0/history",
+        "/users/u1/exercises/missing/history",
+        "/users/u1/exercises/search?q=bench",
+        "/users/u1/exercises/search?q=",
+        "/users/u1/stats/summary",
+        "/users/nobody/stats/summary",
+        "/users/u1/analytics?startDate=2024-05-01&endDate=2024-05-31",
+        "/getAllWorkouts",
+        "/getAllWorkouts?fields=name",
+        "/getAllWorkouts?pageSize=2",
+        "/getAllWorkouts?pageSize=2&pageToken=t1",
+        "/getAllWorkouts?pageSize=0",
+        "/getAllWorkouts?format=ndjson",
+        "/searchWorkouts?q=bench&limit=3",
+        "/searchWorkouts?q=bench&limit=x",
+    ]
+    responses = dict(zip(paths, assert_same_responses(workouts_client, async_workouts_app(db), paths)))
+
+    assert [status for status, _, _ in responses.values()].count(400) == 4
+    assert responses["/users/u1/stats/summary"][2][0]["totalWorkouts"] == 3
+    assert len(responses["/users/u1/exercises/ex0/history"][2][0]["sessions"]) == 3
+    assert [workout["date"] for workout in responses["/users/u1/workouts"][2][0]] == ["2024-05-04", "2024-05-02", "2024-05-01"]
+    assert len(responses["/getAllWorkouts?format=ndjson"][2]) == 5
+    assert responses["/getAllWorkouts?pageSize=2&pageToken=t1"][2][0]["nextPageToken"] == "t3"
+
+
+def test_async_get_users_paginates_and_streams_like_flask(db, users_client):
+    db.seed("users", {f"u{index}": {"name": f"User {index}"} for index in range(5)})
+
+    paths = [
+        "/getUsers",
+        "/getUsers?pageSize=2",
+        "/getUsers?pageSize=2&pageToken=u3&fields=name",
+        "/getUsers?pageSize=-1",
+        "/getUsers?format=ndjson",
+        "/getUsers?ids=u4,missing,u0&fields=name",
+    ]
+    responses = assert_same_responses(users_client, async_users_app(db), paths)
+
+    assert responses[2][2] == [{"items": [{"id": "u4", "name": "User 4"}], "nextPageToken": None}]
+    assert responses[3][0] == 400
+    assert len(responses[4][2]) == 5
+
+
+def test_default_async_client_initializes_firebase_through_config(monkeypatch):
+    import sys
+    import types
+    from importlib.machinery import ModuleSpec
+
+    from helpers import async_apps
+
+    calls = []
+
+    class ConfigLoader:
+        @staticmethod
+        def create_module(spec):
+            return None
+
+        @staticmethod
+        def exec_module(module):
+            calls.append("initialize_app")
+
+    class ConfigFinder:
+        @staticmethod
+        def find_spec(name, path=None, target=None):
+            return ModuleSpec(name, ConfigLoader()) if name == "config.db" else None
+
+    # Make config.db importable afresh, as on a cold worker
+    monkeypatch.delitem(sys.modules, "config.db")
+    monkeypatch.setattr(sys.modules["config"], "db", sys.modules["config"].db)
+    monkeypatch.setattr(sys, "meta_path", [ConfigFinder()] + sys.meta_path)
+    monkeypatch.setattr(async_apps, "firestore_async", types.SimpleNamespace(
+        client=lambda: calls.append("client") or "async client",
+    ))
+
+    assert async_apps.default_async_client() == "async client"
+    assert calls == ["initialize_app", "client"]
+
+
+@pytest.mark.benchmark
+def test_sync_concurrency_flask_threads_vs_async(db, bench, workouts_client):
+    seed_sync_data(db)
+    db.latency = NETWORK_LATENCY
+    path = "/users/u1/sync?since=2024-01-01T00:00:00Z"
+    app = async_workouts_app(db)
+
+    def flask_burst():
+        with ThreadPoolExecutor(max_workers=CONCURRENT_REQUESTS) as pool:
+            responses = list(pool.map(lambda _: workouts_client.get(path), range(CONCURRENT_REQUESTS)))
+        assert all(response.status_code == 200 for response in responses)
+
+    def async_burst():
+        results = asyncio.run(quart_get_all(app, path, CONCURRENT_REQUESTS))
+        assert all(result["watermark"] for result in results)
+
+    flask = bench.run("sync_burst_flask_threads", flask_burst, runs=5, requests=CONCURRENT_REQUESTS)
+    quart = bench.run("sync_burst_quart_async", async_burst, runs=5, requests=CONCURRENT_REQUESTS)
+
+    # Four queries per request either way; only how they wait differs
+    assert flask["round_trips"] == quart["round_trips"] == 4 * CONCURRENT_REQUESTS
+    # One event loop must keep up with a thread per request
+    assert quart["p50_ms"] < flask["p50_ms"] * 2
+
+
+def test_async_check_user_by_phone_falls_back_to_users_query(db):
+    db.seed("users", {"u1": {"phoneNumber": "+15551234567"}})
+    app = async_users_app(db)
+
+    async def check(phone):
+        async with app.test_app() as test_app:
+            response = await test_app.test_client().post("/checkUserByPhone", json={"phoneNumber": phone})
+            return await response.get_json()
+
+    assert asyncio.run(check("(555) 123-4567")) == {"exists": True}
+    assert asyncio.run(check("555 000 0000")) == {"exists": False}
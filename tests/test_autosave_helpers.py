@@ -0,0 +1,144 @@
+import time
+
+import pytest
+
+from conftest import make_exercises
+
+
+@pytest.fixture
+def autosave(monkeypatch):
+    from helpers import autosave_helpers
+
+    # Long enough that no timer fires during a test; flushes are explicit
+    monkeypatch.setattr(autosave_helpers, "AUTOSAVE_DEBOUNCE_SECONDS", 60.0)
+    yield autosave_helpers
+    for key in list(autosave_helpers._pending_autosaves):
+        autosave_helpers.discard_workout_autosave(*key)
+
+
+def seed_workout(db, notes=""):
+    db.seed("users/u1/workouts", {"w1": {"date": "2024-05-01", "notes": notes, "exercises": []}})
+
+
+def test_burst_of_autosaves_is_one_write(db, autosave, workouts_client):
+    seed_workout(db)
+    for index in range(5):
+        response = workouts_client.put("/users/u1/workouts/w1?autosave=1", json={"notes": f"draft {index}"})
+        assert response.status_code == 202
+        assert response.get_json()["pendingEdits"] == index + 1
+    # Only the first PUT of a burst reads the workout's update time
+    assert db.stats["round_trips"] == {"get": 1}
+
+    autosave.flush_pending_autosaves()
+    assert db.rpc_count("commit") == 1
+    assert db.document_data("users/u1/workouts/w1")["notes"] == "draft 4"
+
+
+def test_autosave_after_another_workers_flush_is_not_dropped(db, autosave, workouts_client):
+    seed_workout(db)
+    workouts_client.put("/users/u1/workouts/w1?autosave=1", json={"notes": "later edit", "exercises": make_exercises(1, 3)})
+
+    # Another worker flushes an earlier edit of the same burst first
+    autosave.apply_workout_update("u1", "w1", {"timezone": "UTC", "exercises": make_exercises(2, 1)})
+
+    autosave.flush_pending_autosaves()
+    stored = db.document_data("users/u1/workouts/w1")
+    assert (stored["notes"], stored["timezone"]) == ("later edit", "UTC")
+    assert len(stored["exercises"]) == 1
+    assert db.collection_size("users/u1/prs") == 2
+
+
+def test_explicit_save_merges_pending_autosave(db, autosave, workouts_client):
+    seed_workout(db)
+    workouts_client.put("/users/u1/workouts/w1?autosave=1", json={"notes": "draft", "timezone": "Europe/Oslo"})
+    db.collection("users/u1/workouts").document("w1").update({"timezone": "UTC"})
+
+    response = workouts_client.put("/users/u1/workouts/w1", json={"notes": "final"})
+    assert response.status_code == 200
+    stored = db.document_data("users/u1/workouts/w1")
+    assert (stored["notes"], stored["timezone"]) == ("final", "Europe/Oslo")
+
+
+def test_concurrent_write_between_read_and_commit_is_retried(db, autosave, monkeypatch):
+    seed_workout(db)
+    original = autosave.get_workout_ref
+    raced = []
+
+    def racing_get_workout_ref(user_id, workout_id):
+        result = original(user_id, workout_id)
+        if not raced:
+            raced.append(True)
+            db.collection("users/u1/workouts").document("w1").update({"notes": "from the web"})
+        return result
+
+    monkeypatch.setattr(autosave, "get_workout_ref", racing_get_workout_ref)
+    assert autosave.apply_workout_update("u1", "w1", {"exercises": make_exercises(1, 2)})
+
+    stored = db.document_data("users/u1/workouts/w1")
+    assert (stored["notes"], len(stored["exercises"])) == ("from the web", 1)
+    # The racing write, the rejected batch and the retried one
+    assert db.rpc_count("commit") == 3
+
+
+def test_failed_workout_write_leaves_no_pr_or_history_writes(db, autosave):
+    seed_workout(db)
+    db.inject_fault("commit", times=1)
+
+    with pytest.raises(Exception):
+        autosave.save_workout_now("u1", "w1", {"exercises": make_exercises(2, 2)})
+    assert db.collection_size("users/u1/prs") == 0
+    assert db.collection_size("users/u1/exerciseHistory") == 0
+    assert db.document_data("users/u1/workouts/w1")["exercises"] == []
+
+
+def test_failed_flush_keeps_edits_and_reports_the_error(db, autosave, workouts_client):
+    seed_workout(db)
+    workouts_client.put("/users/u1/workouts/w1?autosave=1", json={"exercises": make_exercises(1, 1)})
+    db.inject_fault("commit", times=1)
+    autosave.flush_pending_autosaves()
+    assert db.document_data("users/u1/workouts/w1")["exercises"] == []
+
+    response = workouts_client.put("/users/u1/workouts/w1?autosave=1", json={"notes": "next"})
+    assert response.status_code == 202
+    assert response.get_json()["autosaveError"]
+
+    autosave.flush_pending_autosaves()
+    stored = db.document_data("users/u1/workouts/w1")
+    assert (stored["notes"], len(stored["exercises"])) == ("next", 1)
+
+
+def test_read_flushes_fresh_autosave(db, autosave, workouts_client):
+    seed_workout(db)
+    workouts_client.put("/users/u1/workouts/w1?autosave=1", json={"exercises": make_exercises(2, 2)})
+
+    workout = workouts_client.get("/users/u1/workouts/w1").get_json()
+    assert len(workout["exercises"]) == 2
+    assert db.collection_size("users/u1/prs") == 2
+    assert autosave._pending_autosaves == {}
+
+
+def test_autosave_for_missing_workout(db, autosave, workouts_client):
+    response = workouts_client.put("/users/u1/workouts/missing?autosave=1", json={"notes": "x"})
+    assert response.status_code == 404
+    assert response.get_json()["code"] == "WORKOUT_NOT_FOUND"
+
+
+def test_debounce_disabled_writes_immediately(db, autosave, monkeypatch, workouts_client):
+    monkeypatch.setattr(autosave, "AUTOSAVE_DEBOUNCE_SECONDS", 0.0)
+    seed_workout(db)
+
+    response = workouts_client.put("/users/u1/workouts/w1?autosave=1", json={"notes": "now"})
+    assert response.status_code == 202
+    assert db.document_data("users/u1/workouts/w1")["notes"] == "now"
+    assert autosave._pending_autosaves == {}
+
+
+def test_timer_flushes_after_quiet_period(db, autosave, monkeypatch, workouts_client):
+    monkeypatch.setattr(autosave, "AUTOSAVE_DEBOUNCE_SECONDS", 0.05)
+    seed_workout(db)
+    workouts_client.put("/users/u1/workouts/w1?autosave=1", json={"notes": "later"})
+
+    deadline = time.monotonic() + 5
+    while db.document_data("users/u1/workouts/w1")["notes"] != "later" and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert db.document_data("users/u1/workouts/w1")["notes"] == "later"
@@ -0,0 +1,74 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+THREADS_PER_KEY = 8
+
+
+def wait_for(condition, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        if time.monotonic() > deadline:
+            raise AssertionError("condition not met in time")
+        time.sleep(0.001)
+
+
+def concurrent_gets(cache, keys, loader):
+    """
+    Calls cache.get from THREADS_PER_KEY threads per key; returns (key, value or exception) per call.
+    """
+    def call(key):
+        try:
+            return key, cache.get(key, lambda: loader(key))
+        except Exception as e:
+            return key, e
+
+    with ThreadPoolExecutor(max_workers=THREADS_PER_KEY * len(keys)) as pool:
+        return list(pool.map(call, [key for key in keys for _ in range(THREADS_PER_KEY)]))
+
+
+def test_concurrent_misses_share_one_load_per_key():
+    from helpers.cache_helpers import TTLCache
+
+    cache = TTLCache()
+    keys = ["a", "b", "c"]
+    calls = []
+    calls_lock = threading.Lock()
+
+    def loader(key):
+        with calls_lock:
+            calls.append(key)
+        # Hold every load open until all other callers are waiting on one
+        wait_for(lambda: cache.stats()["coalesced"] == len(keys) * (THREADS_PER_KEY - 1))
+        return {"key": key}
+
+    results = concurrent_gets(cache, keys, loader)
+
+    assert sorted(calls) == keys
+    assert all(value == {"key": key} for key, value in results)
+    # Every caller of a key gets the one loaded object
+    assert len({id(value) for _, value in results}) == len(keys)
+    assert cache.stats() == {"size": 3, "hits": 0, "misses": 3 * THREADS_PER_KEY, "coalesced": 3 * (THREADS_PER_KEY - 1)}
+    assert cache.get("a", lambda: pytest.fail("cached value was reloaded")) == {"key": "a"}
+
+
+def test_waiters_get_the_loader_exception_and_nothing_is_cached():
+    from helpers.cache_helpers import TTLCache
+
+    cache = TTLCache()
+    calls = []
+
+    def loader(key):
+        calls.append(key)
+        wait_for(lambda: cache.stats()["coalesced"] == THREADS_PER_KEY - 1)
+        raise RuntimeError("backend down")
+
+    results = concurrent_gets(cache, ["a"], loader)
+
+    assert calls == ["a"]
+    assert all(isinstance(value, RuntimeError) and str(value) == "backend down" for _, value in results)
+    assert cache.stats()["size"] == 0
+    # The failed load is not remembered; the next miss loads again
+    assert cache.get("a", lambda: "recovered") == "recovered"
@@ -0,0 +1,176 @@
+from concurrent.futures import ThreadPoolExecutor
+import time
+
+import pytest
+from google.api_core import exceptions
+from google.cloud.firestore_v1 import transforms
+import firebase_admin.firestore as firestore
+
+
+def test_set_get_and_round_trips(db):
+    ref = db.collection("users").document("u1")
+    ref.set({"name": "Ada", "stats": {"workouts": 1}})
+
+    snapshot = ref.get()
+    assert snapshot.exists
+    assert snapshot.to_dict() == {"name": "Ada", "stats": {"workouts": 1}}
+    assert snapshot.update_time is not None
+    assert db.rpc_count("commit") == 1
+    assert db.rpc_count("get") == 1
+
+    # to_dict returns a copy, like the real client
+    snapshot.to_dict()["name"] = "changed"
+    assert ref.get().to_dict()["name"] == "Ada"
+
+
+def test_transforms_and_merge(db):
+    ref = db.collection("users").document("u1")
+    ref.set({"count": 1, "tags": ["a"], "nested": {"keep": 1}})
+    ref.set({
+        "count": transforms.Increment(2),
+        "tags": transforms.ArrayUnion(["a", "b"]),
+        "nested": {"added": 2},
+        "at": transforms.SERVER_TIMESTAMP,
+    }, merge=True)
+
+    data = ref.get().to_dict()
+    assert data["count"] == 3
+    assert data["tags"] == ["a", "b"]
+    assert data["nested"] == {"keep": 1, "added": 2}
+    assert data["at"] == ref.get().update_time
+
+    ref.update({"nested.keep": transforms.DELETE_FIELD, "count": transforms.Increment(-3)})
+    data = ref.get().to_dict()
+    assert data["nested"] == {"added": 2}
+    assert data["count"] == 0
+
+
+def test_write_preconditions(db):
+    ref = db.collection("users").document("missing")
+    with pytest.raises(exceptions.NotFound):
+        ref.update({"name": "x"})
+    with pytest.raises(exceptions.NotFound):
+        ref.delete(option=db.write_option(exists=True))
+
+    ref.create({"name": "x"})
+    with pytest.raises(exceptions.AlreadyExists):
+        ref.create({"name": "y"})
+
+    stale = ref.get().update_time
+    ref.update({"name": "z"})
+    with pytest.raises(exceptions.FailedPrecondition):
+        ref.update({"name": "stale"}, option=db.write_option(last_update_time=stale))
+    assert ref.get().to_dict()["name"] == "z"
+
+
+def test_batch_is_atomic_and_capped(db):
+    users = db.collection("users")
+    users.document("a").set({"n": 1})
+
+    batch = db.batch()
+    batch.set(users.document("b"), {"n": 2})
+    batch.update(users.document("missing"), {"n": 3})
+    with pytest.raises(exceptions.NotFound):
+        batch.commit()
+    assert not users.document("b").get().exists
+
+    batch = db.batch()
+    for index in range(501):
+        batch.set(users.document(f"u{index}"), {"n": index})
+    with pytest.raises(exceptions.InvalidArgument):
+        batch.commit()
+
+
+def test_queries(db):
+    workouts = db.collection("users").document("u1").collection("workouts")
+    for index, date in enumerate(["2024-01-03", "2024-01-01", "2024-01-02", "2024-01-05"]):
+        workouts.document(f"w{index}").set({"date": date, "volume": index * 10, "notes": "n"})
+    workouts.document("undated").set({"volume": 99})
+
+    dates = [doc.to_dict()["date"] for doc in workouts.order_by("date", direction=firestore.Query.DESCENDING).stream()]
+    assert dates == ["2024-01-05", "2024-01-03", "2024-01-02", "2024-01-01"]
+
+    in_range = workouts.where("date", ">=", "2024-01-02").where("date", "<=", "2024-01-03").stream()
+    assert sorted(doc.id for doc in in_range) == ["w0", "w2"]
+
+    projected = next(iter(workouts.where("notes", "==", "n").select(["date"]).limit(1).stream()))
+    assert set(projected.to_dict()) == {"date"}
+
+    page = list(workouts.order_by("__name__").limit(2).stream())
+    assert [doc.id for doc in page] == ["undated", "w0"]
+    ids = [doc.id for doc in workouts.stream()]
+    assert ids == sorted(ids)
+    after = [doc.id for doc in workouts.order_by("__name__").start_after({"__name__": ids[1]}).stream()]
+    assert after == ids[2:]
+    after_snapshot = [doc.id for doc in workouts.order_by("__name__").start_after(page[-1]).limit(2).stream()]
+    assert after_snapshot == ids[2:4]
+
+
+def test_get_all_is_one_round_trip_in_any_order(db):
+    users = db.collection("users")
+    for index in range(5):
+        users.document(f"u{index}").set({"n": index})
+    db.reset_stats()
+
+    refs = [users.document(f"u{index}") for index in range(6)]
+    snapshots = list(db.get_all(refs + refs[:2]))
+
+    assert db.round_trips == 1
+    assert len(snapshots) == 6
+    assert sorted(snapshot.id for snapshot in snapshots if snapshot.exists) == [f"u{index}" for index in range(5)]
+    assert [snapshot.id for snapshot in snapshots] != [ref.id for ref in refs]
+
+
+def test_transaction_retries_on_conflict(db):
+    counter = db.collection("counters").document("c")
+    counter.set({"value": 0})
+    attempts = []
+
+    def increment(transaction):
+        snapshot = counter.get(transaction=transaction)
+        attempts.append(1)
+        if len(attempts) == 1:
+            # A concurrent writer changes the document between read and commit
+            counter.update({"value": 100})
+        transaction.update(counter, {"value": snapshot.to_dict()["value"] + 1})
+
+    firestore.transactional(increment)(db.transaction())
+    assert len(attempts) == 2
+    assert counter.get().to_dict()["value"] == 101
+
+
+def test_bulk_writer_batches_round_trips(db):
+    users = db.collection("users")
+    db.seed("users", {f"u{index}": {"n": index} for index in range(45)})
+    db.reset_stats()
+
+    bulk_writer = db.bulk_writer()
+    for doc in users.select([]).stream():
+        bulk_writer.delete(doc.reference)
+    bulk_writer.close()
+
+    assert db.collection_size("users") == 0
+    assert db.rpc_count("batch_write") == 3
+
+
+def test_injected_latency_overlaps_across_threads(db):
+    db.latency = 0.05
+    refs = [db.collection("users").document(f"u{index}") for index in range(8)]
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        list(pool.map(lambda ref: ref.get(), refs))
+    elapsed = time.perf_counter() - start
+
+    assert db.rpc_count("get") == 8
+    assert elapsed < 8 * 0.05 / 2
+
+
+def test_injected_fault(db):
+    db.inject_fault("commit", after=1)
+    users = db.collection("users")
+    users.document("a").set({"n": 1})
+    with pytest.raises(exceptions.ServiceUnavailable):
+        users.document("b").set({"n": 2})
+    users.document("c").set({"n": 3})
+    assert sorted(doc.id for doc in users.stream()) == ["a", "c"]
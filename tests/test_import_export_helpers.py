@@ -0,0 +1,79 @@
+import io
+import json
+
+
+def ndjson(workouts):
+    return io.BytesIO("".join(json.dumps(workout) + "\n" for workout in workouts).encode("utf-8"))
+
+
+def test_import_writes_prs_from_the_running_best(db):
+    from helpers.import_export_helpers import import_workouts_from_stream
+
+    workouts = [
+        {"date": f"2024-01-{day + 1:02d}", "exercises": [
+            {"exerciseId": "bench", "sets": [{"reps": 5, "weight": 60.0 + day}, {"reps": 3, "weight": 60.0 + day}]},
+            {"exerciseId": "squat", "sets": [{"reps": 5, "weight": 100.0}, {"reps": 6 if day == 3 else 4, "weight": 100.0}]},
+        ]}
+        for day in range(20)
+    ]
+    imported, errors = import_workouts_from_stream("u1", ndjson(workouts + [{"date": "nope"}]), "ndjson")
+
+    assert (imported, errors) == (20, [{"line": 21, "error": "date must be YYYY-MM-DD"}])
+    bench = db.document_data("users/u1/prs/bench")
+    assert (bench["weight"], bench["reps"], bench["setId"]) == (79.0, 5, "set_0_0")
+    squat = db.document_data("users/u1/prs/squat")
+    assert (squat["reps"], squat["setId"]) == (6, "set_1_1")
+    assert db.collection_size("users/u1/prs") == 2
+    assert db.collection_size("users/u1/workouts") == 20
+
+
+def test_import_keeps_two_candidates_per_exercise(db, monkeypatch):
+    from helpers import import_export_helpers
+
+    seen = []
+    original = import_export_helpers.best_pr_candidates
+    monkeypatch.setattr(import_export_helpers, "best_pr_candidates", lambda best: seen.append(len(best)) or original(best))
+
+    workouts = [
+        {"date": "2024-02-01", "exercises": [
+            {"exerciseId": f"ex{index % 3}", "sets": [{"reps": 5, "weight": float(index)}] * 10}
+            for index in range(6)
+        ]}
+        for _ in range(300)
+    ]
+    import_export_helpers.import_workouts_from_stream("u1", ndjson(workouts), "ndjson")
+    assert seen == [3]
+
+
+def test_import_merges_into_history_and_summary_without_rereading_workouts(db):
+    from helpers.import_export_helpers import import_workouts_from_stream
+    from helpers.stats_helpers import get_summary, rebuild_summary
+    from helpers.workouts_helpers import rebuild_exercise_history
+
+    def workout(date):
+        return {"date": date, "timezone": "Europe/Oslo", "exercises": [
+            {"exerciseId": "bench", "sets": [{"reps": 5, "weight": 60.0}]},
+            {"exerciseId": date[-2:], "sets": [{"reps": 8, "weight": 20.0}]},
+        ]}
+
+    import_workouts_from_stream("u1", ndjson([workout(f"2024-03-{day:02d}") for day in range(1, 31)]), "ndjson")
+    db.reset_stats()
+    # One back-dated workout that bridges a gap, two that extend the streak
+    later = [workout("2024-02-28"), workout("2024-03-31"), workout("2024-04-01")]
+    assert import_workouts_from_stream("u1", ndjson(later), "ndjson") == (3, [])
+    # History docs, PRs and the summary; none of the 30 earlier workouts
+    assert db.stats["documents_read"] < 30
+
+    def index_state():
+        history = {
+            exercise_id: db.document_data(f"users/u1/exerciseHistory/{exercise_id}")["sessions"]
+            for exercise_id in ("bench", "28", "31", "01", "15")
+        }
+        return history, get_summary("u1")
+
+    merged = index_state()
+    rebuild_exercise_history("u1")
+    rebuild_summary("u1")
+    assert merged == index_state()
+    assert merged[1]["totalWorkouts"] == 33
+    assert merged[1]["longestStreak"] == 32
@@ -0,0 +1,74 @@
+from datetime import date, datetime, timedelta, timezone
+
+import pytest
+from flask import Flask
+from werkzeug.http import http_date
+
+from conftest import make_exercises
+
+
+def make_apps():
+    from helpers.json_helpers import install_json_provider
+
+    return Flask("stdlib"), install_json_provider(Flask("fast"))
+
+
+def make_workouts(count):
+    from google.api_core.datetime_helpers import DatetimeWithNanoseconds
+
+    from helpers.workouts_helpers import normalize_workout_exercises
+
+    exercises, _ = normalize_workout_exercises("w", make_exercises(6, 4))
+    created = DatetimeWithNanoseconds(2024, 5, 1, 7, 30, 15, nanosecond=123456789, tzinfo=timezone.utc)
+    return [
+        {
+            "id": f"w{index:04d}", "date": "2024-05-01", "notes": "", "timezone": "Europe/Oslo",
+            "createdAt": created + timedelta(minutes=index), "updatedAt": created + timedelta(minutes=index, seconds=5),
+            "exercises": exercises,
+        }
+        for index in range(count)
+    ]
+
+
+@pytest.mark.parametrize("value", [
+    datetime(2024, 5, 1, 7, 30, 15),
+    datetime(2024, 5, 1, 7, 30, 15, 999999, tzinfo=timezone.utc),
+    datetime(2024, 1, 1, 0, 30, tzinfo=timezone(timedelta(hours=2))),
+    datetime(1969, 12, 31, 23, 59, 59, tzinfo=timezone(timedelta(hours=-5, minutes=-30))),
+    date(2024, 2, 29),
+])
+def test_format_http_date_matches_werkzeug(value):
+    from helpers.json_helpers import format_http_date
+
+    assert format_http_date(value) == http_date(value)
+
+
+def test_fast_provider_output_matches_default_provider():
+    stdlib_app, fast_app = make_apps()
+    payload = {"workouts": make_workouts(3), "day": date(2024, 5, 1), "big": 2 ** 70}
+
+    with stdlib_app.app_context(), fast_app.app_context():
+        assert fast_app.json.loads(fast_app.json.dumps(payload)) == stdlib_app.json.loads(stdlib_app.json.dumps(payload))
+        assert fast_app.json.response(payload).get_json() == stdlib_app.json.response(payload).get_json()
+
+
+@pytest.mark.benchmark
+def test_encode_1000_workouts(bench):
+    stdlib_app, fast_app = make_apps()
+    workouts = make_workouts(1000)
+    # Same payload with the timestamps already strings, to price the default() passthrough
+    preformatted = [dict(workout, createdAt=http_date(workout["createdAt"]), updatedAt=http_date(workout["updatedAt"]))
+                    for workout in workouts]
+
+    with stdlib_app.app_context(), fast_app.app_context():
+        assert fast_app.json.dumps(workouts) == fast_app.json.dumps(preformatted)
+        stdlib = bench.run("json_1000_workouts_stdlib", lambda: stdlib_app.json.response(workouts), runs=10)
+        fast = bench.run("json_1000_workouts_orjson", lambda: fast_app.json.response(workouts), runs=10)
+        strings = bench.run(
+            "json_1000_workouts_orjson_preformatted", lambda: fast_app.json.response(preformatted), runs=10,
+            timestamps=2 * len(workouts),
+        )
+
+    assert fast["p50_ms"] * 2 < stdlib["p50_ms"]
+    # 2000 passthrough timestamps must stay a small share of the encode
+    assert fast["p50_ms"] - strings["p50_ms"] < stdlib["p50_ms"] / 4
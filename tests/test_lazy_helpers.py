@@ -0,0 +1,45 @@
+import json
+import subprocess
+import sys
+
+from conftest import REPO_ROOT
+
+HEAVY_MODULES = ("firebase_admin", "numpy", "pytz", "google.cloud.firestore")
+
+# Runs in a fresh interpreter: conftest has already imported everything in this one
+COLD_IMPORT_SCRIPT = """
+import json, sys, types
+
+helpers = types.ModuleType("helpers")
+helpers.__path__ = [sys.argv[1]]
+sys.modules["helpers"] = helpers
+error_codes = types.ModuleType("helpers.error_codes")
+error_codes.ERROR_CODES = {}
+sys.modules["helpers.error_codes"] = error_codes
+config = types.ModuleType("config")
+config.__path__ = []
+config_db = types.ModuleType("config.db")
+config_db.db = object()
+config.db = config_db
+sys.modules["config"] = config
+sys.modules["config.db"] = config_db
+
+from helpers.users import create_users_app
+from helpers.workouts import create_workouts_app
+import helpers.async_apps
+import helpers.import_export_helpers
+
+create_users_app()
+create_workouts_app()
+heavy = json.loads(sys.argv[2])
+print(json.dumps(sorted(name for name in sys.modules if any(name == top or name.startswith(top + ".") for top in heavy))))
+"""
+
+
+def test_cold_import_does_not_load_heavy_dependencies():
+    completed = subprocess.run(
+        [sys.executable, "-c", COLD_IMPORT_SCRIPT, str(REPO_ROOT), json.dumps(HEAVY_MODULES)],
+        capture_output=True, text=True, check=True, timeout=60,
+    )
+    loaded = json.loads(completed.stdout.strip().splitlines()[-1])
+    assert loaded == [], f"heavy modules imported at cold start: {loaded}"
@@ -0,0 +1,68 @@
+import re
+
+
+def metric_values(client):
+    response = client.get("/metrics")
+    assert response.status_code == 200
+    assert response.headers["Content-Type"].startswith("text/plain; version=0.0.4")
+    values = {}
+    for line in response.get_data(as_text=True).splitlines():
+        if line and not line.startswith("#"):
+            name, value = line.rsplit(" ", 1)
+            values[name] = float(value)
+    return values
+
+
+def server_timing(response):
+    """
+    Returns {metric: (duration_ms, desc)} from the Server-Timing headers.
+    """
+    timings = {}
+    for header in response.headers.getlist("Server-Timing"):
+        match = re.fullmatch(r'(\w+);dur=([\d.]+)(?:;desc="([^"]*)")?', header)
+        assert match, header
+        timings[match.group(1)] = (float(match.group(2)), match.group(3))
+    return timings
+
+
+def test_server_timing_reports_firestore_work_per_request(db, workouts_client):
+    db.seed("users/u1/workouts", {"w1": {"date": "2024-05-01", "exercises": []}})
+
+    timings = server_timing(workouts_client.get("/users/u1/workouts/w1"))
+    assert timings["firestore"][1] == "reads=1 writes=0 commits=0"
+    assert timings["app"][0] >= timings["firestore"][0]
+
+    response = workouts_client.put("/users/u1/workouts/w1", json={"notes": "light"})
+    assert server_timing(response)["firestore"][1] == "reads=0 writes=1 commits=0"
+
+    # Counts are per request, not carried over from the previous one
+    timings = server_timing(workouts_client.get("/users/u1/workouts/missing"))
+    assert timings["firestore"][1] == "reads=1 writes=0 commits=0"
+
+
+def test_metrics_route_counts_requests_and_operations(db, users_client):
+    db.seed("users", {f"u{index}": {"firstName": f"User {index}"} for index in range(3)})
+    before = metric_values(users_client)
+
+    for _ in range(2):
+        assert users_client.get("/getUser/u1").status_code == 200
+    # A streamed response tears down in a copied context; later requests still count cleanly
+    assert len(users_client.get("/getUsers?format=ndjson").get_data(as_text=True).splitlines()) == 3
+    assert server_timing(users_client.get("/getUser/u2"))["firestore"][1] == "reads=1 writes=0 commits=0"
+    after = metric_values(users_client)
+
+    def delta(name):
+        return after.get(name, 0) - before.get(name, 0)
+
+    assert delta('http_requests_total{route="/getUser/<id>"}') == 3
+    assert delta('route_firestore_reads_total{route="/getUser/<id>"}') == 3
+    assert delta('http_requests_total{route="/getUsers"}') == 1
+    assert delta('firestore_operations_total{op="get"}') >= 3
+    assert delta('firestore_operations_total{op="stream"}') >= 1
+
+    buckets = [value for name, value in after.items()
+               if name.startswith('firestore_operation_duration_seconds_bucket{op="get",')]
+    assert buckets == sorted(buckets)
+    assert buckets[-1] == after['firestore_operation_duration_seconds_count{op="get"}']
+    assert 'cache_hits_total{cache="templates"}' in after
+    assert 'executor_queued{pool="firestore-fanout"}' in after
@@ -0,0 +1,158 @@
+import tracemalloc
+
+import pytest
+
+
+def seed_users(db, count):
+    db.seed("users", {f"u{index:06d}": {"firstName": f"User {index}", "bio": "x" * 200} for index in range(count)})
+    # Build the fake's sorted id index up front so it is not measured
+    db.collection_size("users")
+    db.collection("users").limit(1).get()
+
+
+def test_paginate_query_walks_every_document_once(db):
+    from helpers.response_helpers import paginate_query
+
+    db.seed("workouts", {f"t{index:03d}": {"name": f"Template {index}"} for index in range(25)})
+    db.reset_stats()
+
+    seen = []
+    page_token = None
+    pages = 0
+    while True:
+        items, page_token = paginate_query(db.collection("workouts"), 10, page_token)
+        seen.extend(item["id"] for item in items)
+        pages += 1
+        if page_token is None:
+            break
+
+    assert seen == [f"t{index:03d}" for index in range(25)]
+    assert pages == 3
+    assert db.rpc_count("run_query") == 3
+    # Each page reads at most one document beyond its size
+    assert db.stats["documents_read"] <= 25 + pages
+
+
+def test_paginate_query_last_full_page_has_no_token(db):
+    from helpers.response_helpers import paginate_query
+
+    db.seed("workouts", {f"t{index}": {"name": "x"} for index in range(10)})
+    items, page_token = paginate_query(db.collection("workouts"), 10)
+    assert len(items) == 10
+    assert page_token is None
+
+
+@pytest.mark.parametrize("path,collection", [("/getUsers", "users"), ("/getAllWorkouts", "workouts")])
+def test_list_routes_paginate(db, users_client, workouts_client, path, collection):
+    client = users_client if collection == "users" else workouts_client
+    db.seed(collection, {f"d{index:02d}": {"name": f"Doc {index}"} for index in range(7)})
+
+    first = client.get(f"{path}?pageSize=5").get_json()
+    assert [item["id"] for item in first["items"]] == [f"d{index:02d}" for index in range(5)]
+    second = client.get(f"{path}?pageSize=5&pageToken={first['nextPageToken']}").get_json()
+    assert [item["id"] for item in second["items"]] == ["d05", "d06"]
+    assert second["nextPageToken"] is None
+
+    assert client.get(f"{path}?pageSize=0").status_code == 400
+
+
+def ndjson_peak(users_client):
+    """
+    Streams /getUsers as NDJSON and returns (lines, peak traced bytes).
+    """
+    tracemalloc.start()
+    try:
+        response = users_client.get("/getUsers?format=ndjson", buffered=False)
+        lines = 0
+        for chunk in response.response:
+            lines += chunk.count(b"\n") if isinstance(chunk, bytes) else chunk.count("\n")
+        response.close()
+        return lines, tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+@pytest.mark.benchmark
+def test_ndjson_memory_stays_flat_on_100k_documents(db, bench, users_client):
+    seed_users(db, 10_000)
+    small_lines, small_peak = ndjson_peak(users_client)
+
+    db.reset()
+    seed_users(db, 100_000)
+    large_lines, large_peak = ndjson_peak(users_client)
+
+    tracemalloc.start()
+    try:
+        buffered = users_client.get("/getUsers")
+        assert len(buffered.get_json()) == 100_000
+        buffered_peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+    bench.record(
+        "ndjson_get_users_memory",
+        small_peak_kb=small_peak // 1024, large_peak_kb=large_peak // 1024, buffered_peak_kb=buffered_peak // 1024,
+    )
+    assert (small_lines, large_lines) == (10_000, 100_000)
+    # Ten times the documents must not mean ten times the memory
+    assert large_peak < small_peak * 2
+    assert large_peak * 20 < buffered_peak
+
+
+def seed_etag_data(db):
+    db.seed("users", {"u1": {"firstName": "Ada"}, "u2": {"firstName": "Bo"}})
+    db.seed("users/u1/workouts", {"w1": {"date": "2024-05-01", "exercises": []}})
+    db.seed("users/u1/exercises", {"ex1": {"name": "Bench Press", "archived": False}})
+    db.seed("workouts", {"t1": {"name": "Template"}})
+
+
+ETAG_ROUTES = [
+    ("users", "/getUser/u1", lambda client: client.put("/updateUser/u1", json={"firstName": "Grace"})),
+    ("users", "/getUserV2/u1", lambda client: client.put("/updateUser/u1", json={"firstName": "Grace"})),
+    ("users", "/getUsers", lambda client: client.put("/updateUser/u2", json={"firstName": "Cy"})),
+    ("users", "/getUsers?ids=u1,u2", lambda client: client.put("/updateUser/u2", json={"firstName": "Cy"})),
+    ("workouts", "/users/u1/workouts/w1", lambda client: client.put("/users/u1/workouts/w1", json={"notes": "x"})),
+    ("workouts", "/users/u1/workouts", lambda client: client.put("/users/u1/workouts/w1", json={"notes": "x"})),
+    ("workouts", "/users/u1/exercises/ex1", lambda client: client.put("/users/u1/exercises/ex1", json={"name": "Press"})),
+    ("workouts", "/users/u1/exercises", lambda client: client.put("/users/u1/exercises/ex1", json={"name": "Press"})),
+    ("workouts", "/getAllWorkouts", lambda client: client.post("/createWorkout", json={"name": "New"})),
+]
+
+
+@pytest.mark.parametrize("app,path,mutate", ETAG_ROUTES)
+def test_read_routes_answer_304_until_the_data_changes(db, users_client, workouts_client, app, path, mutate):
+    client = users_client if app == "users" else workouts_client
+    seed_etag_data(db)
+
+    first = client.get(path)
+    etag = first.headers["ETag"]
+    assert first.status_code == 200 and first.get_json()
+
+    cached = client.get(path, headers={"If-None-Match": etag})
+    assert (cached.status_code, cached.data, cached.headers["ETag"]) == (304, b"", etag)
+
+    assert mutate(client).status_code == 200
+    changed = client.get(path, headers={"If-None-Match": etag})
+    assert changed.status_code == 200
+    assert changed.headers["ETag"] != etag
+
+
+@pytest.mark.parametrize("app,path", [
+    ("users", "/getUsers?"), ("users", "/getUsers?ids=u1,u2&"),
+    ("workouts", "/users/u1/workouts?"), ("workouts", "/users/u1/exercises?"), ("workouts", "/getAllWorkouts?"),
+])
+def test_list_etag_depends_on_the_projection(db, users_client, workouts_client, app, path):
+    client = users_client if app == "users" else workouts_client
+    seed_etag_data(db)
+
+    etag = client.get(path).headers["ETag"]
+    projected = client.get(f"{path}fields=name", headers={"If-None-Match": etag})
+    assert projected.status_code == 200
+    assert projected.headers["ETag"] != etag
+
+
+def test_missing_documents_have_no_etag(db, users_client, workouts_client):
+    assert users_client.get("/getUser/nobody").status_code == 404
+    response = workouts_client.get("/users/u1/workouts/missing", headers={"If-None-Match": "*"})
+    assert response.status_code == 404
+    assert "ETag" not in response.headers
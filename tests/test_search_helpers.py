@@ -0,0 +1,34 @@
+import pytest
+
+
+def test_prefix_and_exact_matches_are_scored():
+    from helpers.search_helpers import EXACT_MATCH_SCORE, PREFIX_MATCH_SCORE, SearchIndex
+
+    index = SearchIndex(("name",))
+    for doc_id, name in {"a": "Bench Press", "b": "Bench", "c": "Benchmark Row", "d": "Squat", "e": "Bend"}.items():
+        index.upsert(doc_id, {"name": name})
+
+    scores = {result["id"]: result["score"] for result in index.search("bench")}
+    assert scores["a"] == scores["b"] == EXACT_MATCH_SCORE
+    assert scores["c"] == PREFIX_MATCH_SCORE
+    assert "d" not in scores
+    # The last token in sort order is still reachable by prefix
+    assert [result["id"] for result in index.search("squ")] == ["d"]
+
+
+@pytest.mark.benchmark
+def test_prefix_lookup_does_not_copy_the_token_list(bench):
+    from helpers.search_helpers import EXACT_MATCH_SCORE, SearchIndex
+
+    index = SearchIndex(("name",))
+    for number in range(100_000):
+        index.upsert(f"d{number}", {"name": f"m{number:06d}"})
+    index.upsert("first", {"name": "aa"})
+    index.upsert("last", {"name": "zz"})
+
+    # Two-letter queries skip the trigram pass; "aa" sorts before the other 100k tokens,
+    # so a slice from its insertion point would copy the whole list on every lookup
+    first = bench.run("search_prefix_first_token", lambda: index._match_token("aa"), runs=50, tokens=100_002)
+    last = bench.run("search_prefix_last_token", lambda: index._match_token("zz"), runs=50)
+    assert index._match_token("aa") == {"first": EXACT_MATCH_SCORE}
+    assert first["p50_ms"] < last["p50_ms"] * 5 + 0.05
@@ -0,0 +1,222 @@
+import time
+
+import pytest
+
+
+def create_user(users_client, user_id="u1", phone="+15551234567"):
+    response = users_client.post("/createUser", json={"id": user_id, "firstName": "Ada", "phoneNumber": phone})
+    assert response.status_code == 200
+
+
+def seed_user_tree(db, user_id="u1", workouts=3, items_per_workout=4, exercises=2):
+    db.seed(f"users/{user_id}/exercises", {f"ex{index}": {"name": f"Exercise {index}"} for index in range(exercises)})
+    db.seed(f"users/{user_id}/workouts", {f"w{index:04d}": {"date": "2024-05-01"} for index in range(workouts)})
+    for index in range(workouts):
+        db.seed(f"users/{user_id}/workouts/w{index:04d}/items", {
+            f"i{item:03d}": {"order": item} for item in range(items_per_workout)
+        })
+    db.seed(f"users/{user_id}/prs", {"ex0": {"weight": 100.0}})
+    return exercises + workouts * (items_per_workout + 1) + 1
+
+
+def wait_for_job(users_client, job_id, timeout=10.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        job = users_client.get(f"/deleteUser/jobs/{job_id}").get_json()
+        if job["status"] != "running":
+            return job
+        time.sleep(0.01)
+    raise AssertionError(f"delete job {job_id} did not finish")
+
+
+def test_delete_user_cascades_and_removes_user_last(db, users_client):
+    create_user(users_client)
+    subtree = seed_user_tree(db)
+
+    response = users_client.delete("/deleteUser/u1")
+    assert response.status_code == 200
+    assert response.get_json()["deletedDocuments"] == subtree + 1
+    assert db.total_documents("users/u1") == 0
+    assert db.document_data("users/u1") is None
+    assert db.document_data("phoneIndex/+15551234567") is None
+
+    assert users_client.delete("/deleteUser/u1").status_code == 404
+
+
+def test_failed_cascade_keeps_user_and_resumes(db, users_client):
+    from helpers.users_helpers import DELETE_MAX_ATTEMPTS
+
+    create_user(users_client)
+    seed_user_tree(db, workouts=40, items_per_workout=5)
+    # The third BulkWriter batch keeps failing until the writer gives up on it
+    db.inject_fault("batch_write", after=2, times=DELETE_MAX_ATTEMPTS)
+
+    response = users_client.delete("/deleteUser/u1")
+    assert response.status_code == 500
+    assert db.document_data("users/u1") is not None
+    assert db.document_data("phoneIndex/+15551234567") is not None
+    assert 0 < db.total_documents("users/u1/") < 40 * 6
+
+    response = users_client.delete("/deleteUser/u1")
+    assert response.status_code == 200
+    assert db.total_documents("users/u1") == 0
+    assert db.document_data("phoneIndex/+15551234567") is None
+
+
+def test_transient_batch_failures_are_retried(db, users_client):
+    create_user(users_client)
+    seed_user_tree(db)
+    db.inject_fault("batch_write", times=2)
+
+    assert users_client.delete("/deleteUser/u1").status_code == 200
+    assert db.total_documents("users/u1") == 0
+
+
+def test_background_delete_job_is_visible_to_every_worker(db, users_client):
+    from helpers.users import create_users_app
+
+    create_user(users_client)
+    subtree = seed_user_tree(db)
+
+    response = users_client.delete("/deleteUser/u1?background=1")
+    assert response.status_code == 202
+    job_id = response.get_json()["jobId"]
+
+    other_worker = create_users_app().test_client()
+    job = wait_for_job(other_worker, job_id)
+    assert job["status"] == "completed"
+    assert job["deleted"] == subtree + 1
+    assert "expireAt" not in job
+    assert db.document_data(f"deleteJobs/{job_id}")["expireAt"] is not None
+    assert db.document_data("users/u1") is None
+
+
+def test_unknown_delete_job(db, users_client):
+    response = users_client.get("/deleteUser/jobs/nobody")
+    assert response.status_code == 404
+    assert response.get_json()["code"] == "USER_NOT_FOUND"
+
+
+def test_expired_delete_job_is_not_reported(db, users_client):
+    from datetime import datetime, timedelta, timezone
+
+    db.seed("deleteJobs", {"u1": {
+        "jobId": "u1", "status": "completed", "expireAt": datetime.now(timezone.utc) - timedelta(seconds=1),
+    }})
+    assert users_client.get("/deleteUser/jobs/u1").status_code == 404
+
+
+@pytest.mark.benchmark
+def test_cascade_delete_50k_documents(db, bench, users_client):
+    def setup():
+        db.reset()
+        db.seed("users", {"u1": {"firstName": "Ada"}})
+        seed_user_tree(db, workouts=500, items_per_workout=99, exercises=100)
+
+    result = bench.run(
+        "delete_user_tree_50k", lambda: users_client.delete("/deleteUser/u1"), runs=3, setup=setup,
+    )
+    assert result["documents_written"] == 500 * 100 + 100 + 1 + 1
+    assert db.total_documents("users/u1") == 0
+    # BulkWriter batches of 20, name-only pages of 500 and the final transaction
+    assert result["rpcs"]["batch_write"] == -(-(500 * 100 + 100 + 1) // 20)
+
+
+def test_update_user_is_one_round_trip(db, users_client):
+    db.seed("users", {"u1": {"firstName": "Ada"}})
+
+    response = users_client.put("/updateUser/u1", json={"bio": "Lifter", "isAdmin": True})
+    assert response.status_code == 200
+    assert db.stats["round_trips"] == {"commit": 1}
+    assert db.document_data("users/u1")["bio"] == "Lifter"
+    assert "isAdmin" not in db.document_data("users/u1")
+
+    db.reset_stats()
+    response = users_client.put("/updateUser/nobody", json={"bio": "x"})
+    assert response.status_code == 404
+    assert response.get_json()["code"] == "USER_NOT_FOUND"
+    assert db.stats["round_trips"] == {"commit": 1}
+    assert db.document_data("users/nobody") is None
+
+
+@pytest.mark.parametrize("phone,expected", [
+    ("+1 (555) 123-4567", "+15551234567"),
+    ("555.123.4567", "+15551234567"),
+    ("0044 7911 123456", "+447911123456"),
+    ("+44 7911 123456", "+447911123456"),
+    ("1 555 123 4567", "+15551234567"),
+    ("07911123456", None),
+    ("0 555 123 4567", None),
+    ("0555 123 456", None),
+    ("12345", None),
+    ("5551234", None),
+    ("44 7911 123456", None),
+    ("25 5551 234 567", None),
+    ("not a number", None),
+])
+def test_normalize_phone(phone, expected):
+    from helpers.users_helpers import normalize_phone
+
+    assert normalize_phone(phone) == expected
+
+
+def test_check_user_by_phone_falls_back_before_the_index_is_built(db, users_client):
+    # Users written before phoneIndex existed, with phoneNumber stored as entered
+    db.seed("users", {"u1": {"phoneNumber": "+15551234567"}, "u2": {"phoneNumber": "555 987 6543"}})
+
+    for phone in ("555-123-4567", "555 987 6543"):
+        response = users_client.post("/checkUserByPhone", json={"phoneNumber": phone})
+        assert response.get_json() == {"exists": True}
+
+    db.reset_stats()
+    for _ in range(2):
+        assert users_client.post("/checkUserByPhone", json={"phoneNumber": "5550000000"}).get_json() == {"exists": False}
+    # The miss is cached only after both the index and the users query came up empty
+    assert db.stats["round_trips"] == {"get": 1, "run_query": 1}
+
+
+def test_check_user_by_phone_rejects_trunk_prefix(db, users_client):
+    response = users_client.post("/checkUserByPhone", json={"phoneNumber": "07911123456"})
+    assert response.status_code == 400
+    assert response.get_json()["code"] == "INVALID_REQUEST"
+
+
+def test_get_users_fields_projection(db, users_client):
+    db.seed("users", {
+        "u1": {"firstName": "Ada", "phoneNumber": "+15551234567", "address": {"city": "Oslo", "zip": "0150"}},
+        "u2": {"firstName": "Bo"},
+    })
+
+    assert users_client.get("/getUsers?fields=firstName,address.city").get_json() == [
+        {"id": "u1", "firstName": "Ada", "address": {"city": "Oslo"}},
+        {"id": "u2", "firstName": "Bo"},
+    ]
+    assert users_client.get("/getUsers?ids=u2,u1&fields=phoneNumber").get_json() == {"items": [
+        {"id": "u2"}, {"id": "u1", "phoneNumber": "+15551234567"},
+    ]}
+    assert users_client.get("/getUsers?fields=first name").status_code == 400
+
+
+def test_get_users_by_ids_keeps_request_order_with_one_read(db, users_client):
+    db.seed("users", {f"u{index}": {"firstName": f"User {index}"} for index in range(5)})
+    db.reset_stats()
+
+    response = users_client.get("/getUsers?ids=u3,nobody,u0,u3, u1")
+    assert response.status_code == 200
+    items = response.get_json()["items"]
+    # Duplicates collapse, blanks are trimmed, and missing ids keep their slot
+    assert [item["id"] for item in items] == ["u3", "nobody", "u0", "u1"]
+    assert items[0]["firstName"] == "User 3"
+    assert items[1] == {"id": "nobody", "error": "User not found", "code": "USER_NOT_FOUND",
+                        "details": "User nobody not found"}
+    assert db.stats["round_trips"] == {"get_all": 1}
+
+
+def test_get_users_by_ids_rejects_bad_lists(db, users_client):
+    from helpers.response_helpers import MAX_PAGE_SIZE
+
+    too_many = ",".join(f"u{index}" for index in range(MAX_PAGE_SIZE + 1))
+    for ids in (" , ", "a/b", too_many):
+        response = users_client.get(f"/getUsers?ids={ids}")
+        assert response.status_code == 400
+        assert response.get_json()["code"] == "INVALID_REQUEST"
@@ -0,0 +1,301 @@
+import csv
+import gzip
+import io
+import json
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from conftest import make_exercises
+
+
+def seed_template(db, exercise_count, named_every=0):
+    exercises = []
+    for index in range(exercise_count):
+        exercise = {"exerciseId": f"ex{index}", "order": index}
+        if named_every and index % named_every == 0:
+            exercise["name"] = f"Template name {index}"
+        exercises.append(exercise)
+    db.seed("workouts", {"t1": {"name": "Template", "exercises": exercises}})
+    db.seed("users/u1/exercises", {f"ex{index}": {"name": f"Exercise {index}"} for index in range(exercise_count)})
+
+
+def test_start_workout_reads_are_constant_in_template_size(db, workouts_client):
+    from helpers.cache_helpers import template_cache
+
+    reads = {}
+    for exercise_count in (1, 10, 100):
+        db.reset()
+        template_cache.clear()
+        seed_template(db, exercise_count)
+        response = workouts_client.post("/users/u1/workouts/start", json={"workout_id": "t1", "date": "2024-05-01"})
+        assert response.status_code == 200
+        reads[exercise_count] = (db.rpc_count("get"), db.rpc_count("get_all"), db.rpc_count("run_query"))
+
+    assert len(set(reads.values())) == 1
+    assert reads[100][1] == 1
+
+
+def test_start_workout_resolves_only_missing_names(db, workouts_client):
+    seed_template(db, 6, named_every=2)
+    response = workouts_client.post("/users/u1/workouts/start", json={"workout_id": "t1", "date": "2024-05-01"})
+    workout_id = response.get_json()["id"]
+    # Template, the three unnamed exercises and the stats summary
+    assert db.stats["documents_read"] <= 1 + 3 + 1
+
+    items = db.collection(f"users/u1/workouts/{workout_id}/items").order_by("order").get()
+    assert [item.to_dict()["name"] for item in items] == [
+        "Template name 0", "Exercise 1", "Template name 2", "Exercise 3", "Template name 4", "Exercise 5",
+    ]
+
+
+def test_start_workout_unknown_template(db, workouts_client):
+    response = workouts_client.post("/users/u1/workouts/start", json={"workout_id": "missing"})
+    assert response.status_code == 404
+    assert response.get_json()["code"] == "WORKOUT_NOT_FOUND"
+
+
+def test_exercise_mutations_are_one_round_trip(db, workouts_client):
+    db.seed("users/u1/exercises", {"ex1": {"name": "Bench"}})
+
+    for method, exercise_id, status in [
+        ("put", "ex1", 200), ("put", "missing", 404), ("delete", "ex1", 200), ("delete", "ex1", 404),
+    ]:
+        db.reset_stats()
+        kwargs = {"json": {"name": "Bench press"}} if method == "put" else {}
+        response = getattr(workouts_client, method)(f"/users/u1/exercises/{exercise_id}", **kwargs)
+        assert response.status_code == status, (method, exercise_id)
+        assert db.stats["round_trips"] == {"commit": 1}, (method, exercise_id)
+        if status == 404:
+            assert response.get_json()["code"] == "EXERCISE_NOT_FOUND"
+
+    assert db.document_data("users/u1/exercises/ex1") is None
+    assert db.document_data("users/u1/exercises/missing") is None
+
+
+def test_workout_metadata_put_is_one_round_trip(db, workouts_client):
+    db.seed("users/u1/workouts", {"w1": {"date": "2024-05-01", "notes": ""}})
+
+    response = workouts_client.put("/users/u1/workouts/w1", json={"notes": "Felt strong"})
+    assert response.status_code == 200
+    assert db.stats["round_trips"] == {"commit": 1}
+    assert db.document_data("users/u1/workouts/w1")["notes"] == "Felt strong"
+
+    db.reset_stats()
+    response = workouts_client.put("/users/u1/workouts/missing", json={"notes": "x"})
+    assert response.status_code == 404
+    assert response.get_json()["code"] == "WORKOUT_NOT_FOUND"
+    assert db.stats["round_trips"] == {"commit": 1}
+
+
+def days_ago(days):
+    return (datetime.now(timezone.utc) - timedelta(days=days)).strftime("%Y-%m-%d")
+
+
+def create_workout(workouts_client, date):
+    response = workouts_client.post("/users/u1/workouts", json={"date": date, "exercises": make_exercises(1, 1)})
+    assert response.status_code == 200
+    return response.get_json()["id"]
+
+
+def streak(workouts_client):
+    summary = workouts_client.get("/users/u1/stats/summary").get_json()
+    return summary["totalWorkouts"], summary["lastWorkoutDate"], summary["currentStreak"], summary["longestStreak"]
+
+
+def test_summary_streak_follows_creates(db, workouts_client):
+    for days in (2, 1, 0):
+        create_workout(workouts_client, days_ago(days))
+    assert streak(workouts_client) == (3, days_ago(0), 3, 3)
+
+    # A back-dated workout that bridges a gap cannot be applied incrementally
+    create_workout(workouts_client, days_ago(4))
+    create_workout(workouts_client, days_ago(3))
+    assert streak(workouts_client) == (5, days_ago(0), 5, 5)
+    assert "streakDirty" not in db.document_data("users/u1/stats/summary")
+
+
+def test_summary_streak_is_recomputed_after_delete(db, workouts_client):
+    only_id = create_workout(workouts_client, "2024-01-01")
+    assert workouts_client.delete(f"/users/u1/workouts/{only_id}").status_code == 200
+    assert streak(workouts_client) == (0, None, 0, 0)
+
+    ids = [create_workout(workouts_client, days_ago(days)) for days in (2, 1, 0)]
+    assert workouts_client.delete(f"/users/u1/workouts/{ids[1]}").status_code == 200
+    assert streak(workouts_client) == (2, days_ago(0), 1, 1)
+
+    assert workouts_client.delete(f"/users/u1/workouts/{ids[2]}").status_code == 200
+    assert streak(workouts_client) == (1, days_ago(2), 0, 1)
+    assert "streakDirty" not in db.document_data("users/u1/stats/summary")
+
+
+def test_summary_streak_is_recomputed_after_date_change(db, workouts_client):
+    first_id, second_id = (create_workout(workouts_client, days_ago(days)) for days in (1, 0))
+    assert streak(workouts_client) == (2, days_ago(0), 2, 2)
+
+    response = workouts_client.put(f"/users/u1/workouts/{second_id}", json={"date": days_ago(5)})
+    assert response.status_code == 200
+    assert streak(workouts_client) == (2, days_ago(1), 1, 1)
+
+    # Metadata-only edits leave the stored streak alone
+    workouts_client.put(f"/users/u1/workouts/{first_id}", json={"notes": "easy day"})
+    assert "streakDirty" not in db.document_data("users/u1/stats/summary")
+
+
+def test_fields_projection_returns_only_requested_fields(db, workouts_client):
+    seed_template(db, 2)
+    create_workout(workouts_client, "2024-05-01")
+    started = workouts_client.post("/users/u1/workouts/start", json={"workout_id": "t1", "date": "2024-05-02"})
+    started_id = started.get_json()["id"]
+
+    workouts = workouts_client.get("/users/u1/workouts?fields=date,workout_id").get_json()
+    # Ad-hoc workouts have no template, so the field is omitted rather than null
+    assert [sorted(workout) for workout in workouts] == [["date", "id", "workout_id"], ["date", "id"]]
+    assert workouts[0] == {"id": started_id, "date": "2024-05-02", "workout_id": "t1"}
+
+    exercises = workouts_client.get("/users/u1/exercises?fields=name&includeArchived=true").get_json()
+    assert exercises and all(sorted(exercise) == ["id", "name"] for exercise in exercises)
+
+
+def test_fields_projection_on_templates(db, workouts_client):
+    db.seed("workouts", {
+        "t1": {"name": "Push", "meta": {"level": "easy", "notes": "x"}},
+        "t2": {"name": "Pull"},
+    })
+
+    assert workouts_client.get("/getAllWorkouts?fields=meta.level").get_json() == [
+        {"id": "t1", "meta": {"level": "easy"}}, {"id": "t2"},
+    ]
+    assert workouts_client.get("/getWorkouts?ids=t2,t1&fields=name,id").get_json() == {"items": [
+        {"id": "t2", "name": "Pull"}, {"id": "t1", "name": "Push"},
+    ]}
+    page = workouts_client.get("/getAllWorkouts?fields=meta.level&pageSize=1").get_json()
+    assert page == {"items": [{"id": "t1", "meta": {"level": "easy"}}], "nextPageToken": "t1"}
+
+    for path in ("/getAllWorkouts?fields=meta..level", "/getWorkouts?ids=t1&fields=1name", "/users/u1/workouts?fields=a,b-c"):
+        assert workouts_client.get(path).status_code == 400
+
+
+def history(workouts_client, exercise_id):
+    response = workouts_client.get(f"/users/u1/exercises/{exercise_id}/history")
+    assert response.status_code == 200
+    return [(session["workoutId"], session["date"], len(session["sets"])) for session in response.get_json()["sessions"]]
+
+
+def test_exercise_history_follows_put_and_delete(db, workouts_client):
+    first_id = create_workout(workouts_client, "2024-05-01")
+    second_id = create_workout(workouts_client, "2024-05-03")
+    assert history(workouts_client, "ex0") == [(second_id, "2024-05-03", 1), (first_id, "2024-05-01", 1)]
+
+    # New sets replace the session; a dropped exercise leaves that exercise's history
+    response = workouts_client.put(f"/users/u1/workouts/{first_id}", json={"exercises": [
+        {"exerciseId": "ex1", "sets": [{"reps": 5, "weight": 50.0}] * 3},
+    ]})
+    assert response.status_code == 200
+    assert history(workouts_client, "ex0") == [(second_id, "2024-05-03", 1)]
+    assert history(workouts_client, "ex1") == [(first_id, "2024-05-01", 3)]
+
+    # Sessions carry the workout date and stay newest first
+    assert workouts_client.put(f"/users/u1/workouts/{first_id}", json={"date": "2024-05-04"}).status_code == 200
+    assert history(workouts_client, "ex1") == [(first_id, "2024-05-04", 3)]
+
+    assert workouts_client.delete(f"/users/u1/workouts/{second_id}").status_code == 200
+    assert history(workouts_client, "ex0") == []
+    assert history(workouts_client, "ex1") == [(first_id, "2024-05-04", 3)]
+
+
+def test_exercise_history_rebuild_refills_the_session_window(db, workouts_client):
+    from helpers.workouts_helpers import HISTORY_SESSION_LIMIT
+
+    ids = [create_workout(workouts_client, f"2024-05-{day:02d}") for day in range(1, HISTORY_SESSION_LIMIT + 3)]
+    assert len(history(workouts_client, "ex0")) == HISTORY_SESSION_LIMIT
+
+    # Sessions already evicted from the window are not read back on delete
+    assert workouts_client.delete(f"/users/u1/workouts/{ids[-1]}").status_code == 200
+    incremental = history(workouts_client, "ex0")
+    assert incremental[0] == (ids[-2], f"2024-05-{HISTORY_SESSION_LIMIT + 1:02d}", 1)
+    assert len(incremental) == HISTORY_SESSION_LIMIT - 1
+
+    # The rebuild fills it from the remaining workouts and drops docs no workout uses any more
+    db.seed("users/u1/exerciseHistory", {"stale": {"exerciseId": "stale", "sessions": [{"workoutId": "gone"}]}})
+    response = workouts_client.post("/users/u1/exerciseHistory/rebuild")
+    assert response.get_json() == {"message": "Exercise history rebuilt", "exercises": 1}
+    assert history(workouts_client, "ex0") == incremental + [(ids[1], "2024-05-02", 1)]
+    assert history(workouts_client, "stale") == []
+
+
+def seed_export_data(db, workouts_client):
+    db.seed("users", {"u1": {"firstName": "Ada"}})
+    db.seed("users/u1/exercises", {"ex0": {"name": "Bench Press"}})
+    later_id = create_workout(workouts_client, "2024-05-02")
+    earlier_id = create_workout(workouts_client, "2024-05-01")
+    return earlier_id, later_id
+
+
+def test_export_ndjson_streams_every_record_type(db, workouts_client):
+    earlier_id, later_id = seed_export_data(db, workouts_client)
+
+    response = workouts_client.get("/users/u1/export")
+    assert response.status_code == 200
+    assert response.mimetype == "application/x-ndjson"
+    assert response.headers["Content-Disposition"] == 'attachment; filename="u1-export.ndjson"'
+
+    records = [json.loads(line) for line in response.get_data(as_text=True).splitlines()]
+    assert [record["type"] for record in records] == ["profile", "exercise", "workout", "set", "workout", "set", "pr"]
+    # Workouts come out oldest first, each header followed by its sets
+    assert [record["data"]["id"] for record in records if record["type"] == "workout"] == [earlier_id, later_id]
+    assert records[3]["data"]["workoutKey"] == earlier_id
+    assert "exercises" not in records[2]["data"]
+
+
+def test_export_csv_round_trips_through_import(db, workouts_client):
+    seed_export_data(db, workouts_client)
+
+    response = workouts_client.get("/users/u1/export?format=csv")
+    assert response.mimetype == "text/csv"
+    exported = response.get_data(as_text=True)
+    rows = list(csv.DictReader(io.StringIO(exported)))
+    assert [(row["date"], row["exerciseId"], row["reps"], row["weight"]) for row in rows] == [
+        ("2024-05-01", "ex0", "5", "100.0"), ("2024-05-02", "ex0", "5", "100.0"),
+    ]
+
+    response = workouts_client.post("/users/u2/workouts/import", data=exported, content_type="text/csv")
+    assert response.get_json()["imported"] == 2
+    reexported = workouts_client.get("/users/u2/export?format=csv").get_data(as_text=True)
+    # Workout ids are new, and typing can differ (rir 2 is re-read as 2.0); the values survive
+    columns = ("date", "exerciseId", "name", "setId", "reps", "weight", "rir", "rpe", "volume")
+    values = lambda text: [tuple(float(row[column]) if column in ("rir", "rpe", "volume") else row[column]
+                                 for column in columns) for row in csv.DictReader(io.StringIO(text))]
+    assert values(reexported) == values(exported)
+
+
+@pytest.mark.parametrize("export_format", ["ndjson", "csv"])
+def test_export_gzip_matches_the_plain_stream(db, workouts_client, export_format):
+    seed_export_data(db, workouts_client)
+
+    plain = workouts_client.get(f"/users/u1/export?format={export_format}").get_data()
+    response = workouts_client.get(f"/users/u1/export?format={export_format}&gzip=true")
+    assert response.mimetype == "application/gzip"
+    assert response.headers["Content-Disposition"] == f'attachment; filename="u1-export.{export_format}.gz"'
+    assert gzip.decompress(response.get_data()) == plain
+
+
+def test_export_rejects_unknown_formats(db, workouts_client):
+    assert workouts_client.get("/users/u1/export?format=xml").status_code == 400
+
+
+def test_get_workouts_by_ids_reads_only_uncached_templates(db, workouts_client):
+    db.seed("workouts", {f"t{index}": {"name": f"Template {index}"} for index in range(4)})
+    assert workouts_client.get("/getWorkout/t2").status_code == 200
+    db.reset_stats()
+
+    items = workouts_client.get("/getWorkouts?ids=t2,gone,t0,t2").get_json()["items"]
+    assert [item["id"] for item in items] == ["t2", "gone", "t0"]
+    assert items[1] == {"id": "gone", "error": "Workout not found", "code": "WORKOUT_NOT_FOUND",
+                        "details": "Workout gone not found"}
+    # t2 is served from the template cache; t0 and the missing id share one get_all
+    assert db.stats["round_trips"] == {"get_all": 1}
+    assert db.stats["documents_read"] == 2
+
+    assert workouts_client.get("/getWorkouts").status_code == 400
+    assert workouts_client.get("/getWorkouts?ids=a/b").status_code == 400
@@ -0,0 +1,228 @@
+import pytest
+
+from conftest import make_exercises
+
+
+def test_update_prs_for_sets_writes_only_winners(db):
+    from helpers.workouts_helpers import update_prs_for_sets
+
+    db.seed("users/u1/prs", {
+        "bench": {"exerciseId": "bench", "weight": 120.0, "reps": 3, "createdAt": "2024-01-01"},
+        "squat": {"exerciseId": "squat", "weight": 100.0, "reps": 5},
+    })
+    candidates = [
+        ("bench", {"id": "s1", "weight": 110.0, "reps": 8}, "w1", "0"),
+        ("squat", {"id": "s2", "weight": 100.0, "reps": 6}, "w1", "1"),
+        ("squat", {"id": "s3", "weight": 105.0, "reps": 2}, "w1", "1"),
+        ("squat", {"id": "s4", "weight": 105.0, "reps": 1}, "w1", "1"),
+        ("deadlift", {"id": "s5", "weight": 140.0, "reps": 5}, "w1", "2"),
+        ("deadlift", {"id": "s6", "weight": 150.0, "reps": 1}, "w1", "2"),
+        (None, {"id": "s7", "weight": 500.0, "reps": 1}, "w1", "3"),
+    ]
+    db.reset_stats()
+
+    assert update_prs_for_sets("u1", candidates) == 2
+    assert db.stats["round_trips"] == {"get_all": 1, "commit": 1}
+    assert db.stats["documents_written"] == 2
+
+    assert db.document_data("users/u1/prs/bench")["weight"] == 120.0
+    squat = db.document_data("users/u1/prs/squat")
+    assert (squat["weight"], squat["reps"], squat["setId"]) == (105.0, 2, "s3")
+    deadlift = db.document_data("users/u1/prs/deadlift")
+    assert (deadlift["weight"], deadlift["setId"], deadlift["workoutExerciseId"]) == (150.0, "s6", "2")
+
+
+def test_update_prs_for_sets_keeps_created_at(db):
+    from helpers.workouts_helpers import update_prs_for_sets
+
+    db.seed("users/u1/prs", {"bench": {"exerciseId": "bench", "weight": 100.0, "reps": 5, "createdAt": "2024-01-01"}})
+    update_prs_for_sets("u1", [("bench", {"id": "s1", "weight": 100.0, "reps": 5, "isPR": True}, "w1", "0")])
+
+    bench = db.document_data("users/u1/prs/bench")
+    assert bench["createdAt"] == "2024-01-01"
+    assert bench["updatedAt"] is not None
+
+
+def test_process_workout_exercises_round_trips_do_not_grow_with_sets(db, bench):
+    from helpers.workouts_helpers import process_workout_exercises
+
+    round_trips = {}
+    for exercise_count, sets_per_exercise in [(1, 1), (6, 4), (20, 10), (50, 20)]:
+        db.reset()
+        exercises = make_exercises(exercise_count, sets_per_exercise)
+        result = bench.run(
+            f"process_workout_exercises[{exercise_count}x{sets_per_exercise}]",
+            lambda: process_workout_exercises("u1", "w1", exercises, workout_date="2024-05-01"),
+            runs=5, sets=exercise_count * sets_per_exercise,
+        )
+        round_trips[exercise_count * sets_per_exercise] = result["round_trips"]
+
+    # One get_all for PRs, one for exercise history and one commit for both
+    assert set(round_trips.values()) == {3}
+
+
+@pytest.mark.parametrize("sets_per_exercise", [1, 10])
+def test_process_workout_exercises_writes_one_pr_per_exercise(db, sets_per_exercise):
+    from helpers.workouts_helpers import process_workout_exercises
+
+    processed = process_workout_exercises("u1", "w1", make_exercises(3, sets_per_exercise), workout_date="2024-05-01")
+
+    assert db.collection_size("users/u1/prs") == 3
+    best = processed[0]["sets"][-1]
+    pr = db.document_data("users/u1/prs/ex0")
+    assert (pr["weight"], pr["setId"], pr["workoutId"]) == (best["weight"], best["id"], "w1")
+    assert best["volume"] == best["reps"] * best["weight"]
+
+
+@pytest.mark.parametrize("seed", range(20))
+def test_best_pr_candidates_match_checking_every_set(db, seed):
+    import random
+
+    from helpers.workouts_helpers import best_pr_candidates, keep_best_pr_candidates, update_prs_for_sets
+
+    rng = random.Random(seed)
+    candidates = [
+        (f"ex{rng.randrange(4)}", {
+            "id": f"s{index}", "weight": float(rng.choice([60, 80, 100, 120])), "reps": rng.randrange(1, 6),
+            "isPR": seed % 2 == 1 and rng.random() < 0.05,
+        }, f"w{index // 10}", "0")
+        for index in range(200)
+    ]
+    stored = {"ex0": {"weight": 110.0, "reps": 3}, "ex1": {"weight": 200.0, "reps": 1}}
+
+    db.seed("users/all/prs", stored)
+    update_prs_for_sets("all", candidates)
+
+    best_by_exercise = {}
+    for start in range(0, len(candidates), 30):
+        keep_best_pr_candidates(best_by_exercise, candidates[start:start + 30])
+    kept = best_pr_candidates(best_by_exercise)
+    assert len(kept) <= 2 * 4
+    db.seed("users/best/prs", stored)
+    update_prs_for_sets("best", kept)
+
+    for exercise_id in ("ex0", "ex1", "ex2", "ex3"):
+        expected = db.document_data(f"users/all/prs/{exercise_id}") or {}
+        actual = db.document_data(f"users/best/prs/{exercise_id}") or {}
+        assert {key: actual.get(key) for key in ("weight", "reps", "setId", "workoutId")} == \
+            {key: expected.get(key) for key in ("weight", "reps", "setId", "workoutId")}
+
+
+def test_process_workout_exercises_queues_writes_on_the_calling_thread(db, monkeypatch):
+    import threading
+
+    from fake_firestore import FakeWriteBatch
+    from helpers.workouts_helpers import process_workout_exercises
+
+    writer_threads = set()
+    original_set = FakeWriteBatch.set
+
+    def recording_set(self, *args, **kwargs):
+        writer_threads.add(threading.get_ident())
+        return original_set(self, *args, **kwargs)
+
+    monkeypatch.setattr(FakeWriteBatch, "set", recording_set)
+    process_workout_exercises("u1", "w1", make_exercises(4, 3), workout_date="2024-05-01")
+
+    assert writer_threads == {threading.get_ident()}
+    assert db.collection_size("users/u1/prs") == db.collection_size("users/u1/exerciseHistory") == 4
+
+
+def test_timed_out_pr_update_still_saves_the_workout(db, monkeypatch, workouts_client):
+    import functools
+
+    from helpers import workouts_helpers
+
+    monkeypatch.setattr(workouts_helpers, "run_parallel", functools.partial(workouts_helpers.run_parallel, timeout=0.05))
+    db.latency = lambda rpc: 0.3 if rpc == "get_all" else 0.0
+
+    response = workouts_client.post("/users/u1/workouts", json={"date": "2024-05-01", "exercises": make_exercises(2, 2)})
+    assert response.status_code == 200
+    assert db.collection_size("users/u1/workouts") == 1
+    assert db.collection_size("users/u1/prs") == 0
+
+
+def firestore_value_size(value):
+    """
+    Stored size of a value under Firestore's documented storage size rules.
+    """
+    if isinstance(value, str):
+        return len(value.encode("utf-8")) + 1
+    if isinstance(value, dict):
+        return sum(firestore_value_size(key) + firestore_value_size(item) for key, item in value.items())
+    if isinstance(value, (list, tuple)):
+        return sum(firestore_value_size(item) for item in value)
+    if isinstance(value, bool) or value is None:
+        return 1
+    return 8
+
+
+def test_columnar_sets_round_trip():
+    from helpers.workouts_helpers import decode_workout, encode_exercises, normalize_workout_exercises
+
+    exercises, _ = normalize_workout_exercises("w1", make_exercises(3, 5))
+    exercises[0]["sets"][1]["rpe"] = 9.5
+    exercises[1]["sets"][2]["notes"] = "paused"
+
+    stored = {"exercises": encode_exercises(exercises)}
+    assert all("sets" not in exercise for exercise in stored["exercises"])
+    assert decode_workout(stored)["exercises"] == exercises
+
+
+@pytest.mark.benchmark
+@pytest.mark.parametrize("exercise_count,sets_per_exercise", [(6, 4), (20, 10)])
+def test_columnar_vs_row_size_and_read_latency(db, bench, workouts_client, exercise_count, sets_per_exercise):
+    from helpers.workouts_helpers import encode_exercises, normalize_workout_exercises
+
+    exercises, _ = normalize_workout_exercises("w", make_exercises(exercise_count, sets_per_exercise))
+    layouts = {"rows": exercises, "columnar": encode_exercises(exercises)}
+    workouts = 365
+    shape = f"{exercise_count}x{sets_per_exercise}"
+
+    results = {}
+    for layout, stored in layouts.items():
+        db.reset()
+        db.seed("users/u1/workouts", {
+            f"w{index:03d}": {"date": f"2024-01-{index % 28 + 1:02d}", "exercises": stored} for index in range(workouts)
+        })
+
+        def read_year():
+            response = workouts_client.get("/users/u1/workouts")
+            assert response.status_code == 200
+
+        results[layout] = bench.run(
+            f"workouts_list_{layout}[{shape}]", read_year, runs=5,
+            workouts=workouts, bytes_per_workout=firestore_value_size({"exercises": stored}),
+        )
+
+    bench.record(
+        f"columnar_vs_rows[{shape}]",
+        size_ratio=round(results["columnar"]["bytes_per_workout"] / results["rows"]["bytes_per_workout"], 3),
+        latency_ratio=round(results["columnar"]["p50_ms"] / results["rows"]["p50_ms"], 3),
+    )
+    # Field names are stored once per exercise instead of once per set
+    assert results["columnar"]["bytes_per_workout"] < results["rows"]["bytes_per_workout"] * 0.7
+    assert workouts_client.get("/users/u1/workouts?limit=1").get_json()[0]["exercises"] == exercises
+
+
+def test_migration_does_not_overwrite_a_concurrent_edit(db, monkeypatch):
+    from helpers import workouts_helpers
+
+    db.seed("users/u1/workouts", {
+        f"w{index}": {"date": "2024-05-01", "exercises": make_exercises(1, 2)} for index in range(3)
+    })
+    original = workouts_helpers._commit_migration
+
+    def racing_commit(docs, columnar):
+        # The app saves w1 after the migration read it
+        db.collection("users/u1/workouts").document("w1").update({"exercises": make_exercises(2, 2)})
+        return original(docs, columnar)
+
+    monkeypatch.setattr(workouts_helpers, "_commit_migration", racing_commit)
+    assert workouts_helpers.migrate_set_encoding("u1") == 3
+
+    for workout_id, exercise_count in (("w0", 1), ("w1", 2), ("w2", 1)):
+        stored = db.document_data(f"users/u1/workouts/{workout_id}")["exercises"]
+        assert all("sets" not in exercise for exercise in stored)
+        decoded = workouts_helpers.decode_exercises(stored)
+        assert [[set_data["reps"] for set_data in exercise["sets"]] for exercise in decoded] == [[5, 6]] * exercise_count
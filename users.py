@@ -1,16 +1,52 @@
 from flask import Flask, request, jsonify, g
-from config.db import db
+from helpers.lazy_helpers import firestore_client, lazy_import
+from helpers.metrics_helpers import instrument_client, install_request_metrics
+from helpers.json_helpers import install_json_provider
 from .error_codes import ERROR_CODES
-from firebase_admin import firestore
 from datetime import datetime, timedelta
-import pytz
 import json
 import logging
+from helpers.workouts_helpers import parse_bool
+from helpers.users_helpers import (
+    delete_user_tree,
+    start_delete_job,
+    get_delete_job,
+    get_user_docs,
+    normalize_phone,
+    phone_exists,
+    create_user_with_phone_index,
+    update_user_with_phone_index,
+    rebuild_phone_index,
+)
+from helpers.response_helpers import (
+    parse_page_size,
+    wants_ndjson,
+    paginate_query,
+    ndjson_response,
+    parse_fields,
+    parse_ids,
+    order_by_ids,
+    select_fields,
+    snapshot_etag,
+    collection_etag,
+    is_not_modified,
+    not_modified_response,
+    with_etag,
+)
+
+# Heavy dependencies load on first use rather than at cold start
+firestore = lazy_import("firebase_admin.firestore")
+api_exceptions = lazy_import("google.api_core.exceptions")
+
+# Count and time every Firestore call made through this module
+db = instrument_client(firestore_client)
 
 
 def create_users_app():
     # Initialize Flask app
     usersApp = Flask(__name__)
+    install_request_metrics(usersApp)
+    install_json_provider(usersApp)
 
     # Firestore - getUser by ID
     @usersApp.route('/getUser/<id>', methods=['GET'])
@@ -23,9 +59,12 @@ def create_users_app():
                     "code": ERROR_CODES["USER_NOT_FOUND"]["code"],
                     "details": f"User {id} not found"
                 }), 404
+            etag = snapshot_etag(doc)
+            if is_not_modified(request, etag):
+                return not_modified_response(etag), 304
             user = doc.to_dict()
             user["id"] = id
-            return jsonify(user), 200
+            return with_etag(jsonify(user), etag), 200
         except Exception as e:
             logging.error(f"Could not retrieve user {id}: {e}")
             return jsonify({
@@ -38,14 +77,72 @@ def create_users_app():
     @usersApp.route('/getUsers', methods=['GET'])
     def getUsers():
         try:
+            try:
+                page_size = parse_page_size(request.args.get("pageSize"))
+            except (TypeError, ValueError):
+                return jsonify({
+                    "error": ERROR_CODES["INVALID_REQUEST"]["message"],
+                    "code": ERROR_CODES["INVALID_REQUEST"]["code"],
+                    "details": "pageSize must be a positive integer"
+                }), 400
+
+            try:
+                fields = parse_fields(request.args.get("fields"))
+            except ValueError:
+                return jsonify({
+                    "error": ERROR_CODES["INVALID_REQUEST"]["message"],
+                    "code": ERROR_CODES["INVALID_REQUEST"]["code"],
+                    "details": "fields must be a comma-separated list of field paths"
+                }), 400
+
+            # getUsers?ids=a,b,c resolves every id with one read, in request order
+            if request.args.get("ids") is not None:
+                try:
+                    ids = parse_ids(request.args.get("ids"))
+                except ValueError as e:
+                    return jsonify({
+                        "error": ERROR_CODES["INVALID_REQUEST"]["message"],
+                        "code": ERROR_CODES["INVALID_REQUEST"]["code"],
+                        "details": str(e)
+                    }), 400
+
+                docs_by_id = get_user_docs(ids, fields)
+                etag = collection_etag([docs_by_id[user_id] for user_id in ids if user_id in docs_by_id], ids, fields)
+                if is_not_modified(request, etag):
+                    return not_modified_response(etag), 304
+                users = order_by_ids(ids, docs_by_id, lambda user_id: {
+                    "id": user_id,
+                    "error": ERROR_CODES["USER_NOT_FOUND"]["message"],
+                    "code": ERROR_CODES["USER_NOT_FOUND"]["code"],
+                    "details": f"User {user_id} not found"
+                })
+                return with_etag(jsonify({"items": users}), etag), 200
+
+            users_query = select_fields(db.collection('users'), fields)
+            if page_size:
+                users, next_page_token = paginate_query(
+                    users_query, page_size, request.args.get("pageToken")
+                )
+                return jsonify({
+                    "items": users,
+                    "nextPageToken": next_page_token
+                }), 200
+
+            if wants_ndjson(request):
+                return ndjson_response(users_query.stream())
+
+            userDocs = list(users_query.stream())
+            etag = collection_etag(userDocs, fields)
+            if is_not_modified(request, etag):
+                return not_modified_response(etag), 304
+
             docData = []
-            userCollection = db.collection('users').stream()
-            for doc in userCollection:
+            for doc in userDocs:
                 # Include the document ID in the response
                 user = doc.to_dict()
                 user["id"] = doc.id
                 docData.append(user)
-            return jsonify(docData), 200
+            return with_etag(jsonify(docData), etag), 200
         except Exception as e:
             logging.error(f"Could not retrieve users: {e}")
             return jsonify({
@@ -66,11 +163,17 @@ def create_users_app():
                     "details": "phoneNumber is required."
                 }), 400
 
-            query = db.collection("users").where("phoneNumber", "==", phone).limit(1)
-            user_exists = any(True for _ in query.stream())
+            normalized_phone = normalize_phone(phone)
+            if normalized_phone is None:
+                return jsonify({
+                    "error": ERROR_CODES["INVALID_REQUEST"]["message"],
+                    "code": ERROR_CODES["INVALID_REQUEST"]["code"],
+                    "details": "phoneNumber is not a valid phone number."
+                }), 400
 
+            # Point read on phoneIndex; the users query only runs on an index miss
             return jsonify({
-                "exists": user_exists
+                "exists": phone_exists(normalized_phone, phone)
             }), 200
         except Exception as e:
             logging.error(f"Could not check phone number: {e}")
@@ -80,6 +183,23 @@ def create_users_app():
                 "details": "Could not check phone number"
             }), 500
 
+    # Backfill job for phoneIndex (run once after deploying, or to repair drift)
+    @usersApp.route('/phoneIndex/rebuild', methods=['POST'])
+    def rebuildPhoneIndex():
+        try:
+            indexed = rebuild_phone_index()
+            return jsonify({
+                "message": "Phone index rebuilt",
+                "phoneNumbers": indexed
+            }), 200
+        except Exception as e:
+            logging.error(f"Could not rebuild phone index: {e}")
+            return jsonify({
+                "error": ERROR_CODES["INTERNAL_SERVER_ERROR"]["message"],
+                "code": ERROR_CODES["INTERNAL_SERVER_ERROR"]["code"],
+                "details": "Could not rebuild phone index"
+            }), 500
+
     # Firestore - createUser
     @usersApp.route('/createUser', methods=['POST'])
     def createUser():
@@ -115,7 +235,7 @@ def create_users_app():
                 data["gender"] = "N/A"
 
             uid = data["id"]
-            db.collection('users').document(uid).create(data)
+            create_user_with_phone_index(uid, data)
 
             return jsonify({
                 "message": "User created",
@@ -133,16 +253,26 @@ def create_users_app():
     @usersApp.route('/deleteUser/<id>', methods=['DELETE'])
     def deleteUser(id):
         try:
-            doc = db.collection('users').document(id).get()
-            if doc.exists:
-                db.collection('users').document(id).delete() # for some reason it won't work with doc.delete()
-                return jsonify({"message": f"User {id} deleted"}), 200
-            else:
+            if not db.collection('users').document(id).get().exists:
                 return jsonify({
                     "error": ERROR_CODES["USER_NOT_FOUND"]["message"],
                     "code": ERROR_CODES["USER_NOT_FOUND"]["code"],
                     "details": f"User {id} not found"
                 }), 404
+
+            # Cascade through exercises, workouts (and their items), prs, etc.;
+            # the user doc and its phoneIndex entry are removed last
+            if parse_bool(request.args.get("background")):
+                job_id = start_delete_job(id)
+                return jsonify({
+                    "message": f"User {id} deletion started",
+                    "jobId": job_id
+                }), 202
+            deleted = delete_user_tree(id)
+            return jsonify({
+                "message": f"User {id} deleted",
+                "deletedDocuments": deleted
+            }), 200
         except Exception as e:
             logging.error(f"Could not delete user {id}: {e}")
             return jsonify({
@@ -151,6 +281,27 @@ def create_users_app():
                 "details": f"Could not delete user {id}"
             }), 500
 
+    # Progress of a background deleteUser job
+    @usersApp.route('/deleteUser/jobs/<job_id>', methods=['GET'])
+    def deleteUserJob(job_id):
+        try:
+            job = get_delete_job(job_id)
+            if job is None:
+                # Jobs are keyed by user id, so an unknown job is an unknown user
+                return jsonify({
+                    "error": ERROR_CODES["USER_NOT_FOUND"]["message"],
+                    "code": ERROR_CODES["USER_NOT_FOUND"]["code"],
+                    "details": f"No delete job for user {job_id}"
+                }), 404
+            return jsonify(job), 200
+        except Exception as e:
+            logging.error(f"Could not read delete job {job_id}: {e}")
+            return jsonify({
+                "error": ERROR_CODES["INTERNAL_SERVER_ERROR"]["message"],
+                "code": ERROR_CODES["INTERNAL_SERVER_ERROR"]["code"],
+                "details": f"Could not read delete job {job_id}"
+            }), 500
+
     # Firestore - updateUser by ID
     @usersApp.route('/updateUser/<id>', methods=['PUT'])
     def updateUser(id):
@@ -162,31 +313,41 @@ def create_users_app():
                     "code": ERROR_CODES["NO_DATA_PROVIDED"]["code"],
                     "details": "No data provided."
                 }), 400
-            doc = db.collection('users').document(id).get()
-            if doc.exists:
-                # Security: Prevent privilege escalation
-                data.pop("isAdmin", None)
-
-                # Add updatedAt timestamp
-                data["updatedAt"] = firestore.SERVER_TIMESTAMP
-
-                first_name = data.get("firstName", "")
-                last_name = data.get("lastName", "")
-                if first_name:
-                    first_name.capitalize()
-                    data["firstName"] = first_name
-                if last_name:
-                    last_name.capitalize()
-                    data["lastName"] = last_name
+            # Security: Prevent privilege escalation
+            data.pop("isAdmin", None)
 
-                db.collection('users').document(id).update(data)
+            # Add updatedAt timestamp
+            data["updatedAt"] = firestore.SERVER_TIMESTAMP
+
+            first_name = data.get("firstName", "")
+            last_name = data.get("lastName", "")
+            if first_name:
+                first_name.capitalize()
+                data["firstName"] = first_name
+            if last_name:
+                last_name.capitalize()
+                data["lastName"] = last_name
+
+            # Phone changes move the phoneIndex entry transactionally, which needs a read
+            if "phoneNumber" in data:
+                if not update_user_with_phone_index(id, data):
+                    return jsonify({
+                        "error": ERROR_CODES["USER_NOT_FOUND"]["message"],
+                        "code": ERROR_CODES["USER_NOT_FOUND"]["code"],
+                        "details": f"User {id} not found"
+                    }), 404
                 return jsonify({"message": f"User {id} updated"}), 200
-            else:
+
+            # update() fails with NOT_FOUND for unknown users, so no read is needed first
+            try:
+                db.collection('users').document(id).update(data)
+            except api_exceptions.NotFound:
                 return jsonify({
                     "error": ERROR_CODES["USER_NOT_FOUND"]["message"],
                     "code": ERROR_CODES["USER_NOT_FOUND"]["code"],
                     "details": f"User {id} not found"
                 }), 404
+            return jsonify({"message": f"User {id} updated"}), 200
         except Exception as e:
             logging.error(f"Could not update user {id}: {e}")
             return jsonify({
@@ -206,12 +367,15 @@ def create_users_app():
                     "code": ERROR_CODES["USER_NOT_FOUND"]["code"],
                     "details": f"User {id} not found"
                 }), 404
+            etag = snapshot_etag(doc)
+            if is_not_modified(request, etag):
+                return not_modified_response(etag), 304
             user = doc.to_dict()
             user["id"] = id
             viewer_id = request.args.get("viewerId")
             if not viewer_id:
                 viewer_id = getattr(g, "user", {}).get("uid") if hasattr(g, "user") else None
-            return jsonify(user), 200
+            return with_etag(jsonify(user), etag), 200
         except Exception as e:
             logging.error(f"Could not retrieve user {id}: {e}")
             return jsonify({
@@ -0,0 +1,379 @@
+from helpers.lazy_helpers import firestore_client, lazy_import
+from helpers.metrics_helpers import instrument_client
+from helpers.executor_helpers import run_in_background
+from helpers.cache_helpers import phone_negative_cache
+from datetime import datetime, timedelta, timezone
+import logging
+import os
+import re
+import uuid
+
+# Heavy dependencies load on first use rather than at cold start
+firestore = lazy_import("firebase_admin.firestore")
+firestore_bulk_writer = lazy_import("google.cloud.firestore_v1.bulk_writer")
+
+# Count and time every Firestore call made through this module
+db = instrument_client(firestore_client)
+
+
+# Page size used when listing documents to delete
+DELETE_PAGE_SIZE = 500
+
+# Ceiling for delete throughput so a cascade does not starve live traffic
+DELETE_MAX_OPS_PER_SECOND = 500
+
+# Subcollections nested under documents of a user subcollection
+NESTED_SUBCOLLECTIONS = {
+    "workouts": ("items",),
+}
+
+# phoneIndex/<E.164 number> holds the ids of the users registered with that number
+PHONE_INDEX_COLLECTION = "phoneIndex"
+
+# Country calling code assumed for numbers entered without one
+DEFAULT_PHONE_COUNTRY_CODE = os.environ.get("DEFAULT_PHONE_COUNTRY_CODE", "1")
+
+# Digits in a national number of the default country (10 for the NANP)
+DEFAULT_NATIONAL_NUMBER_LENGTH = int(os.environ.get("DEFAULT_NATIONAL_NUMBER_LENGTH", "10"))
+
+PHONE_SEPARATORS = re.compile(r"[\s().\-/]")
+
+# Attempts per document before a cascade gives up and keeps the user document
+DELETE_MAX_ATTEMPTS = 10
+
+# deleteJobs/<userId> tracks background deletes, so any worker can answer a poll.
+# expireAt drives a Firestore TTL policy on the collection that prunes old jobs.
+DELETE_JOBS_COLLECTION = "deleteJobs"
+DELETE_JOB_TTL = timedelta(days=7)
+
+
+def iter_document_refs(collection_ref, page_size=DELETE_PAGE_SIZE):
+    """
+    Pages through a collection by document id, reading only the document names.
+    """
+    query = collection_ref.select([]).order_by("__name__").limit(page_size)
+    cursor = None
+    while True:
+        page_query = query.start_after(cursor) if cursor is not None else query
+        docs = list(page_query.stream())
+        for doc in docs:
+            yield doc.reference
+        if len(docs) < page_size:
+            return
+        cursor = docs[-1]
+
+
+def normalize_phone(phone):
+    """
+    Normalizes a phone number to E.164 ("+15551234567"). Spaces, dashes, dots,
+    slashes and parentheses are ignored, and a leading 00 is read as +. Without
+    a prefix, only a national number of the default country is accepted: its
+    DEFAULT_NATIONAL_NUMBER_LENGTH digits, optionally preceded by
+    DEFAULT_PHONE_COUNTRY_CODE. Returns None when the value cannot be a phone
+    number, including any other unprefixed number ("07911 123456", "12345"),
+    whose country cannot be known.
+    """
+    if not isinstance(phone, str):
+        return None
+    phone = PHONE_SEPARATORS.sub("", phone.strip())
+    if phone.startswith("00"):
+        phone = "+" + phone[2:]
+    if phone.startswith("+"):
+        digits = phone[1:]
+    else:
+        digits = phone
+        if digits.startswith("0"):
+            return None
+        if len(digits) == DEFAULT_NATIONAL_NUMBER_LENGTH:
+            digits = DEFAULT_PHONE_COUNTRY_CODE + digits
+        elif not (digits.startswith(DEFAULT_PHONE_COUNTRY_CODE)
+                  and len(digits) == len(DEFAULT_PHONE_COUNTRY_CODE) + DEFAULT_NATIONAL_NUMBER_LENGTH):
+            return None
+    if not digits.isdigit() or not 8 <= len(digits) <= 15 or digits.startswith("0"):
+        return None
+    return "+" + digits
+
+
+def get_phone_index_ref(normalized_phone):
+    return db.collection(PHONE_INDEX_COLLECTION).document(normalized_phone)
+
+
+def legacy_phone_query(users_collection, phone, normalized_phone):
+    """
+    The pre-index lookup: users whose stored phoneNumber is the number as
+    entered or its E.164 form (stored values were never normalized).
+    """
+    values = list(dict.fromkeys((phone, normalized_phone)))
+    return users_collection.where("phoneNumber", "in", values).select([]).limit(1)
+
+
+def phone_exists(normalized_phone, phone=None):
+    """
+    One point read on phoneIndex; numbers recently seen as absent are answered
+    from phone_negative_cache without a read. An index miss falls back to
+    querying users, so users created before /phoneIndex/rebuild ran are still
+    found; only numbers absent from both are negative-cached.
+    """
+    if phone_negative_cache.peek(normalized_phone):
+        return False
+    if get_phone_index_ref(normalized_phone).get().exists:
+        return True
+    if any(True for _ in legacy_phone_query(db.collection("users"), phone or normalized_phone, normalized_phone).stream()):
+        return True
+    phone_negative_cache.put(normalized_phone, True)
+    return False
+
+
+def _read_phone_index(transaction, normalized_phones):
+    """
+    Reads the phoneIndex docs for the given numbers inside a transaction.
+    Returns normalized_phone -> set of user ids.
+    """
+    user_ids = {}
+    for normalized_phone in normalized_phones:
+        snapshot = get_phone_index_ref(normalized_phone).get(transaction=transaction)
+        user_ids[normalized_phone] = set((snapshot.to_dict() or {}).get("userIds") or []) if snapshot.exists else set()
+    return user_ids
+
+
+def _write_phone_index(transaction, normalized_phone, user_ids):
+    index_ref = get_phone_index_ref(normalized_phone)
+    if user_ids:
+        transaction.set(index_ref, {
+            "userIds": sorted(user_ids),
+            "updatedAt": firestore.SERVER_TIMESTAMP,
+        })
+    else:
+        transaction.delete(index_ref)
+    phone_negative_cache.invalidate(normalized_phone)
+
+
+def _create_user(transaction, user_ref, data):
+    normalized_phone = normalize_phone(data.get("phoneNumber"))
+    index = _read_phone_index(transaction, [normalized_phone] if normalized_phone else [])
+    transaction.create(user_ref, data)
+    if normalized_phone:
+        _write_phone_index(transaction, normalized_phone, index[normalized_phone] | {user_ref.id})
+
+
+def create_user_with_phone_index(user_id, data):
+    """
+    Creates the user document and adds it to phoneIndex in one transaction.
+    Raises AlreadyExists (from Firestore) when the user already exists.
+    """
+    firestore.transactional(_create_user)(db.transaction(), db.collection("users").document(user_id), data)
+
+
+def _update_user(transaction, user_ref, data):
+    snapshot = user_ref.get(transaction=transaction)
+    if not snapshot.exists:
+        return False
+    old_phone = normalize_phone((snapshot.to_dict() or {}).get("phoneNumber"))
+    new_phone = normalize_phone(data.get("phoneNumber"))
+    changed = old_phone != new_phone
+    phones = [phone for phone in dict.fromkeys((old_phone, new_phone)) if phone] if changed else []
+    index = _read_phone_index(transaction, phones)
+    transaction.update(user_ref, data)
+    if changed and old_phone:
+        _write_phone_index(transaction, old_phone, index[old_phone] - {user_ref.id})
+    if changed and new_phone:
+        _write_phone_index(transaction, new_phone, index[new_phone] | {user_ref.id})
+    return True
+
+
+def update_user_with_phone_index(user_id, data):
+    """
+    Updates a user whose phoneNumber may change, moving it between phoneIndex
+    docs in the same transaction. Returns False when the user does not exist.
+    """
+    return firestore.transactional(_update_user)(db.transaction(), db.collection("users").document(user_id), data)
+
+
+def _delete_user(transaction, user_ref):
+    snapshot = user_ref.get(transaction=transaction)
+    if not snapshot.exists:
+        return False
+    normalized_phone = normalize_phone((snapshot.to_dict() or {}).get("phoneNumber"))
+    index = _read_phone_index(transaction, [normalized_phone] if normalized_phone else [])
+    transaction.delete(user_ref)
+    if normalized_phone:
+        _write_phone_index(transaction, normalized_phone, index[normalized_phone] - {user_ref.id})
+    return True
+
+
+def delete_user_with_phone_index(user_id):
+    """
+    Deletes the user document and drops it from phoneIndex in one transaction.
+    Returns False when the user does not exist.
+    """
+    return firestore.transactional(_delete_user)(db.transaction(), db.collection("users").document(user_id))
+
+
+def rebuild_phone_index():
+    """
+    Backfill job: rebuilds phoneIndex from users.phoneNumber and removes index
+    docs for numbers no user has any more. Returns the number of index docs written.
+    """
+    user_ids_by_phone = {}
+    for doc in db.collection("users").select(["phoneNumber"]).stream():
+        normalized_phone = normalize_phone((doc.to_dict() or {}).get("phoneNumber"))
+        if normalized_phone:
+            user_ids_by_phone.setdefault(normalized_phone, set()).add(doc.id)
+
+    stale_refs = [
+        doc.reference for doc in db.collection(PHONE_INDEX_COLLECTION).select([]).stream()
+        if doc.id not in user_ids_by_phone
+    ]
+
+    bulk_writer = db.bulk_writer()
+    for normalized_phone, user_ids in user_ids_by_phone.items():
+        bulk_writer.set(get_phone_index_ref(normalized_phone), {
+            "userIds": sorted(user_ids),
+            "updatedAt": firestore.SERVER_TIMESTAMP,
+        })
+    for stale_ref in stale_refs:
+        bulk_writer.delete(stale_ref)
+    bulk_writer.close()
+    phone_negative_cache.clear()
+    return len(user_ids_by_phone)
+
+
+def get_user_docs(user_ids, fields=None):
+    """
+    Reads several user documents with one get_all call, optionally projected.
+    Returns a dict of user_id -> snapshot for the ids that exist.
+    """
+    users_collection = db.collection("users")
+    refs = [users_collection.document(user_id) for user_id in user_ids]
+    return {
+        snapshot.id: snapshot
+        for snapshot in db.get_all(refs, field_paths=fields)
+        if snapshot.exists
+    }
+
+
+def delete_user_tree(user_id, progress=None, page_size=DELETE_PAGE_SIZE, max_ops_per_second=DELETE_MAX_OPS_PER_SECOND):
+    """
+    Deletes every subcollection under a user (including workouts/<id>/items)
+    through a throttled BulkWriter, then the user document and its phoneIndex
+    entry. The user document goes last, so a cascade that fails part way leaves
+    it in place and calling deleteUser again resumes where it stopped.
+    progress(deleted_count) is called after every page of deletes.
+    Returns the number of documents deleted.
+    """
+    user_ref = db.collection("users").document(user_id)
+    bulk_writer = db.bulk_writer(options=firestore_bulk_writer.BulkWriterOptions(
+        initial_ops_per_second=min(max_ops_per_second, 500),
+        max_ops_per_second=max_ops_per_second,
+    ))
+    failures = []
+
+    def on_write_error(failure, _bulk_writer):
+        if failure.attempts < DELETE_MAX_ATTEMPTS:
+            return True
+        failures.append(failure)
+        return False
+
+    def raise_on_failures():
+        if failures:
+            raise RuntimeError(f"{len(failures)} deletes failed under user {user_id}: {failures[0].message}")
+
+    def delete_parents(parent_refs, has_nested):
+        # A parent goes only once its nested docs are gone, so a resumed cascade can still find them
+        if has_nested:
+            bulk_writer.flush()
+            raise_on_failures()
+        for parent_ref in parent_refs:
+            bulk_writer.delete(parent_ref)
+        return len(parent_refs)
+
+    bulk_writer.on_write_error(on_write_error)
+
+    deleted = 0
+    for collection_ref in user_ref.collections():
+        nested_names = NESTED_SUBCOLLECTIONS.get(collection_ref.id, ())
+        parents = []
+        for doc_ref in iter_document_refs(collection_ref, page_size):
+            for nested_name in nested_names:
+                for nested_ref in iter_document_refs(doc_ref.collection(nested_name), page_size):
+                    bulk_writer.delete(nested_ref)
+                    deleted += 1
+            parents.append(doc_ref)
+            if len(parents) == page_size:
+                deleted += delete_parents(parents, bool(nested_names))
+                parents = []
+                if progress:
+                    progress(deleted)
+        deleted += delete_parents(parents, bool(nested_names))
+
+    bulk_writer.close()
+    raise_on_failures()
+
+    if delete_user_with_phone_index(user_id):
+        deleted += 1
+    if progress:
+        progress(deleted)
+    return deleted
+
+
+def get_delete_job_ref(user_id):
+    return db.collection(DELETE_JOBS_COLLECTION).document(user_id)
+
+
+def _update_delete_job(user_id, **fields):
+    get_delete_job_ref(user_id).set(fields, merge=True)
+
+
+def _run_delete_job(user_id):
+    try:
+        deleted = delete_user_tree(
+            user_id,
+            progress=lambda count: _update_delete_job(user_id, deleted=count),
+        )
+        _update_delete_job(
+            user_id,
+            status="completed",
+            deleted=deleted,
+            finishedAt=datetime.now(timezone.utc).isoformat(),
+        )
+    except Exception as e:
+        logging.error(f"Delete job for user {user_id} failed: {e}")
+        _update_delete_job(
+            user_id,
+            status="failed",
+            finishedAt=datetime.now(timezone.utc).isoformat(),
+        )
+
+
+def start_delete_job(user_id):
+    """
+    Runs delete_user_tree in the background and returns the job id to poll.
+    Jobs are keyed by user, so restarting a failed delete reuses its job.
+    """
+    now = datetime.now(timezone.utc)
+    get_delete_job_ref(user_id).set({
+        "jobId": user_id,
+        "userId": user_id,
+        "status": "running",
+        "deleted": 0,
+        "startedAt": now.isoformat(),
+        "finishedAt": None,
+        "expireAt": now + DELETE_JOB_TTL,
+    })
+    run_in_background(_run_delete_job, user_id)
+    return user_id
+
+
+def get_delete_job(job_id):
+    """
+    Returns the job state, or None for unknown jobs and ones past expireAt
+    (TTL deletion can lag by a day).
+    """
+    snapshot = get_delete_job_ref(job_id).get()
+    if not snapshot.exists:
+        return None
+    job = snapshot.to_dict() or {}
+    expire_at = job.pop("expireAt", None)
+    if expire_at is not None and expire_at <= datetime.now(timezone.utc):
+        return None
+    return job
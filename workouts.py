@@ -1,19 +1,88 @@
-from flask import Flask, request, jsonify
-import concurrent.futures
-from config.db import db
+from flask import Flask, Response, current_app, request, jsonify, stream_with_context
+from helpers.lazy_helpers import firestore_client, lazy_import
+from helpers.metrics_helpers import instrument_client, install_request_metrics
+from helpers.json_helpers import install_json_provider
 from .error_codes import ERROR_CODES
-from firebase_admin import firestore
-from datetime import datetime
 import logging
 from helpers.workouts_helpers import (
     parse_bool,
     get_workout_ref,
     process_workout_exercises,
+    get_template_doc,
+    get_template_catalog,
+    get_template_docs,
+    invalidate_template_cache,
+    get_exercise_names,
+    parse_watermark,
+    record_tombstone,
+    get_changes_since,
+    update_exercise_history,
+    rebuild_exercise_history,
+    store_exercises,
+    decode_workout,
+    migrate_set_encoding,
 )
+from helpers.stats_helpers import (
+    local_date,
+    compute_workout_volume,
+    create_workout_with_summary,
+    queue_summary_increment,
+    get_summary,
+    rebuild_summary,
+)
+from helpers.import_export_helpers import (
+    import_workouts_from_stream,
+    iter_export_ndjson,
+    iter_export_csv,
+    gzip_chunks,
+)
+from helpers.analytics_helpers import (
+    get_training_analytics,
+    invalidate_training_analytics,
+    queue_analytics_version_bump,
+)
+from helpers.autosave_helpers import (
+    queue_workout_autosave,
+    save_workout_now,
+    discard_workout_autosave,
+)
+from helpers.search_helpers import (
+    DEFAULT_SEARCH_LIMIT,
+    search_exercises,
+    search_templates,
+    index_exercise,
+    unindex_exercise,
+    index_template,
+)
+from helpers.response_helpers import (
+    parse_page_size,
+    wants_ndjson,
+    paginate_query,
+    ndjson_response,
+    parse_fields,
+    parse_ids,
+    order_by_ids,
+    select_fields,
+    project,
+    snapshot_etag,
+    collection_etag,
+    is_not_modified,
+    not_modified_response,
+    with_etag,
+)
+
+# Heavy dependencies load on first use rather than at cold start
+firestore = lazy_import("firebase_admin.firestore")
+api_exceptions = lazy_import("google.api_core.exceptions")
+
+# Count and time every Firestore call made through this module
+db = instrument_client(firestore_client)
 
 
 def create_workouts_app():
     workoutsApp = Flask(__name__)
+    install_request_metrics(workoutsApp)
+    install_json_provider(workoutsApp)
 
     # Exercises
     @workoutsApp.route('/users/<user_id>/exercises', methods=['POST', 'GET'])
@@ -40,22 +109,38 @@ def create_workouts_app():
                     "updatedAt": firestore.SERVER_TIMESTAMP
                 }
                 exercise_ref.set(exercise_data)
+                index_exercise(user_id, exercise_ref.id, exercise_data)
                 return jsonify({
                     "message": "Exercise created",
                     "id": exercise_ref.id
                 }), 200
 
+            try:
+                fields = parse_fields(request.args.get("fields"))
+            except ValueError:
+                return jsonify({
+                    "error": ERROR_CODES["INVALID_REQUEST"]["message"],
+                    "code": ERROR_CODES["INVALID_REQUEST"]["code"],
+                    "details": "fields must be a comma-separated list of field paths"
+                }), 400
+
             include_archived = parse_bool(request.args.get("includeArchived"), False)
             exercise_query = db.collection("users").document(user_id).collection("exercises")
             if not include_archived:
                 exercise_query = exercise_query.where("archived", "==", False)
+            exercise_query = select_fields(exercise_query, fields)
+
+            exercise_docs = list(exercise_query.stream())
+            etag = collection_etag(exercise_docs, include_archived, fields)
+            if is_not_modified(request, etag):
+                return not_modified_response(etag), 304
 
             exercises = []
-            for doc in exercise_query.stream():
+            for doc in exercise_docs:
                 exercise = doc.to_dict()
                 exercise["id"] = doc.id
                 exercises.append(exercise)
-            return jsonify(exercises), 200
+            return with_etag(jsonify(exercises), etag), 200
         except Exception as e:
             logging.error(f"Could not handle exercises for user {user_id}: {e}")
             return jsonify({
@@ -68,32 +153,55 @@ def create_workouts_app():
     def exercise_detail(user_id, exercise_id):
         try:
             exercise_ref = db.collection("users").document(user_id).collection("exercises").document(exercise_id)
-            exercise_doc = exercise_ref.get()
-            if not exercise_doc.exists:
-                return jsonify({
-                    "error": ERROR_CODES["EXERCISE_NOT_FOUND"]["message"],
-                    "code": ERROR_CODES["EXERCISE_NOT_FOUND"]["code"],
-                    "details": f"Exercise {exercise_id} not found for user {user_id}"
-                }), 404
 
             if request.method == 'GET':
+                exercise_doc = exercise_ref.get()
+                if not exercise_doc.exists:
+                    return jsonify({
+                        "error": ERROR_CODES["EXERCISE_NOT_FOUND"]["message"],
+                        "code": ERROR_CODES["EXERCISE_NOT_FOUND"]["code"],
+                        "details": f"Exercise {exercise_id} not found for user {user_id}"
+                    }), 404
+                etag = snapshot_etag(exercise_doc)
+                if is_not_modified(request, etag):
+                    return not_modified_response(etag), 304
                 exercise = exercise_doc.to_dict()
                 exercise["id"] = exercise_doc.id
-                return jsonify(exercise), 200
-
-            if request.method == 'PUT':
-                data = request.get_json(silent=True) or {}
-                if not data:
-                    return jsonify({
-                        "error": ERROR_CODES["NO_DATA_PROVIDED"]["message"],
-                        "code": ERROR_CODES["NO_DATA_PROVIDED"]["code"],
-                        "details": "No update data provided."
-                    }), 400
-                data["updatedAt"] = firestore.SERVER_TIMESTAMP
-                exercise_ref.update(data)
-                return jsonify({"message": f"Exercise {exercise_id} updated"}), 200
+                return with_etag(jsonify(exercise), etag), 200
 
-            exercise_ref.delete()
+            # PUT and DELETE rely on Firestore's exists precondition instead of a read first
+            try:
+                if request.method == 'PUT':
+                    data = request.get_json(silent=True) or {}
+                    if not data:
+                        return jsonify({
+                            "error": ERROR_CODES["NO_DATA_PROVIDED"]["message"],
+                            "code": ERROR_CODES["NO_DATA_PROVIDED"]["code"],
+                            "details": "No update data provided."
+                        }), 400
+                    data["updatedAt"] = firestore.SERVER_TIMESTAMP
+                    # Muscle groups feed the analytics, so their version moves too
+                    batch = db.batch()
+                    batch.update(exercise_ref, data)
+                    queue_analytics_version_bump(batch, user_id)
+                    batch.commit()
+                    index_exercise(user_id, exercise_id, data, merge=True)
+                    invalidate_training_analytics(user_id)
+                    return jsonify({"message": f"Exercise {exercise_id} updated"}), 200
+
+                batch = db.batch()
+                batch.delete(exercise_ref, option=db.write_option(exists=True))
+                record_tombstone(batch, user_id, "exercises", exercise_id)
+                queue_analytics_version_bump(batch, user_id)
+                batch.commit()
+                unindex_exercise(user_id, exercise_id)
+            except api_exceptions.NotFound:
+                return jsonify({
+                    "error": ERROR_CODES["EXERCISE_NOT_FOUND"]["message"],
+                    "code": ERROR_CODES["EXERCISE_NOT_FOUND"]["code"],
+                    "details": f"Exercise {exercise_id} not found for user {user_id}"
+                }), 404
+            invalidate_training_analytics(user_id)
             return jsonify({"message": f"Exercise {exercise_id} deleted"}), 200
         except Exception as e:
             logging.error(f"Could not process exercise {exercise_id} for user {user_id}: {e}")
@@ -103,20 +211,97 @@ def create_workouts_app():
                 "details": f"Could not process exercise {exercise_id} for user {user_id}"
             }), 500
 
+    # Exercise search: prefix and fuzzy matching on name, muscle groups and equipment
+    @workoutsApp.route('/users/<user_id>/exercises/search', methods=['GET'])
+    def search_user_exercises(user_id):
+        try:
+            query = (request.args.get("q") or "").strip()
+            if not query:
+                return jsonify({
+                    "error": ERROR_CODES["INVALID_REQUEST"]["message"],
+                    "code": ERROR_CODES["INVALID_REQUEST"]["code"],
+                    "details": "q is required"
+                }), 400
+            try:
+                limit = parse_page_size(request.args.get("limit")) or DEFAULT_SEARCH_LIMIT
+            except (TypeError, ValueError):
+                return jsonify({
+                    "error": ERROR_CODES["INVALID_REQUEST"]["message"],
+                    "code": ERROR_CODES["INVALID_REQUEST"]["code"],
+                    "details": "limit must be a positive integer"
+                }), 400
+
+            include_archived = parse_bool(request.args.get("includeArchived"), False)
+            results = search_exercises(user_id, query, limit, include_archived)
+            return jsonify({"items": results}), 200
+        except Exception as e:
+            logging.error(f"Could not search exercises for user {user_id}: {e}")
+            return jsonify({
+                "error": ERROR_CODES["INTERNAL_SERVER_ERROR"]["message"],
+                "code": ERROR_CODES["INTERNAL_SERVER_ERROR"]["code"],
+                "details": f"Could not search exercises for user {user_id}"
+            }), 500
+
+    # Exercise history index: last sessions for one exercise in a single read
+    @workoutsApp.route('/users/<user_id>/exercises/<exercise_id>/history', methods=['GET'])
+    def exercise_history(user_id, exercise_id):
+        try:
+            history_doc = db.collection("users").document(user_id).collection("exerciseHistory").document(exercise_id).get()
+            if not history_doc.exists:
+                return jsonify({
+                    "exerciseId": exercise_id,
+                    "sessions": []
+                }), 200
+
+            etag = snapshot_etag(history_doc)
+            if is_not_modified(request, etag):
+                return not_modified_response(etag), 304
+            history = history_doc.to_dict()
+            return with_etag(jsonify({
+                "exerciseId": exercise_id,
+                "sessions": history.get("sessions", [])
+            }), etag), 200
+        except Exception as e:
+            logging.error(f"Could not retrieve history for exercise {exercise_id} of user {user_id}: {e}")
+            return jsonify({
+                "error": ERROR_CODES["INTERNAL_SERVER_ERROR"]["message"],
+                "code": ERROR_CODES["INTERNAL_SERVER_ERROR"]["code"],
+                "details": f"Could not retrieve history for exercise {exercise_id}"
+            }), 500
+
+    # Backfill job for the exercise history index
+    @workoutsApp.route('/users/<user_id>/exerciseHistory/rebuild', methods=['POST'])
+    def rebuild_history(user_id):
+        try:
+            rebuilt = rebuild_exercise_history(user_id)
+            return jsonify({
+                "message": "Exercise history rebuilt",
+                "exercises": rebuilt
+            }), 200
+        except Exception as e:
+            logging.error(f"Could not rebuild exercise history for user {user_id}: {e}")
+            return jsonify({
+                "error": ERROR_CODES["INTERNAL_SERVER_ERROR"]["message"],
+                "code": ERROR_CODES["INTERNAL_SERVER_ERROR"]["code"],
+                "details": f"Could not rebuild exercise history for user {user_id}"
+            }), 500
+
     # Workouts
     @workoutsApp.route('/users/<user_id>/workouts', methods=['POST', 'GET'])
     def workouts(user_id):
         try:
             if request.method == 'POST':
                 data = request.get_json(silent=True) or {}
-                date_value = data.get("date") or datetime.utcnow().strftime("%Y-%m-%d")
+                date_value = data.get("date") or local_date(data.get("timezone"))
                 workout_ref = db.collection("users").document(user_id).collection("workouts").document()
 
                 # Check for nested exercises
                 exercises_data = data.get("exercises", [])
 
                 # Process exercises using helper
-                processed_exercises = process_workout_exercises(user_id, workout_ref.id, exercises_data)
+                processed_exercises = process_workout_exercises(
+                    user_id, workout_ref.id, exercises_data, workout_date=date_value
+                )
 
                 workout_data = {
                     "date": date_value, # get from user device, not an input
@@ -125,15 +310,33 @@ def create_workouts_app():
                     "createdAt": firestore.SERVER_TIMESTAMP,
                     "updatedAt": firestore.SERVER_TIMESTAMP,
                     # now the actual inputs
-                    "workout_id": data.get("workout_id"), # the workout from the workouts collection in the db
-                    "exercises": processed_exercises
+                    "exercises": store_exercises(processed_exercises)
                 }
-                workout_ref.set(workout_data)
+                if data.get("workout_id"):
+                    # the workout from the workouts collection in the db; ad-hoc workouts have none
+                    workout_data["workout_id"] = data["workout_id"]
+                create_workout_with_summary(
+                    user_id,
+                    [(workout_ref, workout_data)],
+                    date_value,
+                    volume=compute_workout_volume(processed_exercises),
+                    timezone_name=data.get("timezone"),
+                )
+                invalidate_training_analytics(user_id)
                 return jsonify({
                     "message": "Workout saved",
                     "id": workout_ref.id
                 }), 200
 
+            try:
+                fields = parse_fields(request.args.get("fields"))
+            except ValueError:
+                return jsonify({
+                    "error": ERROR_CODES["INVALID_REQUEST"]["message"],
+                    "code": ERROR_CODES["INVALID_REQUEST"]["code"],
+                    "details": "fields must be a comma-separated list of field paths"
+                }), 400
+
             start_date = request.args.get("startDate")
             end_date = request.args.get("endDate")
             limit = request.args.get("limit")
@@ -149,13 +352,19 @@ def create_workouts_app():
                     workout_query = workout_query.limit(int(limit))
                 except (TypeError, ValueError):
                     pass
+            workout_query = select_fields(workout_query, fields)
+
+            workout_docs = list(workout_query.stream())
+            etag = collection_etag(workout_docs, fields)
+            if is_not_modified(request, etag):
+                return not_modified_response(etag), 304
 
             workouts_list = []
-            for doc in workout_query.stream():
-                workout = doc.to_dict()
+            for doc in workout_docs:
+                workout = decode_workout(doc.to_dict())
                 workout["id"] = doc.id
                 workouts_list.append(workout)
-            return jsonify(workouts_list), 200
+            return with_etag(jsonify(workouts_list), etag), 200
         except Exception as e:
             logging.error(f"Could not process workouts for user {user_id}: {e}")
             return jsonify({
@@ -164,6 +373,95 @@ def create_workouts_app():
                 "details": f"Could not process workouts for user {user_id}"
             }), 500
 
+    # Rewrites a user's workouts into the columnar (default) or row set layout
+    @workoutsApp.route('/users/<user_id>/workouts/migrateSetEncoding', methods=['POST'])
+    def migrate_workout_set_encoding(user_id):
+        try:
+            data = request.get_json(silent=True) or {}
+            encoding = (data.get("encoding") or request.args.get("encoding") or "columnar").lower()
+            if encoding not in ("columnar", "rows"):
+                return jsonify({
+                    "error": ERROR_CODES["INVALID_REQUEST"]["message"],
+                    "code": ERROR_CODES["INVALID_REQUEST"]["code"],
+                    "details": "encoding must be 'columnar' or 'rows'"
+                }), 400
+
+            migrated = migrate_set_encoding(user_id, columnar=encoding == "columnar")
+            return jsonify({
+                "message": f"Workouts migrated to {encoding} sets",
+                "workouts": migrated
+            }), 200
+        except Exception as e:
+            logging.error(f"Could not migrate workouts for user {user_id}: {e}")
+            return jsonify({
+                "error": ERROR_CODES["INTERNAL_SERVER_ERROR"]["message"],
+                "code": ERROR_CODES["INTERNAL_SERVER_ERROR"]["code"],
+                "details": f"Could not migrate workouts for user {user_id}"
+            }), 500
+
+    # Denormalized per-user stats summary (one read for profile/home screens)
+    @workoutsApp.route('/users/<user_id>/stats/summary', methods=['GET'])
+    def stats_summary(user_id):
+        try:
+            return jsonify(get_summary(user_id)), 200
+        except Exception as e:
+            logging.error(f"Could not retrieve stats summary for user {user_id}: {e}")
+            return jsonify({
+                "error": ERROR_CODES["INTERNAL_SERVER_ERROR"]["message"],
+                "code": ERROR_CODES["INTERNAL_SERVER_ERROR"]["code"],
+                "details": f"Could not retrieve stats summary for user {user_id}"
+            }), 500
+
+    # Reconciliation job for the stats summary
+    @workoutsApp.route('/users/<user_id>/stats/summary/rebuild', methods=['POST'])
+    def rebuild_stats_summary(user_id):
+        try:
+            return jsonify(rebuild_summary(user_id)), 200
+        except Exception as e:
+            logging.error(f"Could not rebuild stats summary for user {user_id}: {e}")
+            return jsonify({
+                "error": ERROR_CODES["INTERNAL_SERVER_ERROR"]["message"],
+                "code": ERROR_CODES["INTERNAL_SERVER_ERROR"]["code"],
+                "details": f"Could not rebuild stats summary for user {user_id}"
+            }), 500
+
+    # Training analytics over a date range, computed in batch and cached per user
+    @workoutsApp.route('/users/<user_id>/analytics', methods=['GET'])
+    def analytics(user_id):
+        try:
+            start_date = request.args.get("startDate")
+            end_date = request.args.get("endDate")
+            return jsonify(get_training_analytics(user_id, start_date, end_date)), 200
+        except Exception as e:
+            logging.error(f"Could not compute analytics for user {user_id}: {e}")
+            return jsonify({
+                "error": ERROR_CODES["INTERNAL_SERVER_ERROR"]["message"],
+                "code": ERROR_CODES["INTERNAL_SERVER_ERROR"]["code"],
+                "details": f"Could not compute analytics for user {user_id}"
+            }), 500
+
+    # Incremental sync: documents changed since the client's watermark
+    @workoutsApp.route('/users/<user_id>/sync', methods=['GET'])
+    def sync(user_id):
+        try:
+            try:
+                since = parse_watermark(request.args.get("since"))
+            except ValueError:
+                return jsonify({
+                    "error": ERROR_CODES["INVALID_REQUEST"]["message"],
+                    "code": ERROR_CODES["INVALID_REQUEST"]["code"],
+                    "details": "since must be an ISO-8601 timestamp"
+                }), 400
+
+            return jsonify(get_changes_since(user_id, since)), 200
+        except Exception as e:
+            logging.error(f"Could not sync data for user {user_id}: {e}")
+            return jsonify({
+                "error": ERROR_CODES["INTERNAL_SERVER_ERROR"]["message"],
+                "code": ERROR_CODES["INTERNAL_SERVER_ERROR"]["code"],
+                "details": f"Could not sync data for user {user_id}"
+            }), 500
+
     @workoutsApp.route('/users/<user_id>/workouts/start', methods=['POST'])
     def start_workout(user_id):
         try:
@@ -176,16 +474,15 @@ def create_workouts_app():
                     "details": "workout_id is required"
                 }), 400
 
-            template_ref = db.collection("workouts").document(template_id)
-            template_doc = template_ref.get()
-            if not template_doc.exists:
+            template_doc = get_template_doc(template_id)
+            if template_doc is None:
                 return jsonify({
                     "error": ERROR_CODES["WORKOUT_NOT_FOUND"]["message"],
                     "code": ERROR_CODES["WORKOUT_NOT_FOUND"]["code"],
                     "details": f"Workout {template_id} not found"
                 }), 404
 
-            date_value = data.get("date") or datetime.utcnow().strftime("%Y-%m-%d")
+            date_value = data.get("date") or local_date(data.get("timezone"))
             workout_ref = db.collection("users").document(user_id).collection("workouts").document()
             workout_data = {
                 "date": date_value,
@@ -201,9 +498,7 @@ def create_workouts_app():
             if not isinstance(exercises, list):
                 exercises = []
 
-            batch = db.batch()
-            batch.set(workout_ref, workout_data)
-
+            template_items = []
             for index, exercise in enumerate(exercises):
                 exercise_id = None
                 name = None
@@ -229,10 +524,17 @@ def create_workouts_app():
                 if name is not None and not isinstance(name, str):
                     name = str(name)
 
+                template_items.append((exercise_id, name, notes, order))
+
+            # Resolve all missing names with a single read instead of one per exercise
+            missing_name_ids = [exercise_id for exercise_id, name, _, _ in template_items if exercise_id and not name]
+            exercise_names = get_exercise_names(user_id, missing_name_ids)
+
+            writes = [(workout_ref, workout_data)]
+
+            for exercise_id, name, notes, order in template_items:
                 if not name and exercise_id:
-                    exercise_doc = db.collection("users").document(user_id).collection("exercises").document(exercise_id).get()
-                    if exercise_doc.exists:
-                        name = exercise_doc.to_dict().get("name")
+                    name = exercise_names.get(exercise_id)
 
                 if not name and not exercise_id:
                     continue
@@ -249,9 +551,10 @@ def create_workouts_app():
                 if name:
                     item_data["name"] = name
 
-                batch.set(item_ref, item_data)
+                writes.append((item_ref, item_data))
 
-            batch.commit()
+            # The workout, its items and the stats summary commit together
+            create_workout_with_summary(user_id, writes, date_value, timezone_name=data.get("timezone"))
 
             return jsonify({
                 "message": "Workout started",
@@ -265,22 +568,73 @@ def create_workouts_app():
                 "details": f"Could not start workout for user {user_id}"
             }), 500
 
-    @workoutsApp.route('/users/<user_id>/workouts/<workout_id>', methods=['GET', 'PUT', 'DELETE'])
-    def workout_detail(user_id, workout_id):
+    # Bulk history import (NDJSON: one workout per line, CSV: one set per row)
+    @workoutsApp.route('/users/<user_id>/workouts/import', methods=['POST'])
+    def import_workouts(user_id):
         try:
-            workout_ref, workout_doc = get_workout_ref(user_id, workout_id)
-            if workout_ref is None:
+            import_format = (request.args.get("format") or "").lower()
+            if not import_format:
+                import_format = "csv" if request.mimetype == "text/csv" else "ndjson"
+            if import_format not in ("csv", "ndjson"):
                 return jsonify({
-                    "error": ERROR_CODES["WORKOUT_NOT_FOUND"]["message"],
-                    "code": ERROR_CODES["WORKOUT_NOT_FOUND"]["code"],
-                    "details": f"Workout {workout_id} not found for user {user_id}"
-                }), 404
+                    "error": ERROR_CODES["INVALID_REQUEST"]["message"],
+                    "code": ERROR_CODES["INVALID_REQUEST"]["code"],
+                    "details": "format must be csv or ndjson"
+                }), 400
 
-            if request.method == 'GET':
-                workout = workout_doc.to_dict()
-                workout["id"] = workout_doc.id
-                return jsonify(workout), 200
+            imported, errors = import_workouts_from_stream(user_id, request.stream, import_format)
+            invalidate_training_analytics(user_id)
+            return jsonify({
+                "message": "Workouts imported",
+                "imported": imported,
+                "errors": errors
+            }), 200
+        except Exception as e:
+            logging.error(f"Could not import workouts for user {user_id}: {e}")
+            return jsonify({
+                "error": ERROR_CODES["INTERNAL_SERVER_ERROR"]["message"],
+                "code": ERROR_CODES["INTERNAL_SERVER_ERROR"]["code"],
+                "details": f"Could not import workouts for user {user_id}"
+            }), 500
+
+    # Full-history export, streamed as NDJSON or CSV and optionally gzipped
+    @workoutsApp.route('/users/<user_id>/export', methods=['GET'])
+    def export_user_data(user_id):
+        try:
+            export_format = (request.args.get("format") or "ndjson").lower()
+            if export_format == "csv":
+                chunks = iter_export_csv(user_id)
+                mimetype = "text/csv"
+            elif export_format == "ndjson":
+                chunks = iter_export_ndjson(user_id, current_app.json.dumps)
+                mimetype = "application/x-ndjson"
+            else:
+                return jsonify({
+                    "error": ERROR_CODES["INVALID_REQUEST"]["message"],
+                    "code": ERROR_CODES["INVALID_REQUEST"]["code"],
+                    "details": "format must be csv or ndjson"
+                }), 400
+
+            filename = f"{user_id}-export.{export_format}"
+            if parse_bool(request.args.get("gzip"), False):
+                chunks = gzip_chunks(chunks)
+                mimetype = "application/gzip"
+                filename += ".gz"
 
+            response = Response(stream_with_context(chunks), mimetype=mimetype)
+            response.headers["Content-Disposition"] = f'attachment; filename="{filename}"'
+            return response, 200
+        except Exception as e:
+            logging.error(f"Could not export data for user {user_id}: {e}")
+            return jsonify({
+                "error": ERROR_CODES["INTERNAL_SERVER_ERROR"]["message"],
+                "code": ERROR_CODES["INTERNAL_SERVER_ERROR"]["code"],
+                "details": f"Could not export data for user {user_id}"
+            }), 500
+
+    @workoutsApp.route('/users/<user_id>/workouts/<workout_id>', methods=['GET', 'PUT', 'DELETE'])
+    def workout_detail(user_id, workout_id):
+        try:
             if request.method == 'PUT':
                 data = request.get_json(silent=True) or {}
                 if not data:
@@ -290,17 +644,70 @@ def create_workouts_app():
                         "details": "No update data provided."
                     }), 400
 
-                if "exercises" in data:
-                    exercises_data = data["exercises"]
-                    processed_exercises = process_workout_exercises(user_id, workout_id, exercises_data)
-                    data["exercises"] = processed_exercises
-
-                data["updatedAt"] = firestore.SERVER_TIMESTAMP
-                workout_ref.update(data)
+                # Autosaves from an in-progress session are debounced into one write
+                if parse_bool(request.args.get("autosave")):
+                    queued = queue_workout_autosave(user_id, workout_id, data)
+                    if queued is None:
+                        return jsonify({
+                            "error": ERROR_CODES["WORKOUT_NOT_FOUND"]["message"],
+                            "code": ERROR_CODES["WORKOUT_NOT_FOUND"]["code"],
+                            "details": f"Workout {workout_id} not found for user {user_id}"
+                        }), 404
+                    pending_edits, autosave_error = queued
+                    response = {
+                        "message": f"Workout {workout_id} autosave queued",
+                        "pendingEdits": pending_edits
+                    }
+                    if autosave_error:
+                        # An earlier flush failed; its edits are still pending and retried with these
+                        response["autosaveError"] = autosave_error
+                    return jsonify(response), 202
+
+                if not save_workout_now(user_id, workout_id, data):
+                    return jsonify({
+                        "error": ERROR_CODES["WORKOUT_NOT_FOUND"]["message"],
+                        "code": ERROR_CODES["WORKOUT_NOT_FOUND"]["code"],
+                        "details": f"Workout {workout_id} not found for user {user_id}"
+                    }), 404
                 return jsonify({"message": f"Workout {workout_id} updated"}), 200
 
+            # Reads see pending autosaves; deletes make them moot
+            if request.method == 'GET':
+                save_workout_now(user_id, workout_id)
+            else:
+                discard_workout_autosave(user_id, workout_id)
+
+            workout_ref, workout_doc = get_workout_ref(user_id, workout_id)
+            if workout_ref is None:
+                return jsonify({
+                    "error": ERROR_CODES["WORKOUT_NOT_FOUND"]["message"],
+                    "code": ERROR_CODES["WORKOUT_NOT_FOUND"]["code"],
+                    "details": f"Workout {workout_id} not found for user {user_id}"
+                }), 404
+
+            if request.method == 'GET':
+                etag = snapshot_etag(workout_doc)
+                if is_not_modified(request, etag):
+                    return not_modified_response(etag), 304
+                workout = decode_workout(workout_doc.to_dict())
+                workout["id"] = workout_doc.id
+                return with_etag(jsonify(workout), etag), 200
+
             try:
-                workout_ref.delete()
+                previous_exercises = decode_workout(workout_doc.to_dict() or {}).get("exercises")
+                batch = db.batch()
+                batch.delete(workout_ref)
+                record_tombstone(batch, user_id, "workouts", workout_id)
+                update_exercise_history(
+                    user_id, workout_id, None, None,
+                    previous_exercises=previous_exercises,
+                    batch=batch,
+                )
+                queue_summary_increment(
+                    batch, user_id, workouts_delta=-1, volume_delta=-compute_workout_volume(previous_exercises),
+                    streak_dirty=True,
+                )
+                batch.commit()
             except Exception as deletion_error:
                 logging.error(f"Could not delete workout {workout_id}: {deletion_error}")
                 return jsonify({
@@ -309,6 +716,7 @@ def create_workouts_app():
                     "details": f"Could not delete workout {workout_id}"
                 }), 500
 
+            invalidate_training_analytics(user_id)
             return jsonify({"message": f"Workout {workout_id} deleted"}), 200
         except Exception as e:
             logging.error(f"Could not process workout {workout_id} for user {user_id}: {e}")
@@ -323,16 +731,19 @@ def create_workouts_app():
     @workoutsApp.route('/getWorkout/<id>', methods=['GET'])
     def getWorkout(id):
         try:
-            doc = db.collection('workouts').document(id).get()
-            if not doc.exists:
+            doc = get_template_doc(id)
+            if doc is None:
                 return jsonify({
                     "error": ERROR_CODES["WORKOUT_NOT_FOUND"]["message"],
                     "code": ERROR_CODES["WORKOUT_NOT_FOUND"]["code"],
                     "details": f"Workout {id} not found"
                 }), 404
+            etag = snapshot_etag(doc)
+            if is_not_modified(request, etag):
+                return not_modified_response(etag), 304
             workout = doc.to_dict()
             workout["id"] = id
-            return jsonify(workout), 200
+            return with_etag(jsonify(workout), etag), 200
         except Exception as e:
             logging.error(f"Could not retrieve workout {id}: {e}")
             return jsonify({
@@ -345,13 +756,49 @@ def create_workouts_app():
     @workoutsApp.route('/getAllWorkouts', methods=['GET'])
     def getAllWorkouts():
         try:
+            try:
+                page_size = parse_page_size(request.args.get("pageSize"))
+            except (TypeError, ValueError):
+                return jsonify({
+                    "error": ERROR_CODES["INVALID_REQUEST"]["message"],
+                    "code": ERROR_CODES["INVALID_REQUEST"]["code"],
+                    "details": "pageSize must be a positive integer"
+                }), 400
+
+            try:
+                fields = parse_fields(request.args.get("fields"))
+            except ValueError:
+                return jsonify({
+                    "error": ERROR_CODES["INVALID_REQUEST"]["message"],
+                    "code": ERROR_CODES["INVALID_REQUEST"]["code"],
+                    "details": "fields must be a comma-separated list of field paths"
+                }), 400
+
+            workouts_query = select_fields(db.collection('workouts'), fields)
+            if page_size:
+                workouts, next_page_token = paginate_query(
+                    workouts_query, page_size, request.args.get("pageToken")
+                )
+                return jsonify({
+                    "items": workouts,
+                    "nextPageToken": next_page_token
+                }), 200
+
+            if wants_ndjson(request):
+                return ndjson_response(workouts_query.stream())
+
+            # The catalog is cached whole, so projection happens server-side here
+            docs = get_template_catalog()
+            etag = collection_etag(docs, fields)
+            if is_not_modified(request, etag):
+                return not_modified_response(etag), 304
+
             workouts = []
-            docs = db.collection('workouts').stream()
             for doc in docs:
                 workout = doc.to_dict()
                 workout["id"] = doc.id
-                workouts.append(workout)
-            return jsonify(workouts), 200
+                workouts.append(project(workout, fields))
+            return with_etag(jsonify(workouts), etag), 200
         except Exception as e:
             logging.error(f"Could not retrieve workouts: {e}")
             return jsonify({
@@ -360,6 +807,68 @@ def create_workouts_app():
                 "details": "Could not retrieve workouts"
             }), 500
         
+    # get several workouts by id: getWorkouts?ids=a,b,c
+    @workoutsApp.route('/getWorkouts', methods=['GET'])
+    def getWorkouts():
+        try:
+            try:
+                ids = parse_ids(request.args.get("ids"))
+                fields = parse_fields(request.args.get("fields"))
+            except ValueError as e:
+                return jsonify({
+                    "error": ERROR_CODES["INVALID_REQUEST"]["message"],
+                    "code": ERROR_CODES["INVALID_REQUEST"]["code"],
+                    "details": str(e)
+                }), 400
+
+            docs_by_id = get_template_docs(ids)
+            etag = collection_etag([docs_by_id[workout_id] for workout_id in ids if workout_id in docs_by_id], ids, fields)
+            if is_not_modified(request, etag):
+                return not_modified_response(etag), 304
+            workouts = order_by_ids(ids, docs_by_id, lambda workout_id: {
+                "id": workout_id,
+                "error": ERROR_CODES["WORKOUT_NOT_FOUND"]["message"],
+                "code": ERROR_CODES["WORKOUT_NOT_FOUND"]["code"],
+                "details": f"Workout {workout_id} not found"
+            }, fields)
+            return with_etag(jsonify({"items": workouts}), etag), 200
+        except Exception as e:
+            logging.error(f"Could not retrieve workouts: {e}")
+            return jsonify({
+                "error": ERROR_CODES["INTERNAL_SERVER_ERROR"]["message"],
+                "code": ERROR_CODES["INTERNAL_SERVER_ERROR"]["code"],
+                "details": "Could not retrieve workouts"
+            }), 500
+
+    # search workout templates by name, muscle group, equipment and type
+    @workoutsApp.route('/searchWorkouts', methods=['GET'])
+    def searchWorkouts():
+        try:
+            query = (request.args.get("q") or "").strip()
+            if not query:
+                return jsonify({
+                    "error": ERROR_CODES["INVALID_REQUEST"]["message"],
+                    "code": ERROR_CODES["INVALID_REQUEST"]["code"],
+                    "details": "q is required"
+                }), 400
+            try:
+                limit = parse_page_size(request.args.get("limit")) or DEFAULT_SEARCH_LIMIT
+            except (TypeError, ValueError):
+                return jsonify({
+                    "error": ERROR_CODES["INVALID_REQUEST"]["message"],
+                    "code": ERROR_CODES["INVALID_REQUEST"]["code"],
+                    "details": "limit must be a positive integer"
+                }), 400
+
+            return jsonify({"items": search_templates(query, limit)}), 200
+        except Exception as e:
+            logging.error(f"Could not search workouts: {e}")
+            return jsonify({
+                "error": ERROR_CODES["INTERNAL_SERVER_ERROR"]["message"],
+                "code": ERROR_CODES["INTERNAL_SERVER_ERROR"]["code"],
+                "details": "Could not search workouts"
+            }), 500
+
     # create workouts
     @workoutsApp.route('/createWorkout', methods=['POST'])
     def createWorkout(): # fields: description, default, exercises, muscle_group, name, number_of_exercises, sets, type
@@ -380,6 +889,8 @@ def create_workouts_app():
                 "updatedAt": firestore.SERVER_TIMESTAMP
             }
             workout_ref.set(workout_data)
+            invalidate_template_cache(workout_ref.id)
+            index_template(workout_ref.id, workout_data)
             return jsonify({
                 "message": "Workout created",
                 "id": workout_ref.id
@@ -1,8 +1,43 @@
-from config.db import db
-from firebase_admin import firestore
+from helpers.lazy_helpers import firestore_client, lazy_import
+from helpers.metrics_helpers import instrument_client
+from helpers.cache_helpers import template_cache, TEMPLATE_CATALOG_KEY
+from helpers.executor_helpers import run_parallel
+from datetime import datetime, timezone
+import concurrent.futures
 import logging
+import os
 import uuid
 
+# Heavy dependencies load on first use rather than at cold start
+firestore = lazy_import("firebase_admin.firestore")
+api_exceptions = lazy_import("google.api_core.exceptions")
+
+# Count and time every Firestore call made through this module
+db = instrument_client(firestore_client)
+
+
+# Subcollections returned by the incremental sync endpoint
+SYNC_COLLECTIONS = ("workouts", "exercises", "prs")
+
+# Number of most recent sessions kept per exercise in the history index
+HISTORY_SESSION_LIMIT = 10
+
+# Firestore caps a single batch at 500 writes
+BATCH_WRITE_LIMIT = 500
+
+# Conditional rewrites tried per workout when a migration batch hits a concurrent edit
+MIGRATION_ATTEMPTS = 3
+
+# Set fields that can change the outcome of a PR check
+PR_SET_FIELDS = ("reps", "weight", "rir", "rpe", "isPR")
+
+# Opt-in columnar storage for exercises[].sets (WORKOUT_SET_ENCODING=columnar).
+# Reads decode both layouts, so the flag only changes how new writes are stored.
+COLUMNAR_SETS_ENABLED = os.environ.get("WORKOUT_SET_ENCODING", "").lower() == "columnar"
+
+# Set fields always present on a decoded set; other columns only when not null
+CORE_SET_FIELDS = ("id", "reps", "weight", "rir", "rpe", "volume")
+
 
 def parse_bool(value, default=False):
     if value is None:
@@ -32,6 +67,150 @@ def compute_volume(reps_value, weight_value):
         return None
 
 
+def encode_set_columns(sets):
+    """
+    Packs a list of set dicts into {"count", "columns"} with one array per field.
+    volume is dropped and rpe is kept only where it differs from the value
+    derived from rir, since decode_set_columns recomputes both.
+    """
+    sets = [set_item for set_item in sets or [] if isinstance(set_item, dict)]
+    keys = []
+    for set_item in sets:
+        for key in set_item:
+            if key != "volume" and key not in keys:
+                keys.append(key)
+    columns = {key: [set_item.get(key) for set_item in sets] for key in keys}
+    if "rpe" in columns:
+        columns["rpe"] = [
+            None if set_item.get("rpe") == compute_rpe(set_item.get("rir"), None) else set_item.get("rpe")
+            for set_item in sets
+        ]
+        if all(value is None for value in columns["rpe"]):
+            del columns["rpe"]
+    return {"count": len(sets), "columns": columns}
+
+
+def decode_set_columns(encoded):
+    count = encoded.get("count") or 0
+    columns = encoded.get("columns") or {}
+    sets = []
+    for index in range(count):
+        set_item = {}
+        for key, values in columns.items():
+            value = values[index] if index < len(values) else None
+            if value is not None or key in CORE_SET_FIELDS:
+                set_item[key] = value
+        set_item["rpe"] = compute_rpe(set_item.get("rir"), set_item.get("rpe"))
+        set_item["volume"] = compute_volume(set_item.get("reps"), set_item.get("weight"))
+        sets.append(set_item)
+    return sets
+
+
+def encode_exercises(exercises):
+    encoded = []
+    for exercise in exercises or []:
+        if isinstance(exercise, dict) and isinstance(exercise.get("sets"), list):
+            set_columns = encode_set_columns(exercise["sets"])
+            exercise = {key: value for key, value in exercise.items() if key != "sets"}
+            exercise["setColumns"] = set_columns
+        encoded.append(exercise)
+    return encoded
+
+
+def decode_exercises(exercises):
+    """
+    Expands columnar exercises back into exercises[].sets; row-layout exercises pass through.
+    """
+    decoded = []
+    for exercise in exercises or []:
+        if isinstance(exercise, dict) and isinstance(exercise.get("setColumns"), dict):
+            sets = decode_set_columns(exercise["setColumns"])
+            exercise = {key: value for key, value in exercise.items() if key != "setColumns"}
+            exercise["sets"] = sets
+        decoded.append(exercise)
+    return decoded
+
+
+def store_exercises(exercises):
+    """
+    Layout used when writing processed exercises: columnar when enabled, rows otherwise.
+    """
+    return encode_exercises(exercises) if COLUMNAR_SETS_ENABLED else exercises
+
+
+def decode_workout(workout):
+    """
+    Decodes a workout dict in place (if it has columnar sets) and returns it.
+    """
+    if isinstance(workout, dict) and isinstance(workout.get("exercises"), list):
+        workout["exercises"] = decode_exercises(workout["exercises"])
+    return workout
+
+
+def migrate_set_encoding(user_id, columnar=True):
+    """
+    Rewrites a user's workouts into the columnar (or row) set layout in batches
+    of BATCH_WRITE_LIMIT. updatedAt is left alone: the decoded content is
+    unchanged, so incremental sync should not resend every workout.
+    Each rewrite is conditional on the document being unchanged since it was
+    read; a batch that hits a concurrent edit is redone one document at a time
+    from fresh reads. Returns the number of workouts rewritten.
+    """
+    workouts_collection = db.collection("users").document(user_id).collection("workouts")
+    pending = []
+    migrated = 0
+    for doc in workouts_collection.select(["exercises"]).stream():
+        if _migrated_exercises(doc, columnar) is None:
+            continue
+        pending.append(doc)
+        if len(pending) == BATCH_WRITE_LIMIT:
+            migrated += _commit_migration(pending, columnar)
+            pending = []
+    if pending:
+        migrated += _commit_migration(pending, columnar)
+    return migrated
+
+
+def _migrated_exercises(doc, columnar):
+    """
+    The exercises of doc in the target layout, or None when there is nothing to rewrite.
+    """
+    exercises = (doc.to_dict() or {}).get("exercises") if doc.exists else None
+    if not isinstance(exercises, list):
+        return None
+    target = encode_exercises(decode_exercises(exercises)) if columnar else decode_exercises(exercises)
+    return None if target == exercises else target
+
+
+def _commit_migration(docs, columnar):
+    batch = db.batch()
+    for doc in docs:
+        batch.update(doc.reference, {"exercises": _migrated_exercises(doc, columnar)},
+                     option=db.write_option(last_update_time=doc.update_time))
+    try:
+        batch.commit()
+        return len(docs)
+    except api_exceptions.FailedPrecondition:
+        pass
+
+    migrated = 0
+    for doc in docs:
+        for _ in range(MIGRATION_ATTEMPTS):
+            fresh = doc.reference.get(field_paths=["exercises"])
+            target = _migrated_exercises(fresh, columnar)
+            if target is None:
+                break
+            try:
+                doc.reference.update({"exercises": target}, option=db.write_option(last_update_time=fresh.update_time))
+                migrated += 1
+                break
+            except api_exceptions.FailedPrecondition:
+                continue
+        else:
+            logging.warning(f"Skipped migrating workout {doc.id}: it kept changing during the migration")
+    return migrated
+
+
 def get_workout_ref(user_id, workout_id):
     workout_ref = db.collection("users").document(user_id).collection("workouts").document(workout_id)
     workout_doc = workout_ref.get()
@@ -40,55 +219,467 @@ def get_workout_ref(user_id, workout_id):
     return workout_ref, workout_doc
 
 
-def update_pr_if_needed(user_id, exercise_id, set_payload, workout_id, workout_exercise_id, set_id):
-    try:
-        if not exercise_id:
-            return
-        prs_ref = db.collection("users").document(user_id).collection("prs").document(exercise_id)
-        existing = prs_ref.get()
-        existing_data = existing.to_dict() if existing.exists else {}
-        existing_weight = existing_data.get("weight", 0) or 0
-        existing_reps = existing_data.get("reps", 0) or 0
-
-        incoming_weight = set_payload.get("weight", 0) or 0
-        incoming_reps = set_payload.get("reps", 0) or 0
-
-        better_pr = bool(set_payload.get("isPR"))
-        if not better_pr:
-            if incoming_weight > existing_weight:
-                better_pr = True
-            elif incoming_weight == existing_weight and incoming_reps > existing_reps:
-                better_pr = True
-
-        if better_pr:
-            pr_payload = {
+def is_better_pr(existing_data, set_payload):
+    if set_payload.get("isPR"):
+        return True
+    existing_weight = existing_data.get("weight", 0) or 0
+    existing_reps = existing_data.get("reps", 0) or 0
+    incoming_weight = set_payload.get("weight", 0) or 0
+    incoming_reps = set_payload.get("reps", 0) or 0
+    if incoming_weight > existing_weight:
+        return True
+    return incoming_weight == existing_weight and incoming_reps > existing_reps
+
+
+def build_pr_payload(exercise_id, set_payload, workout_id, workout_exercise_id, set_id, existing_data):
+    pr_payload = {
+        "exerciseId": exercise_id,
+        "weight": set_payload.get("weight", 0) or 0,
+        "reps": set_payload.get("reps", 0) or 0,
+        "rir": set_payload.get("rir"),
+        "rpe": set_payload.get("rpe"),
+        "workoutId": workout_id,
+        "workoutExerciseId": workout_exercise_id,
+        "setId": set_id,
+        "updatedAt": firestore.SERVER_TIMESTAMP,
+    }
+    if existing_data.get("createdAt"):
+        pr_payload["createdAt"] = existing_data.get("createdAt")
+    else:
+        pr_payload["createdAt"] = firestore.SERVER_TIMESTAMP
+    return pr_payload
+
+
+def parse_watermark(value):
+    """
+    Parses an ISO-8601 sync watermark. Naive values are treated as UTC.
+    Returns None when no watermark was given; raises ValueError when malformed.
+    """
+    if not value:
+        return None
+    watermark = datetime.fromisoformat(value.replace("Z", "+00:00"))
+    if watermark.tzinfo is None:
+        watermark = watermark.replace(tzinfo=timezone.utc)
+    return watermark
+
+
+def record_tombstone(batch, user_id, collection_name, doc_id):
+    """
+    Queues a tombstone for a deleted document so incremental sync can report it.
+    """
+    tombstone_ref = db.collection("users").document(user_id).collection("tombstones").document(f"{collection_name}_{doc_id}")
+    batch.set(tombstone_ref, {
+        "collection": collection_name,
+        "docId": doc_id,
+        "deletedAt": firestore.SERVER_TIMESTAMP,
+    })
+
+
+def get_changes_since(user_id, since=None):
+    """
+    Returns the user's workouts, exercises and PRs updated after the watermark,
+    the tombstones recorded after it, and the new watermark to send next time.
+    """
+    user_ref = db.collection("users").document(user_id)
+
+    def load_changed(collection_name, timestamp_field):
+        query = user_ref.collection(collection_name)
+        if since is not None:
+            query = query.where(timestamp_field, ">", since)
+        docs = []
+        for doc in query.stream():
+            data = decode_workout(doc.to_dict() or {})
+            data["id"] = doc.id
+            docs.append(data)
+        return docs
+
+    # The collections are independent, so they are queried in parallel
+    calls = [lambda name=name: load_changed(name, "updatedAt") for name in SYNC_COLLECTIONS]
+    # A full sync has nothing to delete on the client, so tombstones are skipped
+    if since is not None:
+        calls.append(lambda: load_changed("tombstones", "deletedAt"))
+    # Full syncs stream whole collections, so they are not held to the point-read timeout
+    results = run_parallel(*calls, timeout=None)
+    return merge_sync_changes(since, results)
+
+
+def merge_sync_changes(since, results):
+    """
+    Builds the sync response from the changed records of each SYNC_COLLECTIONS
+    collection, followed by the tombstones when since is given. Shared by the
+    Flask and async sync routes, so both compute the same watermark.
+    """
+    changes = {}
+    newest = since
+    for collection_name, docs in zip(SYNC_COLLECTIONS, results):
+        for data in docs:
+            updated_at = data.get("updatedAt")
+            if isinstance(updated_at, datetime) and (newest is None or updated_at > newest):
+                newest = updated_at
+        changes[collection_name] = docs
+
+    deleted = []
+    tombstones = results[len(SYNC_COLLECTIONS)] if since is not None else []
+    for data in tombstones:
+        deleted_at = data.get("deletedAt")
+        if isinstance(deleted_at, datetime) and deleted_at > newest:
+            newest = deleted_at
+        deleted.append({
+            "collection": data.get("collection"),
+            "id": data.get("docId"),
+        })
+    changes["deleted"] = deleted
+    changes["watermark"] = newest.isoformat() if newest is not None else None
+    return changes
+
+
+def get_template_doc(template_id):
+    """
+    Returns the cached snapshot of a template from the global workouts collection,
+    or None if it does not exist. Concurrent misses share a single Firestore read.
+    """
+    def load():
+        doc = db.collection("workouts").document(template_id).get()
+        return doc if doc.exists else None
+
+    return template_cache.get(template_id, load)
+
+
+def get_template_docs(template_ids):
+    """
+    Returns a dict of template_id -> snapshot for the ids that exist. Cached
+    templates are served from the cache; the rest are read with one get_all.
+    """
+    docs = {}
+    missing_refs = []
+    for template_id in template_ids:
+        doc = template_cache.peek(template_id)
+        if doc is not None:
+            docs[template_id] = doc
+        else:
+            missing_refs.append(db.collection("workouts").document(template_id))
+    if missing_refs:
+        for snapshot in db.get_all(missing_refs):
+            if snapshot.exists:
+                template_cache.put(snapshot.id, snapshot)
+                docs[snapshot.id] = snapshot
+    return docs
+
+
+def get_template_catalog():
+    """
+    Returns the cached list of template snapshots in the global workouts collection.
+    """
+    return template_cache.get(
+        TEMPLATE_CATALOG_KEY,
+        lambda: list(db.collection("workouts").stream()),
+        cache_none=True,
+    )
+
+
+def invalidate_template_cache(template_id=None):
+    if template_id:
+        template_cache.invalidate(template_id)
+    template_cache.invalidate(TEMPLATE_CATALOG_KEY)
+
+
+def get_exercise_names(user_id, exercise_ids):
+    """
+    Resolves exercise names for a user's exercise ids with one get_all call.
+    Returns a dict of exercise_id -> name for the ids that exist.
+    """
+    unique_ids = list(dict.fromkeys(exercise_id for exercise_id in exercise_ids if exercise_id))
+    if not unique_ids:
+        return {}
+    exercises_collection = db.collection("users").document(user_id).collection("exercises")
+    refs = [exercises_collection.document(exercise_id) for exercise_id in unique_ids]
+    names = {}
+    for snapshot in db.get_all(refs, field_paths=["name"]):
+        if snapshot.exists:
+            names[snapshot.id] = (snapshot.to_dict() or {}).get("name")
+    return names
+
+
+def build_history_sessions(workout_id, workout_date, exercises):
+    """
+    Groups a workout's processed sets by catalog exerciseId into history sessions.
+    Returns a dict of exercise_id -> session.
+    """
+    sessions = {}
+    for exercise in exercises or []:
+        if not isinstance(exercise, dict) or not exercise.get("exerciseId"):
+            continue
+        session = sessions.setdefault(exercise["exerciseId"], {
+            "workoutId": workout_id,
+            "date": workout_date,
+            "sets": [],
+        })
+        for set_item in exercise.get("sets") or []:
+            if not isinstance(set_item, dict):
+                continue
+            session["sets"].append({
+                "id": set_item.get("id"),
+                "reps": set_item.get("reps"),
+                "weight": set_item.get("weight"),
+                "rir": set_item.get("rir"),
+                "rpe": set_item.get("rpe"),
+                "volume": set_item.get("volume"),
+            })
+
+    for session in sessions.values():
+        volumes = [set_item["volume"] for set_item in session["sets"] if set_item["volume"] is not None]
+        rpes = [set_item["rpe"] for set_item in session["sets"] if set_item["rpe"] is not None]
+        session["volume"] = sum(volumes) if volumes else 0
+        session["rpe"] = round(sum(rpes) / len(rpes), 2) if rpes else None
+    return sessions
+
+
+def merge_history_sessions(existing_sessions, workout_id, session=None):
+    """
+    Replaces this workout's entry in a history list and keeps the newest sessions.
+    """
+    merged = [entry for entry in existing_sessions or [] if entry.get("workoutId") != workout_id]
+    if session is not None:
+        merged.append(session)
+    merged.sort(key=lambda entry: (entry.get("date") or "", entry.get("workoutId") or ""), reverse=True)
+    return merged[:HISTORY_SESSION_LIMIT]
+
+
+def queue_planned_writes(batch, planned_writes):
+    """
+    Queues (ref, data, merge) writes from a plan_* helper on batch; returns how many.
+    """
+    for ref, data, merge in planned_writes:
+        batch.set(ref, data, merge=merge)
+    return len(planned_writes)
+
+
+def plan_exercise_history(user_id, workout_id, workout_date, exercises, previous_exercises=None):
+    """
+    Reads every history doc affected by one workout with one get_all and returns
+    the (ref, data, merge) writes that bring them up to date, without queueing them.
+    """
+    sessions = build_history_sessions(workout_id, workout_date, exercises)
+    removed_ids = set(build_history_sessions(workout_id, workout_date, previous_exercises)) - set(sessions)
+    affected_ids = list(sessions) + sorted(removed_ids)
+    if not affected_ids:
+        return []
+
+    history_collection = db.collection("users").document(user_id).collection("exerciseHistory")
+    history_refs = {exercise_id: history_collection.document(exercise_id) for exercise_id in affected_ids}
+    existing_sessions = {}
+    for snapshot in db.get_all(list(history_refs.values())):
+        if snapshot.exists:
+            existing_sessions[snapshot.id] = (snapshot.to_dict() or {}).get("sessions", [])
+
+    planned_writes = []
+    for exercise_id in affected_ids:
+        if exercise_id not in sessions and exercise_id not in existing_sessions:
+            continue
+        merged = merge_history_sessions(existing_sessions.get(exercise_id), workout_id, sessions.get(exercise_id))
+        planned_writes.append((history_refs[exercise_id], {
+            "exerciseId": exercise_id,
+            "sessions": merged,
+            "updatedAt": firestore.SERVER_TIMESTAMP,
+        }, False))
+    return planned_writes
+
+
+def update_exercise_history(user_id, workout_id, workout_date, exercises, previous_exercises=None, batch=None):
+    """
+    Incrementally maintains users/<uid>/exerciseHistory/<exerciseId> for one workout.
+    Pass exercises=None to remove the workout from the index (e.g. on delete).
+    Writes are queued on batch when given, otherwise committed in a new batch.
+    """
+    planned_writes = plan_exercise_history(user_id, workout_id, workout_date, exercises, previous_exercises)
+    if batch is not None:
+        return queue_planned_writes(batch, planned_writes)
+    if planned_writes:
+        batch = db.batch()
+        queue_planned_writes(batch, planned_writes)
+        batch.commit()
+    return len(planned_writes)
+
+
+def merge_exercise_history(user_id, sessions_by_exercise):
+    """
+    Merges already-built session lists (exercise_id -> sessions, e.g. from an
+    import) into the history index, reading the affected docs with one get_all
+    per BATCH_WRITE_LIMIT exercises. Returns the number of history docs written.
+    """
+    history_collection = db.collection("users").document(user_id).collection("exerciseHistory")
+    exercise_ids = list(sessions_by_exercise)
+    for start in range(0, len(exercise_ids), BATCH_WRITE_LIMIT):
+        history_refs = {
+            exercise_id: history_collection.document(exercise_id)
+            for exercise_id in exercise_ids[start:start + BATCH_WRITE_LIMIT]
+        }
+        existing_sessions = {}
+        for snapshot in db.get_all(list(history_refs.values())):
+            if snapshot.exists:
+                existing_sessions[snapshot.id] = (snapshot.to_dict() or {}).get("sessions", [])
+
+        batch = db.batch()
+        for exercise_id, history_ref in history_refs.items():
+            merged = existing_sessions.get(exercise_id)
+            for session in sessions_by_exercise[exercise_id]:
+                merged = merge_history_sessions(merged, session["workoutId"], session)
+            batch.set(history_ref, {
                 "exerciseId": exercise_id,
-                "weight": incoming_weight,
-                "reps": incoming_reps,
-                "rir": set_payload.get("rir"),
-                "rpe": set_payload.get("rpe"),
-                "workoutId": workout_id,
-                "workoutExerciseId": workout_exercise_id,
-                "setId": set_id,
+                "sessions": merged,
                 "updatedAt": firestore.SERVER_TIMESTAMP,
-            }
+            })
+        batch.commit()
+    return len(exercise_ids)
 
-            if existing.exists and existing_data.get("createdAt"):
-                pr_payload["createdAt"] = existing_data.get("createdAt")
-            else:
-                pr_payload["createdAt"] = firestore.SERVER_TIMESTAMP
 
-            prs_ref.set(pr_payload, merge=True)
-    except Exception as pr_error:
-        raise pr_error
+def rebuild_exercise_history(user_id):
+    """
+    Backfill job: rebuilds the whole exercise history index from the user's workouts.
+    Returns the number of history docs written.
+    """
+    user_ref = db.collection("users").document(user_id)
+    history_by_exercise = {}
+    workout_query = user_ref.collection("workouts").select(["date", "exercises"])
+    for doc in workout_query.stream():
+        workout = decode_workout(doc.to_dict() or {})
+        sessions = build_history_sessions(doc.id, workout.get("date"), workout.get("exercises"))
+        for exercise_id, session in sessions.items():
+            history_by_exercise[exercise_id] = merge_history_sessions(
+                history_by_exercise.get(exercise_id), doc.id, session
+            )
+
+    history_collection = user_ref.collection("exerciseHistory")
+    stale_refs = [
+        doc.reference for doc in history_collection.select([]).stream()
+        if doc.id not in history_by_exercise
+    ]
+
+    batch = db.batch()
+    pending = 0
+    for exercise_id, sessions in history_by_exercise.items():
+        batch.set(history_collection.document(exercise_id), {
+            "exerciseId": exercise_id,
+            "sessions": sessions,
+            "updatedAt": firestore.SERVER_TIMESTAMP,
+        })
+        pending += 1
+        if pending == BATCH_WRITE_LIMIT:
+            batch.commit()
+            batch = db.batch()
+            pending = 0
+    for stale_ref in stale_refs:
+        batch.delete(stale_ref)
+        pending += 1
+        if pending == BATCH_WRITE_LIMIT:
+            batch.commit()
+            batch = db.batch()
+            pending = 0
+    if pending:
+        batch.commit()
+    return len(history_by_exercise)
+
+
+def plan_prs_for_sets(user_id, pr_candidates):
+    """
+    Runs is_better_pr over each exercise's (exercise_id, set_payload, workout_id,
+    workout_exercise_id) candidates in submission order, reading every affected PR
+    doc with one get_all. Returns the (ref, data, merge) writes for the final
+    winners, without queueing them.
+    """
+    candidates_by_exercise = {}
+    for exercise_id, set_payload, workout_id, workout_exercise_id in pr_candidates:
+        if not exercise_id:
+            continue
+        candidates_by_exercise.setdefault(exercise_id, []).append(
+            (set_payload, workout_id, workout_exercise_id)
+        )
+    if not candidates_by_exercise:
+        return []
+
+    prs_collection = db.collection("users").document(user_id).collection("prs")
+    pr_refs = {exercise_id: prs_collection.document(exercise_id) for exercise_id in candidates_by_exercise}
+    existing_by_exercise = {}
+    for snapshot in db.get_all(list(pr_refs.values())):
+        if snapshot.exists:
+            existing_by_exercise[snapshot.id] = snapshot.to_dict() or {}
+
+    planned_writes = []
+    for exercise_id, candidates in candidates_by_exercise.items():
+        existing_data = existing_by_exercise.get(exercise_id, {})
+        current = existing_data
+        winner = None
+        for set_payload, workout_id, workout_exercise_id in candidates:
+            if is_better_pr(current, set_payload):
+                winner = (set_payload, workout_id, workout_exercise_id)
+                current = set_payload
+        if winner is None:
+            continue
+        set_payload, workout_id, workout_exercise_id = winner
+        pr_payload = build_pr_payload(
+            exercise_id, set_payload, workout_id, workout_exercise_id, set_payload.get("id"), existing_data
+        )
+        planned_writes.append((pr_refs[exercise_id], pr_payload, True))
+    return planned_writes
 
 
-def process_workout_exercises(user_id, workout_id, exercises_data):
+def update_prs_for_sets(user_id, pr_candidates, batch=None):
     """
-    Iterates through exercises and sets, computes derived fields, and updates PRs.
-    Returns the processed exercises list.
+    Batched PR update: writes only the final winner per exercise (see plan_prs_for_sets).
+    Writes are queued on batch when given, otherwise committed in a new batch.
+    Returns the number of PR docs written.
+    """
+    planned_writes = plan_prs_for_sets(user_id, pr_candidates)
+    if batch is not None:
+        return queue_planned_writes(batch, planned_writes)
+    if planned_writes:
+        batch = db.batch()
+        queue_planned_writes(batch, planned_writes)
+        batch.commit()
+    return len(planned_writes)
+
+
+def keep_best_pr_candidates(best_by_exercise, pr_candidates):
+    """
+    Folds PR candidates into best_by_exercise (exercise_id -> (winner, last isPR
+    candidate)) as they arrive, so a long import holds at most two sets per
+    exercise instead of every set.
+    """
+    for candidate in pr_candidates:
+        exercise_id, set_payload = candidate[0], candidate[1]
+        if not exercise_id:
+            continue
+        winner, flagged = best_by_exercise.get(exercise_id, (None, None))
+        if is_better_pr(winner[1] if winner else {}, set_payload):
+            winner = candidate
+        if set_payload.get("isPR"):
+            flagged = candidate
+        best_by_exercise[exercise_id] = (winner, flagged)
+
+
+def best_pr_candidates(best_by_exercise):
+    """
+    The candidates update_prs_for_sets needs to reach the same result as with
+    every set: an isPR set wins regardless of the stored PR, so the last one is
+    kept ahead of the winner that beat it.
+    """
+    candidates = []
+    for winner, flagged in best_by_exercise.values():
+        if flagged is not None and flagged is not winner:
+            candidates.append(flagged)
+        if winner is not None:
+            candidates.append(winner)
+    return candidates
+
+
+def normalize_workout_exercises(workout_id, exercises_data):
+    """
+    Validates exercises and sets and computes derived fields (ids, RPE, volume)
+    without touching Firestore.
+    Returns (processed_exercises, pr_candidates) where pr_candidates feed update_prs_for_sets.
     """
     processed_exercises = []
+    pr_candidates = []
 
     for exercise_index, exercise in enumerate(exercises_data):
         # Ensure exercise is a dict
@@ -127,28 +718,93 @@ def process_workout_exercises(user_id, workout_id, exercises_data):
             processed_set["rpe"] = compute_rpe(rir_value, rpe_value)
             processed_set["volume"] = compute_volume(reps_value, weight_value)
 
-            # Check PR
-            # We use the set ID we just ensured exists
-            set_id = processed_set["id"]
-            # We use the exercise index or ID for workout_exercise_id
-            workout_exercise_id = str(exercise_index)
-
-            try:
-                update_pr_if_needed(
-                    user_id=user_id,
-                    exercise_id=exercise_id,
-                    set_payload=processed_set,
-                    workout_id=workout_id,
-                    workout_exercise_id=workout_exercise_id,
-                    set_id=set_id
-                )
-            except Exception as e:
-                logging.error(f"Failed to update PR for user {user_id}, exercise {exercise_id}: {e}")
-                # We continue processing even if PR update fails
+            # Queue PR check; we use the exercise index for workout_exercise_id
+            pr_candidates.append((exercise_id, processed_set, workout_id, str(exercise_index)))
 
             processed_sets.append(processed_set)
 
         processed_exercise["sets"] = processed_sets
         processed_exercises.append(processed_exercise)
 
+    return processed_exercises, pr_candidates
+
+
+def filter_changed_pr_candidates(pr_candidates, previous_exercises):
+    """
+    Drops PR candidates whose set already exists unchanged in previous_exercises,
+    so re-sent sets from an in-progress workout are not PR-checked again.
+    """
+    previous_sets = {}
+    for exercise in previous_exercises or []:
+        if not isinstance(exercise, dict):
+            continue
+        exercise_id = exercise.get("exerciseId") or exercise.get("id")
+        for set_item in exercise.get("sets") or []:
+            if isinstance(set_item, dict):
+                previous_sets[(exercise_id, set_item.get("id"))] = tuple(set_item.get(field) for field in PR_SET_FIELDS)
+    return [
+        candidate for candidate in pr_candidates
+        if previous_sets.get((candidate[0], candidate[1].get("id"))) != tuple(candidate[1].get(field) for field in PR_SET_FIELDS)
+    ]
+
+
+def process_workout_exercises(user_id, workout_id, exercises_data, workout_date=None, previous_exercises=None,
+                              previous_date=None, batch=None):
+    """
+    Iterates through exercises and sets, computes derived fields, and updates PRs.
+    When workout_date is given, the per-exercise history index is updated as well
+    (previous_exercises lets an update drop exercises that were removed).
+    On updates only new or changed sets are PR-checked, and the history index is
+    left alone when neither the sets nor the date changed.
+    PR and history writes are committed together in a single batch, or queued
+    on batch when given so they commit atomically with the caller's writes.
+    Returns the processed exercises list.
+    """
+    processed_exercises, pr_candidates = normalize_workout_exercises(workout_id, exercises_data)
+    if previous_exercises is not None:
+        pr_candidates = filter_changed_pr_candidates(pr_candidates, previous_exercises)
+        if workout_date is not None and workout_date == previous_date and (
+            build_history_sessions(workout_id, workout_date, processed_exercises)
+            == build_history_sessions(workout_id, workout_date, previous_exercises)
+        ):
+            workout_date = None
+
+    def plan_prs():
+        try:
+            return plan_prs_for_sets(user_id, pr_candidates)
+        except Exception as e:
+            logging.error(f"Failed to update PRs for user {user_id}, workout {workout_id}: {e}")
+            # We continue processing even if PR update fails
+            return []
+
+    def plan_history():
+        try:
+            return plan_exercise_history(user_id, workout_id, workout_date, processed_exercises, previous_exercises)
+        except Exception as e:
+            logging.error(f"Failed to update exercise history for user {user_id}, workout {workout_id}: {e}")
+            return []
+
+    # PR and history docs are disjoint, so both reads run in parallel; the planned
+    # writes come back to this thread, which alone touches the batch
+    calls = [plan_prs] if workout_date is None else [plan_prs, plan_history]
+    try:
+        planned = run_parallel(*calls)
+    except concurrent.futures.TimeoutError as e:
+        # The caller still saves the workout; only this PR/history update is skipped
+        logging.error(f"Timed out updating PRs/history for user {user_id}, workout {workout_id}: {e}")
+        return processed_exercises
+
+    if batch is not None:
+        for planned_writes in planned:
+            queue_planned_writes(batch, planned_writes)
+        return processed_exercises
+
+    batch = db.batch()
+    writes = sum(queue_planned_writes(batch, planned_writes) for planned_writes in planned)
+    if writes:
+        try:
+            batch.commit()
+        except Exception as e:
+            logging.error(f"Failed to commit PR/history updates for user {user_id}, workout {workout_id}: {e}")
+
     return processed_exercises